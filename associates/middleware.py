@@ -0,0 +1,17 @@
+from django.utils.functional import SimpleLazyObject
+
+from associates.roles import get_role
+
+
+class RoleMiddleware:
+    """
+    Set request.role to the Role of the logged-in user, loaded on first use.
+    Must come after the session and authentication middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.role = SimpleLazyObject(lambda: get_role(request))
+        return self.get_response(request)
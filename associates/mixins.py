@@ -9,7 +9,7 @@ class OrganizerAndLoginRequiredMixin(AccessMixin):
     """Verify that the current user is authenticated and is an organizer."""
 
     def dispatch(self, request, *args, **kwargs):
-        if not request.user.is_authenticated or not request.user.is_organizer:
+        if not request.user.is_authenticated or not request.role.is_organizer:
             return redirect('tickets:ticket-list')
         return super().dispatch(request, *args, **kwargs)
 
@@ -21,8 +21,9 @@ class AssociateMixin:
     """
 
     def get_queryset(self):
-        department = self.request.user.userdepartment
-        return Associate.objects.filter(department=department)
+        return Associate.objects.filter(
+            department_id=self.request.role.department_id
+        ).select_related('user')
 
     def get_success_url(self):
         return reverse('associates:associate-list')
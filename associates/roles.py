@@ -0,0 +1,102 @@
+"""
+The role of the logged-in user, resolved once per request.
+
+RoleMiddleware sets request.role to a lazy Role carrying the user's role
+and the ids of their department and associate rows, so views and mixins
+scope querysets by id instead of dereferencing user.userdepartment or
+user.associate, each a query of its own. The ids are loaded with one
+joined query and kept in the session, stamped with a version key in the
+Django cache that invalidate() bumps whenever an Associate or
+UserDepartment row is saved or deleted.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+SESSION_KEY = '_role'
+VERSION_KEY = 'associates:role-version'
+
+
+class Role:
+    """ A user's role and the ids of their department and associate rows. """
+
+    def __init__(self, user_id, is_organizer, department_id=None,
+                 associate_id=None):
+        self.user_id = user_id
+        self.is_organizer = is_organizer
+        self.department_id = department_id
+        self.associate_id = associate_id
+
+    def __repr__(self):
+        return (f'<Role user={self.user_id} organizer={self.is_organizer} '
+                f'department={self.department_id} '
+                f'associate={self.associate_id}>')
+
+    @classmethod
+    def for_user(cls, user):
+        """ Load the role of a user with a single query. """
+        if not user.is_authenticated:
+            return cls(None, False)
+        # Cached past the request, so read from the primary, not a replica
+        users = get_user_model().objects.using(DEFAULT_DB_ALIAS)
+        department_id, associate_id, associate_department_id = (
+            users.filter(pk=user.pk).values_list(
+                'userdepartment__id', 'associate__id',
+                'associate__department_id').first()
+            or (None, None, None))
+        if not user.is_organizer:
+            department_id = associate_department_id
+        return cls(user.pk, user.is_organizer, department_id, associate_id)
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, 1)
+
+
+def invalidate():
+    """
+    Make every session reload its role. The bump is repeated on commit so
+    that no session caches the state of a transaction that is still running.
+    """
+    _bump_version()
+    transaction.on_commit(_bump_version)
+
+
+def get_role(request):
+    """
+    Return the Role of the request's user from the session, loading it if
+    it is missing, stale or belongs to another user.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return Role(None, False)
+
+    version = get_version()
+    cached = request.session.get(SESSION_KEY)
+    if (cached and cached['version'] == version
+            and cached['user_id'] == user.pk
+            and cached['is_organizer'] == user.is_organizer):
+        return Role(user.pk, user.is_organizer, cached['department_id'],
+                    cached['associate_id'])
+
+    role = Role.for_user(user)
+    request.session[SESSION_KEY] = {
+        'version': version,
+        'user_id': role.user_id,
+        'is_organizer': role.is_organizer,
+        'department_id': role.department_id,
+        'associate_id': role.associate_id,
+    }
+    return role
+
@@ -1,8 +1,9 @@
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
-from associates.models import UserDepartment
+from associates import roles
+from associates.models import Associate, UserDepartment
 
 User = get_user_model()
 
@@ -18,3 +19,12 @@ def post_user_created_signal(sender, instance, created, **kwargs):
 
 
 post_save.connect(post_user_created_signal, sender=User)
+
+
+@receiver(post_save, sender=Associate)
+@receiver(post_delete, sender=Associate)
+@receiver(post_save, sender=UserDepartment)
+@receiver(post_delete, sender=UserDepartment)
+def invalidate_roles(sender, **kwargs):
+    """ Signal to reload the role cached in every session. """
+    roles.invalidate()
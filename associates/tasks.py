@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import send_mail
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from jobs.queue import register
+
+
+@register('send_invitation')
+def send_invitation(payload):
+    """
+    Email a new associate a link to choose their password. The link is
+    built when the job runs, so the job only stores the user id.
+
+    Payload: {'user_id', 'base_url'}
+    """
+    user = get_user_model().objects.filter(pk=payload['user_id']).first()
+    if user is None:
+        # Deleted before the invitation went out
+        return
+    path = reverse('password-reset-confirm', kwargs={
+        'uidb64': urlsafe_base64_encode(force_bytes(user.pk)),
+        'token': default_token_generator.make_token(user),
+    })
+    send_mail(
+        subject='You are invited to be an associate.',
+        message=f'You were added as an associate on CRM. '
+                f'Choose your password at {payload["base_url"]}{path}',
+        from_email='django@crm.com',
+        recipient_list=[user.email]
+    )
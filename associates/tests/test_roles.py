@@ -0,0 +1,85 @@
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase, RequestFactory
+from django.contrib.sessions.backends.db import SessionStore
+
+from associates.models import Associate, UserDepartment, User
+from associates.roles import Role, get_role
+from tickets.models import Ticket, Category
+
+
+class RoleTest(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user(
+            username='organizer', email='organizer@test.com',
+            password='password', is_organizer=True)
+        self.department = UserDepartment.objects.get(user=self.organizer)
+        self.associate = Associate.objects.create(
+            user=User.objects.create_user(
+                username='associate', email='associate@test.com',
+                password='password', is_organizer=False, is_associate=True),
+            department=self.department)
+
+    def get_request(self, user, session=None):
+        request = RequestFactory().get('/')
+        request.user = user
+        request.session = session if session is not None else SessionStore()
+        return request
+
+    def test_for_user(self):
+        with self.assertNumQueries(1):
+            role = Role.for_user(self.organizer)
+        self.assertTrue(role.is_organizer)
+        self.assertEqual(role.department_id, self.department.pk)
+        self.assertIsNone(role.associate_id)
+
+        role = Role.for_user(self.associate.user)
+        self.assertFalse(role.is_organizer)
+        self.assertEqual(role.department_id, self.department.pk)
+        self.assertEqual(role.associate_id, self.associate.pk)
+
+        role = Role.for_user(AnonymousUser())
+        self.assertIsNone(role.department_id)
+        self.assertFalse(Ticket.objects.visible_to(role).exists())
+
+    def test_cached_in_session(self):
+        session = SessionStore()
+        get_role(self.get_request(self.associate.user, session))
+        with self.assertNumQueries(0):
+            role = get_role(self.get_request(self.associate.user, session))
+        self.assertEqual(role.associate_id, self.associate.pk)
+
+        # Another user logging in with the session reloads it
+        with self.assertNumQueries(1):
+            role = get_role(self.get_request(self.organizer, session))
+        self.assertTrue(role.is_organizer)
+
+    def test_invalidated_by_department_change(self):
+        session = SessionStore()
+        get_role(self.get_request(self.associate.user, session))
+
+        other = User.objects.create_user(
+            username='other', email='other@test.com', password='password',
+            is_organizer=True)
+        self.associate.department = other.userdepartment
+        self.associate.save()
+
+        role = get_role(self.get_request(self.associate.user, session))
+        self.assertEqual(role.department_id, other.userdepartment.pk)
+
+    def test_visible_to_role_matches_user(self):
+        Category.objects.create(name='assigned')
+        Ticket.objects.create(title='Unassigned', type=1,
+                              department=self.department)
+        Ticket.objects.create(title='Assigned', type=1,
+                              department=self.department,
+                              associate=self.associate)
+        for user in (self.organizer, self.associate.user):
+            self.assertQuerySetEqual(
+                Ticket.objects.visible_to(Role.for_user(user)),
+                Ticket.objects.visible_to(user), ordered=False)
+
+    def test_request_role(self):
+        self.client.force_login(self.associate.user)
+        response = self.client.get('/tickets/')
+        self.assertEqual(response.wsgi_request.role.associate_id,
+                         self.associate.pk)
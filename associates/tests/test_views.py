@@ -1,8 +1,15 @@
+import json
+
 from django.contrib.auth import get_user_model
+from django.core import mail
+from django.db import connection
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from associates.models import Associate, UserDepartment
+from associates.tasks import send_invitation
+from jobs.models import Job
 
 
 class AssociateViewsTest(TestCase):
@@ -36,6 +43,24 @@ class AssociateViewsTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'associates/associate_list.html')
 
+    def test_associate_list_queries_do_not_grow(self):
+        url = reverse('associates:associate-list')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+
+        for i in range(5):
+            self.create_associate(f'associate_{i}')
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(url)
+        self.assertContains(response, 'associate_4@test.com')
+
+    def create_associate(self, username):
+        return Associate.objects.create(
+            user=get_user_model().objects.create_user(
+                username=username, email=f'{username}@test.com',
+                password='password', is_associate=True, is_organizer=False),
+            department=self.user_department)
+
     def test_associate_create_view(self):
         response = self.client.get(reverse('associates:associate-create'))
         self.assertEqual(response.status_code, 200)
@@ -55,6 +80,31 @@ class AssociateViewsTest(TestCase):
         self.assertTrue(
             Associate.objects.filter(user__username='new_associate').exists())
 
+    def test_associate_invitation(self):
+        self.client.post(reverse('associates:associate-create'), {
+            'username': 'invited',
+            'email': 'invited@test.com',
+            'first_name': 'Invited',
+            'last_name': 'Associate',
+        })
+        user = get_user_model().objects.get(username='invited')
+
+        # The job row never holds the password hash
+        job = Job.objects.get(name='send_invitation')
+        self.assertEqual(job.payload, {'user_id': user.pk,
+                                       'base_url': 'http://testserver'})
+        self.assertNotIn(user.password, json.dumps(job.payload))
+
+        send_invitation(job.payload)
+        message = mail.outbox[-1]
+        self.assertEqual(message.to, ['invited@test.com'])
+        self.assertNotIn(user.password, message.body)
+        link = message.body.split('http://testserver')[-1]
+        response = self.client.get(link)
+        self.assertRedirects(response, link.rsplit('/', 2)[0]
+                             + '/set-password/',
+                             fetch_redirect_response=False)
+
     def test_associate_detail_view(self):
         response = self.client.get(reverse('associates:associate-detail',
                                            args=[self.test_associate.id]))
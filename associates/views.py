@@ -2,12 +2,12 @@ import random
 
 from django.contrib import messages
 from django.contrib.messages.views import SuccessMessageMixin
-from django.core.mail import send_mail
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
 from django.views import generic
 
+from jobs.queue import enqueue
 from .forms import AssociateForm
 from .mixins import OrganizerAndLoginRequiredMixin, AssociateMixin
 from .models import Associate
@@ -17,6 +17,7 @@ class AssociateListView(OrganizerAndLoginRequiredMixin, AssociateMixin,
                         generic.ListView):
     """View for listing Associate instances."""
     template_name = 'associates/associate_list.html'
+    read_from_replica = True
     context_object_name = 'associates'
 
 
@@ -38,21 +39,22 @@ class AssociateCreateView(OrganizerAndLoginRequiredMixin, generic.CreateView):
         # Creates a new Associate instance
         associate = Associate.objects.create(
             user=user,
-            department=self.request.user.userdepartment
+            department_id=self.request.role.department_id
         )
+        self.send_invitation_email(user)
         messages.success(self.request,
                          f'Associate {associate} was created successfully.')
         return super().form_valid(form)
 
     def send_invitation_email(self, user):
-        """ Sends an invitation email to the new Associate. """
-        send_mail(
-            subject='You are invited to be an associate.',
-            message=f'You were added as an associate on CRM. '
-                    f'Temporary password is: {user.password}.',
-            from_email='django@crm.com',
-            recipient_list=[user.email]
-        )
+        """
+        Queues an invitation email to the new Associate. The job only holds
+        the user id, the handler builds the password link when it runs.
+        """
+        enqueue('send_invitation', {
+            'user_id': user.pk,
+            'base_url': self.request.build_absolute_uri('/').rstrip('/'),
+        })
 
 
 class AssociateDetailView(OrganizerAndLoginRequiredMixin, AssociateMixin,
@@ -0,0 +1,87 @@
+"""
+Time of distributing unassigned tickets to the least loaded associates.
+
+Creates a department with --associates associates, some of them already
+loaded with open tickets, and --tickets unassigned tickets, then assigns
+them all with tickets.assignment.distribute() and reports the time taken
+and the resulting spread of workloads.
+
+    python benchmarks/bench_assign.py --tickets 10000 --associates 50
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+
+from associates.models import Associate, UserDepartment  # noqa: E402
+from tickets.assignment import distribute, get_workloads  # noqa: E402
+from tickets.models import Ticket, Category  # noqa: E402
+
+User = get_user_model()
+
+
+def create_department(associates, tickets):
+    """ A fresh department, so repeated runs do not add up. """
+    run = uuid.uuid4().hex[:8]
+    user = User.objects.create(username=f'bench-assign-{run}',
+                               email=f'bench-assign-{run}@crm.com',
+                               is_organizer=True)
+    department, created = UserDepartment.objects.get_or_create(user=user)
+    users = User.objects.bulk_create([
+        User(username=f'bench-assign-{run}-{i}',
+             email=f'bench-assign-{run}-{i}@crm.com',
+             is_organizer=False, is_associate=True)
+        for i in range(associates)])
+    members = Associate.objects.bulk_create([
+        Associate(user=user, department=department) for user in users])
+
+    # A backlog on the first tenth of the associates
+    Ticket.objects.bulk_create_assigned([
+        Ticket(title=f'Open {i}', type=i % 3 + 1, department=department,
+               associate=members[i % max(associates // 10, 1)])
+        for i in range(tickets // 10)], batch_size=1000)
+    Ticket.objects.bulk_create_assigned([
+        Ticket(title=f'Unassigned {i}', type=i % 3 + 1, department=department)
+        for i in range(tickets)], batch_size=1000)
+    return department
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tickets', type=int, default=10000)
+    parser.add_argument('--associates', type=int, default=50)
+    args = parser.parse_args()
+
+    call_command('migrate', verbosity=0)
+    Category.objects.get_or_create(name='assigned')
+    department = create_department(args.associates, args.tickets)
+
+    with CaptureQueriesContext(connection) as queries:
+        started = time.monotonic()
+        assigned = distribute(Ticket.objects.filter(department=department))
+        elapsed = time.monotonic() - started
+
+    workloads = get_workloads(department.pk)
+    print(f'Assigned {assigned} tickets to {args.associates} associates '
+          f'in {elapsed:.2f}s ({assigned / elapsed:.0f} tickets/sec, '
+          f'{len(queries)} queries)')
+    print(f'Workloads: min {min(workloads.values())}, '
+          f'max {max(workloads.values())}')
+
+
+if __name__ == '__main__':
+    main()
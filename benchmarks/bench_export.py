@@ -0,0 +1,108 @@
+"""
+Peak RSS of `manage.py export_tickets` at growing dataset sizes.
+
+Seeds a SQLite database up to each size, runs the export in a fresh process
+writing to /dev/null and reports its peak RSS and throughput. Exits non-zero
+if the peak RSS of the largest run grows more than --tolerance times the
+smallest one. Seeding also runs in a child process: a forked child's peak RSS
+includes its parent's pages, so the parent has to stay small.
+
+    python benchmarks/bench_export.py --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+BATCH_SIZE = 10000
+
+
+def get_department():
+    from django.contrib.auth import get_user_model
+    from associates.models import UserDepartment
+
+    user, created = get_user_model().objects.get_or_create(
+        username='bench-organizer',
+        defaults={'email': 'bench-organizer@crm.com', 'is_organizer': True})
+    department, created = UserDepartment.objects.get_or_create(user=user)
+    return department
+
+
+def seed(size):
+    """ Grow the department to `size` tickets, one follow-up each. """
+    import django
+    django.setup()
+    from django.core.management import call_command
+    from tickets.models import Ticket, FollowUp
+
+    call_command('migrate', verbosity=0)
+    department = get_department()
+    existing = Ticket.objects.filter(department=department).count()
+    for start in range(existing, size, BATCH_SIZE):
+        tickets = Ticket.objects.bulk_create([
+            Ticket(title=f'Ticket {i}', type=i % 3 + 1,
+                   description=f'Description of ticket {i}',
+                   department=department)
+            for i in range(start, min(start + BATCH_SIZE, size))
+        ])
+        FollowUp.objects.bulk_create([
+            FollowUp(ticket=ticket, notes=f'Follow-up of {ticket.title}')
+            for ticket in tickets
+        ])
+    print(department.id)
+
+
+def run_seed(size):
+    """ Seed in a child process, return the department id. """
+    output = subprocess.run([sys.executable, __file__, '--seed', str(size)],
+                            check=True, capture_output=True, text=True).stdout
+    return int(output.split()[-1])
+
+
+def run_export(department_id, export_format):
+    """ Run the export in a child process, return (seconds, peak RSS KiB). """
+    started = time.monotonic()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BASE_DIR, 'manage.py'), 'export_tickets',
+         '--department', str(department_id), '--format', export_format,
+         '--output', os.devnull],
+        env=dict(os.environ), stderr=subprocess.DEVNULL)
+    _, status, usage = os.wait4(process.pid, 0)
+    if os.waitstatus_to_exitcode(status):
+        raise SystemExit('export_tickets failed')
+    return time.monotonic() - started, usage.ru_maxrss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10000, 100000, 1000000])
+    parser.add_argument('--format', choices=('csv', 'ndjson'),
+                        default='ndjson')
+    parser.add_argument('--tolerance', type=float, default=1.5)
+    parser.add_argument('--seed', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        return seed(args.seed)
+
+    print(f'{"tickets":>10} {"seconds":>9} {"rows/sec":>10} {"peak RSS MiB":>13}')
+    results = []
+    for size in sorted(args.sizes):
+        department_id = run_seed(size)
+        seconds, peak_rss = run_export(department_id, args.format)
+        results.append(peak_rss)
+        print(f'{size:>10} {seconds:>9.2f} {size / seconds:>10.0f} '
+              f'{peak_rss / 1024:>13.1f}')
+
+    if results[-1] > results[0] * args.tolerance:
+        raise SystemExit(f'Peak RSS grew more than {args.tolerance}x.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Throughput of `manage.py import_tickets` against per-row Ticket.save().
+
+Writes a CSV of --rows tickets (half of them assigned to an associate),
+imports it with the command, then creates the same rows one at a time
+through Ticket.save(), which runs the pre_save receivers for every row.
+
+    python benchmarks/bench_import.py --rows 20000
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+from io import StringIO
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import transaction  # noqa: E402
+
+from associates.models import Associate, UserDepartment  # noqa: E402
+from tickets.models import Ticket, Category  # noqa: E402
+
+User = get_user_model()
+
+
+def get_department():
+    user, created = User.objects.get_or_create(
+        username='bench-import-organizer',
+        defaults={'email': 'bench-import-organizer@crm.com',
+                  'is_organizer': True})
+    department, created = UserDepartment.objects.get_or_create(user=user)
+    associate_user, created = User.objects.get_or_create(
+        username='bench-import-associate',
+        defaults={'email': 'bench-import-associate@crm.com',
+                  'is_organizer': False, 'is_associate': True})
+    associate, created = Associate.objects.get_or_create(
+        user=associate_user, department=department)
+    return department, associate
+
+
+def write_rows(path, rows, department, associate):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(('title', 'type', 'description', 'department',
+                         'associate'))
+        for i in range(rows):
+            writer.writerow((f'Imported {i}', i % 3 + 1, f'Legacy ticket {i}',
+                             department.id,
+                             associate.user.email if i % 2 else ''))
+
+
+def per_row(rows, department, associate):
+    with transaction.atomic():
+        for i in range(rows):
+            Ticket(title=f'Saved {i}', type=i % 3 + 1,
+                   description=f'Legacy ticket {i}', department=department,
+                   associate=associate if i % 2 else None).save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    call_command('migrate', verbosity=0)
+    Category.objects.get_or_create(name='assigned')
+    department, associate = get_department()
+
+    handle, path = tempfile.mkstemp(suffix='.csv')
+    os.close(handle)
+    try:
+        write_rows(path, args.rows, department, associate)
+        started = time.monotonic()
+        call_command('import_tickets', path, '--batch-size', args.batch_size,
+                     stdout=StringIO())
+        bulk = time.monotonic() - started
+    finally:
+        os.remove(path)
+
+    started = time.monotonic()
+    per_row(args.rows, department, associate)
+    saved = time.monotonic() - started
+
+    print(f'{"path":>16} {"seconds":>9} {"rows/sec":>10}')
+    print(f'{"import_tickets":>16} {bulk:>9.2f} {args.rows / bulk:>10.0f}')
+    print(f'{"Ticket.save()":>16} {saved:>9.2f} {args.rows / saved:>10.0f}')
+    print(f'Speed-up: {saved / bulk:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""
+Latency percentiles and query counts of the main views at growing sizes.
+
+For each size, `manage.py seed_scale` fills a SQLite database of its own
+(benchmarks/views-<size>.sqlite3, reused by later runs) with departments of
+that many tickets. The associates grow with the size too (one per
+--tickets-per-associate tickets, at least --associates), and so do the
+follow-ups of the ticket whose detail page is measured (one per
+--tickets-per-followup tickets). Each named URL is then requested
+--requests times through the test client as one of the seeded organizers.
+
+Exits non-zero if a view runs more queries than its QUERY_BUDGETS entry or
+more at the largest size than at the smallest, i.e. its query count grows
+with the data, or if its p50 latency at the largest size is more than
+--max-latency-growth times the one at the smallest.
+
+    python benchmarks/bench_views.py --sizes 1000 10000 100000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+URL_NAMES = ('tickets:ticket-list', 'tickets:ticket-detail',
+             'tickets:category-list', 'tickets:category-detail',
+             'landing:dashboard', 'tickets:ticket-list-json',
+             'associates:associate-list')
+
+# Most queries a view may run at any size, session and user included
+QUERY_BUDGETS = {
+    'tickets:ticket-list': 7,
+    'tickets:ticket-detail': 5,
+    'tickets:category-list': 4,
+    'tickets:category-detail': 5,
+    'landing:dashboard': 5,
+    'tickets:ticket-list-json': 4,
+    'associates:associate-list': 3,
+}
+
+
+class QueryCounter:
+    """ connection.execute_wrapper hook counting the queries of a request. """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def get_ticket(department):
+    from tickets.models import Ticket
+
+    return Ticket.objects.filter(department=department).order_by('pk').first()
+
+
+def get_urls(department):
+    from django.urls import reverse
+    from tickets.models import Category
+
+    ticket = get_ticket(department)
+    kwargs = {
+        'tickets:ticket-detail': {'pk': ticket.pk},
+        'tickets:category-detail': {
+            'pk': Category.objects.by_name('assigned').pk},
+    }
+    return {name: reverse(name, kwargs=kwargs.get(name)) for name in URL_NAMES}
+
+
+def run(size, args):
+    """ Seed if needed and measure every URL, print the results as JSON. """
+    import django
+    django.setup()
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test import Client
+    from associates.models import UserDepartment
+    from tickets.models import FollowUp
+
+    call_command('migrate', verbosity=0)
+    departments = UserDepartment.objects.filter(
+        user__username__startswith='seed-organizer-')
+    if not departments.exists():
+        associates = max(args.associates, size // args.tickets_per_associate)
+        call_command('seed_scale', departments=args.departments,
+                     associates=associates, tickets=size,
+                     followups=args.followups, seed=0, verbosity=0)
+        ticket = get_ticket(departments.first())
+        FollowUp.objects.bulk_create([
+            FollowUp(ticket=ticket, notes=f'Benchmark update {i + 1}.')
+            for i in range(size // args.tickets_per_followup)
+        ])
+    department = departments.select_related('user').first()
+
+    client = Client()
+    client.force_login(department.user)
+    results = {}
+    for name, url in get_urls(department).items():
+        latencies, queries = [], 0
+        for i in range(args.warmup + args.requests):
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                started = time.perf_counter()
+                response = client.get(url)
+                elapsed = time.perf_counter() - started
+            if response.status_code != 200:
+                raise SystemExit(f'{url} returned {response.status_code}')
+            if i >= args.warmup:
+                latencies.append(elapsed * 1000)
+                queries = max(queries, counter.count)
+        percentiles = statistics.quantiles(latencies, n=100)
+        results[name] = {'p50': percentiles[49], 'p90': percentiles[89],
+                         'p99': percentiles[98], 'queries': queries}
+    print(json.dumps(results))
+
+
+def run_size(size, args):
+    """ Benchmark one size in a child process with its own database. """
+    env = dict(os.environ, BENCH_DB=os.path.join(
+        BASE_DIR, 'benchmarks', f'views-{size}.sqlite3'))
+    command = [sys.executable, __file__, '--run', str(size),
+               '--departments', str(args.departments),
+               '--associates', str(args.associates),
+               '--tickets-per-associate', str(args.tickets_per_associate),
+               '--tickets-per-followup', str(args.tickets_per_followup),
+               '--followups', str(args.followups),
+               '--requests', str(args.requests), '--warmup', str(args.warmup)]
+    output = subprocess.run(command, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[1000, 10000, 100000],
+                        help='Tickets per department.')
+    parser.add_argument('--departments', type=int, default=2)
+    parser.add_argument('--associates', type=int, default=10,
+                        help='Least associates per department.')
+    parser.add_argument('--tickets-per-associate', type=int, default=100)
+    parser.add_argument('--tickets-per-followup', type=int, default=100,
+                        help='Tickets per follow-up of the detail ticket.')
+    parser.add_argument('--followups', type=int, default=2)
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--max-latency-growth', type=float, default=3.0,
+                        help='Largest allowed ratio of the p50 latencies '
+                             'at the largest and the smallest size.')
+    parser.add_argument('--run', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run is not None:
+        return run(args.run, args)
+
+    sizes = sorted(args.sizes)
+    results = {size: run_size(size, args) for size in sizes}
+
+    print(f'{"view":<28} {"tickets":>8} {"p50 ms":>8} {"p90 ms":>8} '
+          f'{"p99 ms":>8} {"queries":>8}')
+    for name in URL_NAMES:
+        for size in sizes:
+            row = results[size][name]
+            print(f'{name:<28} {size:>8} {row["p50"]:>8.1f} {row["p90"]:>8.1f} '
+                  f'{row["p99"]:>8.1f} {row["queries"]:>8}')
+
+    smallest, largest = results[sizes[0]], results[sizes[-1]]
+    failures = []
+    over_budget = [name for name in URL_NAMES
+                   if any(results[size][name]['queries'] > QUERY_BUDGETS[name]
+                          for size in sizes)]
+    if over_budget:
+        failures.append('Query budget exceeded: ' + ', '.join(over_budget))
+    growing = [name for name in URL_NAMES
+               if largest[name]['queries'] > smallest[name]['queries']]
+    if growing:
+        failures.append('Query count grows with the data: '
+                        + ', '.join(growing))
+    slowing = [name for name in URL_NAMES
+               if largest[name]['p50']
+               > args.max_latency_growth * smallest[name]['p50']]
+    if len(sizes) > 1 and slowing:
+        failures.append('Latency grows with the data: ' + ', '.join(slowing))
+    if failures:
+        raise SystemExit('\n'.join(failures))
+
+
+if __name__ == '__main__':
+    main()
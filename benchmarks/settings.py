@@ -0,0 +1,18 @@
+"""
+Settings for the benchmark scripts: the project settings on a local SQLite
+file, so benchmarks run without external services.
+"""
+import os
+
+from crm.settings import *  # noqa: F401,F403
+from crm.settings import BASE_DIR
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('BENCH_DB', BASE_DIR / 'benchmarks' / 'bench.sqlite3'),
+    }
+}
+
+# The view benchmarks go through the test client
+ALLOWED_HOSTS = ['testserver', 'localhost', '127.0.0.1']
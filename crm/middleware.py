@@ -0,0 +1,150 @@
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from crm import routers
+
+logger = logging.getLogger('crm.timing')
+
+
+class RequestTimings:
+    """ Per-request counters filled in by ServerTimingMiddleware. """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.view_started = None
+        self.render_started = None
+        self.render_finished = None
+
+    def __call__(self, execute, sql, params, many, context):
+        """ connection.execute_wrapper hook counting queries and DB time. """
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+    def finish_render(self, response):
+        self.render_finished = time.perf_counter()
+
+    def durations(self):
+        """ Return (db, template, view, total) durations in milliseconds. """
+        finished = time.perf_counter()
+        view_started = self.view_started or self.started
+        view_finished = self.render_started or finished
+        template = 0.0
+        if self.render_started and self.render_finished:
+            template = self.render_finished - self.render_started
+        return tuple(value * 1000 for value in (
+            self.db_time, template, view_finished - view_started,
+            finished - self.started))
+
+
+class ServerTimingMiddleware:
+    """
+    Measure SQL query count and time, template render time and view time for
+    a sample of requests. The numbers are sent back in a Server-Timing header
+    (shown in the browser's network tab) and logged to the `crm.timing`
+    logger, tagged with the resolved URL name.
+
+    Enabled with SERVER_TIMING = True; SERVER_TIMING_SAMPLE_RATE (0 to 1)
+    controls the share of requests measured. Unsampled requests only cost a
+    call to random().
+
+    Template time covers TemplateResponse rendering, which is what the class
+    based views return. Templates rendered inside a view count as view time.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SERVER_TIMING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'SERVER_TIMING_SAMPLE_RATE', 1.0)
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        timings = request._timings = RequestTimings()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timings))
+            response = self.get_response(request)
+
+        db, template, view, total = timings.durations()
+        url_name = (request.resolver_match.view_name
+                    if request.resolver_match else None)
+        response['Server-Timing'] = (
+            f'db;dur={db:.1f};desc="{timings.queries} queries", '
+            f'tpl;dur={template:.1f}, view;dur={view:.1f}, '
+            f'total;dur={total:.1f}'
+        )
+        logger.info(
+            '%s %s %s queries=%d db=%.1fms tpl=%.1fms view=%.1fms '
+            'total=%.1fms', url_name, request.method, response.status_code,
+            timings.queries, db, template, view, total,
+            extra={'url_name': url_name, 'method': request.method,
+                   'status': response.status_code,
+                   'queries': timings.queries, 'db_ms': round(db, 1),
+                   'template_ms': round(template, 1),
+                   'view_ms': round(view, 1), 'total_ms': round(total, 1)},
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if hasattr(request, '_timings'):
+            request._timings.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # Being first in MIDDLEWARE, this runs last, right before Django
+        # renders the response
+        if hasattr(request, '_timings'):
+            request._timings.render_started = time.perf_counter()
+            response.add_post_render_callback(request._timings.finish_render)
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Send the reads of GET requests to views marked with
+    `read_from_replica = True` to a read replica (see crm.routers), and pin
+    clients that wrote to the primary for REPLICA_PIN_SECONDS with a cookie.
+
+    Disabled unless DATABASE_REPLICAS is set. Place it before the session
+    middleware, so the session saved after a view counts as a write.
+    """
+    pin_cookie = 'primary_pinned'
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = routers.start_request()
+        try:
+            response = self.get_response(request)
+            wrote = routers.get_state().wrote
+        finally:
+            routers.end_request(token)
+        if wrote:
+            response.set_cookie(self.pin_cookie, '1',
+                                max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        if (request.method in ('GET', 'HEAD')
+                and getattr(view_class, 'read_from_replica', False)
+                and self.pin_cookie not in request.COOKIES):
+            routers.get_state().replica = routers.choose_replica()
+
@@ -0,0 +1,79 @@
+"""
+Routing of read-only views to the read replicas.
+
+ReplicaRoutingMiddleware picks a replica, round-robin, for GET requests to
+views with `read_from_replica = True`, and PrimaryReplicaRouter sends the
+reads of those requests there. Everything else, every write, and any read
+that follows a write in the same request goes to the primary. Clients that
+wrote are pinned to the primary for REPLICA_PIN_SECONDS so they read their
+own writes despite replication lag.
+"""
+import itertools
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Apps whose rows are read right after being written by another request
+PRIMARY_APPS = {'sessions'}
+
+_state = ContextVar('replica_routing', default=None)
+_counter = itertools.count()
+
+
+class RoutingState:
+    """ The replica a request reads from and whether it has written. """
+
+    def __init__(self):
+        self.replica = None
+        self.wrote = False
+
+
+def start_request():
+    """ Begin routing a request, return the token to end it with. """
+    return _state.set(RoutingState())
+
+
+def end_request(token):
+    _state.reset(token)
+
+
+def get_state():
+    return _state.get()
+
+
+def choose_replica():
+    """ The next replica alias, round-robin, or None without replicas. """
+    replicas = settings.DATABASE_REPLICAS
+    if not replicas:
+        return None
+    return replicas[next(_counter) % len(replicas)]
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (state is None or state.replica is None or state.wrote
+                or model._meta.app_label in PRIMARY_APPS):
+            return None
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas get their schema through replication
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
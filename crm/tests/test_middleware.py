@@ -0,0 +1,49 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from associates.models import UserDepartment
+from tickets.models import Ticket
+
+User = get_user_model()
+
+
+@override_settings(SERVER_TIMING=True, SERVER_TIMING_SAMPLE_RATE=1.0)
+class ServerTimingMiddlewareTest(TestCase):
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(
+            username='organizer',
+            password='organizer_password',
+            is_organizer=True
+        )
+        self.user_department, created = UserDepartment.objects.get_or_create(
+            user=self.organizer_user)
+        Ticket.objects.create(title='Ticket', type=1,
+                              department=self.user_department)
+        self.client.force_login(self.organizer_user)
+
+    def test_server_timing_header_and_log(self):
+        with self.assertLogs('crm.timing', level='INFO') as logs:
+            response = self.client.get(reverse('tickets:ticket-list'))
+
+        header = response['Server-Timing']
+        for metric in ('db;dur=', 'tpl;dur=', 'view;dur=', 'total;dur='):
+            self.assertIn(metric, header)
+        self.assertRegex(header, r'desc="[1-9]\d* queries"')
+
+        record = logs.records[0]
+        self.assertEqual(record.url_name, 'tickets:ticket-list')
+        self.assertEqual(record.status, 200)
+        self.assertGreater(record.queries, 0)
+        self.assertGreater(record.template_ms, 0)
+        self.assertGreaterEqual(record.total_ms, record.view_ms)
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_unsampled_request(self):
+        response = self.client.get(reverse('tickets:ticket-list'))
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(SERVER_TIMING=False)
+    def test_disabled(self):
+        response = self.client.get(reverse('tickets:ticket-list'))
+        self.assertNotIn('Server-Timing', response)
@@ -0,0 +1,114 @@
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from associates.models import UserDepartment
+from crm import routers
+from tickets.models import Ticket
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_PIN_SECONDS=5)
+class ReplicaRoutingTest(TestCase):
+    """
+    The replica is a second SQLite file that is not replicated to: rows
+    copied to it stand in for what the replica has caught up with.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        handle, cls.replica_path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        # configure_settings() fills in the defaults of a 'default' alias
+        connections.settings['replica'] = connections.configure_settings({
+            'default': {'ENGINE': 'django.db.backends.sqlite3',
+                        'NAME': cls.replica_path}})['default']
+        # The router does not migrate replicas
+        with override_settings(DATABASE_REPLICAS=[]):
+            call_command('migrate', database='replica', verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        os.remove(cls.replica_path)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(
+            username='organizer',
+            password='organizer_password',
+            is_organizer=True
+        )
+        self.user_department, created = UserDepartment.objects.get_or_create(
+            user=self.organizer_user)
+        self.ticket = Ticket.objects.create(title='Ticket', type=1,
+                                            department=self.user_department)
+
+        # Roll the replica back after each test, like the primary
+        replica = transaction.atomic(using='replica')
+        replica.__enter__()
+        self.addCleanup(replica.__exit__, None, None, None)
+        self.addCleanup(transaction.set_rollback, True, using='replica')
+
+        # The replica lags behind the last title change
+        for model, obj in ((User, self.organizer_user),
+                           (UserDepartment, self.user_department),
+                           (Ticket, self.ticket)):
+            model.objects.using('replica').bulk_create([obj])
+        Ticket.objects.filter(pk=self.ticket.pk).update(title='Renamed')
+
+        self.client.force_login(self.organizer_user)
+        self.url = reverse('tickets:ticket-detail', args=[self.ticket.pk])
+
+    def test_read_only_views_use_replica(self):
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Ticket')
+        self.assertNotContains(response, 'Renamed')
+
+        # Views that are not marked read from the primary
+        response = self.client.get(
+            reverse('tickets:ticket-update', args=[self.ticket.pk]))
+        self.assertContains(response, 'Renamed')
+
+    def test_writes_pin_to_primary(self):
+        response = self.client.post(
+            reverse('tickets:ticket-followup-create', args=[self.ticket.pk]),
+            {'notes': 'Notes'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.cookies['primary_pinned']['max-age'], 5)
+
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Renamed')
+
+        # Once the pin expires, reads go back to the replica
+        del self.client.cookies['primary_pinned']
+        response = self.client.get(self.url)
+        self.assertNotContains(response, 'Renamed')
+
+    def test_router(self):
+        router = routers.PrimaryReplicaRouter()
+        token = routers.start_request()
+        try:
+            self.assertIsNone(router.db_for_read(Ticket))
+            routers.get_state().replica = routers.choose_replica()
+            self.assertEqual(router.db_for_read(Ticket), 'replica')
+            self.assertIsNone(router.db_for_read(
+                self.client.session.model))
+
+            # Reads after a write in the same request see it
+            self.assertEqual(router.db_for_write(Ticket), 'default')
+            self.assertIsNone(router.db_for_read(Ticket))
+        finally:
+            routers.end_request(token)
+
+        self.assertFalse(router.allow_migrate('replica', 'tickets'))
+        self.assertIsNone(router.allow_migrate('default', 'tickets'))
@@ -0,0 +1,41 @@
+import os
+import socket
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+
+from jobs.queue import work
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs on a thread pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4,
+                            help='Number of worker threads.')
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Jobs of the same kind handled together '
+                                 '(e.g. emails sent over one connection).')
+        parser.add_argument('--sleep', type=float, default=1.0,
+                            help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once no job is due.')
+
+    def handle(self, *args, **options):
+        worker = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.stdout.write(f'Worker {worker} started with concurrency '
+                          f'{options["concurrency"]}.')
+        try:
+            while True:
+                done, failed = work(worker, options['concurrency'],
+                                    options['batch_size'])
+                if done or failed:
+                    self.stdout.write(f'{done} jobs done, {failed} failed.')
+                elif options['burst']:
+                    break
+                else:
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f'Worker {worker} stopped.')
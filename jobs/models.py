@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.utils import timezone
+
+STATES = (
+    ('queued', 'Queued'),
+    ('running', 'Running'),
+    ('done', 'Done'),
+    ('failed', 'Failed')
+)
+
+
+class JobQuerySet(models.QuerySet):
+
+    def claim(self, worker, limit, lock_timeout=timedelta(minutes=10)):
+        """
+        Atomically mark up to `limit` due jobs as running for `worker` and
+        return them.
+
+        Due jobs are locked with SELECT ... FOR UPDATE SKIP LOCKED where the
+        database supports it, so concurrent workers never wait on each
+        other. The conditional UPDATE on the state also keeps workers from
+        claiming the same job on databases without row locks (SQLite).
+        Jobs left running longer than lock_timeout by a dead worker are
+        queued again first.
+        """
+        now = timezone.now()
+        self.filter(state='running', locked_at__lt=now - lock_timeout).update(
+            state='queued', locked_by='')
+
+        with transaction.atomic():
+            due = self.filter(state='queued', run_after__lte=now).order_by(
+                'run_after', 'id')
+            if transaction.get_connection(
+                    self.db).features.has_select_for_update_skip_locked:
+                due = due.select_for_update(skip_locked=True)
+            ids = list(due.values_list('id', flat=True)[:limit])
+            self.filter(id__in=ids, state='queued').update(
+                state='running', locked_by=worker, locked_at=now,
+                attempts=models.F('attempts') + 1)
+        return list(self.filter(id__in=ids, locked_by=worker,
+                                state='running').order_by('id'))
+
+
+class Job(models.Model):
+    """ A unit of background work, run by the run_worker command. """
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    state = models.CharField(max_length=10, choices=STATES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_date = models.DateTimeField(auto_now_add=True)
+    completed_date = models.DateTimeField(null=True, blank=True)
+
+    objects = JobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Job'
+        verbose_name_plural = 'Jobs'
+        ordering = ('id',)
+        indexes = [
+            models.Index(fields=('state', 'run_after'),
+                         name='job_state_run_after'),
+        ]
+
+    def __str__(self):
+        return f'{self.name}, id: {self.pk} ({self.state})'
@@ -0,0 +1,122 @@
+import logging
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import timedelta
+from itertools import groupby
+
+from django.db import connections
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+def register(name, batch=False):
+    """
+    Register a job handler under `name`.
+
+    A handler is called with the job payload. A batch handler is called with
+    a list of payloads instead, so it can share a resource (e.g. one SMTP
+    connection) across every job of a batch. It may return a list with the
+    error of each payload, None for those that succeeded, so that only the
+    failed jobs are retried; raising fails the whole batch.
+    """
+    def decorator(func):
+        HANDLERS[name] = (func, batch)
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, run_after=None, max_attempts=5):
+    """
+    Queue a job. It is inserted in the current transaction, so it only runs
+    if that transaction commits.
+    """
+    if name not in HANDLERS:
+        raise KeyError(f'No job handler registered as {name!r}.')
+    return Job.objects.create(name=name, payload=payload or {},
+                              run_after=run_after or timezone.now(),
+                              max_attempts=max_attempts)
+
+
+def backoff(attempts, base=10, cap=3600):
+    """ Exponential retry delay: 10s, 20s, 40s... up to an hour. """
+    return timedelta(seconds=min(cap, base * 2 ** (attempts - 1)))
+
+
+def _run_unit(func, batch, jobs):
+    """
+    Run a handler on one job, or on a batch of jobs, in a pool thread.
+    Return the error of each job, None for those that succeeded.
+    """
+    try:
+        if batch:
+            errors = func([job.payload for job in jobs])
+            if errors is not None:
+                return list(errors)
+        else:
+            func(jobs[0].payload)
+        return [None] * len(jobs)
+    except Exception:
+        return [traceback.format_exc()] * len(jobs)
+    finally:
+        # Database connections are per thread, don't leak the pool's
+        connections.close_all()
+
+
+def run_jobs(jobs, executor, batch_size):
+    """
+    Run claimed jobs on the executor and record their outcome: done, queued
+    again with backoff, or failed after max_attempts.
+    """
+    units = []
+    for name, group in groupby(sorted(jobs, key=lambda job: job.name),
+                               key=lambda job: job.name):
+        group = list(group)
+        func, batch = HANDLERS.get(name, (None, False))
+        if func is None:
+            future = Future()
+            future.set_result([f'No job handler registered as {name!r}.']
+                              * len(group))
+            units.append((group, future))
+        elif batch:
+            for start in range(0, len(group), batch_size):
+                chunk = group[start:start + batch_size]
+                units.append((chunk, executor.submit(_run_unit, func, True,
+                                                     chunk)))
+        else:
+            units.extend(([job], executor.submit(_run_unit, func, False,
+                                                 [job])) for job in group)
+
+    now = timezone.now()
+    done = []
+    for unit_jobs, future in units:
+        for job, error in zip(unit_jobs, future.result()):
+            if error is None:
+                done.append(job.id)
+                continue
+            logger.warning('Job %s (%s) failed, attempt %s of %s:\n%s',
+                           job.id, job.name, job.attempts, job.max_attempts,
+                           error)
+            if job.attempts >= job.max_attempts:
+                Job.objects.filter(id=job.id).update(
+                    state='failed', last_error=error, locked_by='')
+            else:
+                Job.objects.filter(id=job.id).update(
+                    state='queued', last_error=error, locked_by='',
+                    run_after=now + backoff(job.attempts))
+    Job.objects.filter(id__in=done).update(state='done', completed_date=now,
+                                           locked_by='')
+    return len(done), len(jobs) - len(done)
+
+
+def work(worker, concurrency=1, batch_size=50):
+    """ Claim and run one round of due jobs, return (done, failed). """
+    jobs = Job.objects.claim(worker, limit=concurrency * batch_size)
+    if not jobs:
+        return 0, 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return run_jobs(jobs, executor, batch_size)
@@ -0,0 +1,31 @@
+import traceback
+
+from django.core.mail import EmailMessage, get_connection
+
+from .queue import register
+
+
+@register('send_mail', batch=True)
+def send_mail_batch(payloads):
+    """
+    Send the emails of a batch of jobs over a single SMTP connection. Each
+    message is sent on its own and its error returned, so a retry only
+    sends the messages that were not delivered.
+
+    Payload: {'subject', 'message', 'from_email', 'recipient_list'}
+    """
+    messages = [EmailMessage(subject=payload['subject'],
+                             body=payload['message'],
+                             from_email=payload.get('from_email'),
+                             to=payload['recipient_list'])
+                for payload in payloads]
+    errors = []
+    with get_connection() as connection:
+        for message in messages:
+            try:
+                connection.send_messages([message])
+            except Exception:
+                errors.append(traceback.format_exc())
+            else:
+                errors.append(None)
+    return errors
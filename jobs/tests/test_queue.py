@@ -0,0 +1,108 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.queue import enqueue, register, work
+
+CALLS = []
+
+
+class RejectingEmailBackend(EmailBackend):
+    """ Refuses the messages sent to rejected@test.com. """
+
+    def send_messages(self, messages):
+        for message in messages:
+            if 'rejected@test.com' in message.to:
+                raise ConnectionError('Recipient refused')
+        return super().send_messages(messages)
+
+
+@register('test_job')
+def record_job(payload):
+    if payload.get('fail'):
+        raise ValueError('Job failed')
+    CALLS.append(payload)
+
+
+class JobQueueTest(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_enqueue_unknown_job(self):
+        with self.assertRaises(KeyError):
+            enqueue('unknown_job')
+
+    def test_claim_skips_claimed_and_future_jobs(self):
+        enqueue('test_job', {'n': 1})
+        enqueue('test_job', {'n': 2},
+                run_after=timezone.now() + timedelta(hours=1))
+
+        claimed = Job.objects.claim('worker-1', limit=10)
+        self.assertEqual([job.payload for job in claimed], [{'n': 1}])
+        self.assertEqual(claimed[0].attempts, 1)
+        self.assertEqual(Job.objects.claim('worker-2', limit=10), [])
+
+    def test_work_runs_jobs(self):
+        enqueue('test_job', {'n': 1})
+        enqueue('test_job', {'n': 2})
+
+        self.assertEqual(work('worker', concurrency=2), (2, 0))
+        self.assertCountEqual(CALLS, [{'n': 1}, {'n': 2}])
+        self.assertFalse(Job.objects.exclude(state='done').exists())
+
+    def test_failed_job_is_retried_with_backoff(self):
+        job = enqueue('test_job', {'fail': True}, max_attempts=2)
+
+        self.assertEqual(work('worker'), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.state, 'queued')
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('Job failed', job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        work('worker')
+        job.refresh_from_db()
+        self.assertEqual(job.state, 'failed')
+
+    def test_stale_running_job_is_requeued(self):
+        job = enqueue('test_job', {'n': 1})
+        Job.objects.filter(pk=job.pk).update(
+            state='running', locked_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(work('worker'), (1, 0))
+
+    def test_run_worker_sends_mail_batch(self):
+        for i in range(3):
+            enqueue('send_mail', {'subject': f'Mail {i}', 'message': 'Body',
+                                  'from_email': 'django@crm.com',
+                                  'recipient_list': ['associate@test.com']})
+        self.assertEqual(len(mail.outbox), 0)
+
+        call_command('run_worker', '--burst', stdout=StringIO())
+        self.assertEqual(sorted(m.subject for m in mail.outbox),
+                         ['Mail 0', 'Mail 1', 'Mail 2'])
+
+    @override_settings(
+        EMAIL_BACKEND='jobs.tests.test_queue.RejectingEmailBackend')
+    def test_failed_mail_is_retried_alone(self):
+        for recipient in ('associate@test.com', 'rejected@test.com'):
+            enqueue('send_mail', {'subject': recipient, 'message': 'Body',
+                                  'recipient_list': [recipient]})
+
+        self.assertEqual(work('worker'), (1, 1))
+        self.assertEqual([m.subject for m in mail.outbox],
+                         ['associate@test.com'])
+        job = Job.objects.get(state='queued')
+        self.assertEqual(job.payload['subject'], 'rejected@test.com')
+        self.assertIn('Recipient refused', job.last_error)
+
+        # The retry does not send the delivered message again
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        self.assertEqual(work('worker'), (0, 1))
+        self.assertEqual(len(mail.outbox), 1)
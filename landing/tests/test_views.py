@@ -1,6 +1,8 @@
 from datetime import timedelta
+from io import StringIO
 
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase, Client
 from django.urls import reverse
 from django.utils import timezone
@@ -45,7 +47,8 @@ class DashboardViewTest(TestCase):
             user=self.user)
 
         # Create necessary objects in the database
-        category_completed = Category.objects.create(name='completed')
+        category_completed = self.category_completed = Category.objects.create(
+            name='completed')
 
         # Create some tickets for the user
         Ticket.objects.create(
@@ -84,11 +87,34 @@ class DashboardViewTest(TestCase):
         context = response.context_data
         self.assertEqual(context['total_ticket_count'], 2)
 
+    def test_dashboard_view_ticket_count_includes_archived(self):
+        Ticket.objects.filter(title='Ticket 2').update(
+            category=self.category_completed,
+            completed_date=timezone.now() - timedelta(days=400))
+        call_command('archive_tickets', stdout=StringIO())
+        self.assertEqual(Ticket.objects.count(), 1)
+
+        response = self.client.get(reverse('landing:dashboard'))
+        self.assertEqual(response.context_data['total_ticket_count'], 2)
+
     def test_dashboard_view_new_tickets_count(self):
         response = self.client.get(reverse('landing:dashboard'))
         context = response.context_data
         self.assertEqual(context['total_in_past30'], 2)
 
+    def test_dashboard_view_completed_count(self):
+        response = self.client.get(reverse('landing:dashboard'))
+        context = response.context_data
+        # Tickets without an associate lose their category on save
+        self.assertEqual(context['completed_in_past30'], 0)
+
+    def test_dashboard_view_trends(self):
+        response = self.client.get(reverse('landing:dashboard'))
+        trends = {trend['days']: trend for trend in response.context['trends']}
+        self.assertEqual(sorted(trends), [30, 90, 365])
+        self.assertEqual(trends[30]['created'], 2)
+        self.assertEqual(trends[365]['completed'], 1)
+
     def test_dashboard_view_no_tickets(self):
         # Remove all tickets for the user
         Ticket.objects.filter(department__user=self.user).delete()
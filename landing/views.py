@@ -1,13 +1,15 @@
 from datetime import timedelta
 
 from django.contrib.auth import authenticate, login, logout
-from django.shortcuts import get_object_or_404, redirect
+from django.db.models import Count, Q, Sum
+from django.http import Http404
+from django.shortcuts import redirect
 from django.urls import reverse_lazy
 from django.utils import timezone
 from django.views import generic
 
 from associates.mixins import OrganizerAndLoginRequiredMixin
-from tickets.models import Ticket, Category
+from tickets.models import Ticket, ArchivedTicket, Category, TicketDailyStats
 from .forms import CustomUserCreationForm
 
 
@@ -22,39 +24,59 @@ class LandingPageView(generic.TemplateView):
 
 class DashboardView(OrganizerAndLoginRequiredMixin, generic.TemplateView):
     template_name = 'landing/dashboard.html'
+    read_from_replica = True
+    trend_periods = (30, 90, 365)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        user = self.request.user
-
-        # How many tickets we have in total
-        total_ticket_count = Ticket.objects.filter(
-            department=user.userdepartment).count()
-
-        # How many new tickets in the last 30 days
+        role = self.request.role
         thirty_days_ago = timezone.now() - timedelta(days=30)
-
-        total_in_past30 = Ticket.objects.filter(
-            department=user.userdepartment,
-            created_date__gte=thirty_days_ago
-        ).count()
-
-        # How many completed tickets in the last 30 days       
-        completed_category = get_object_or_404(Category, name='completed')
-        completed_in_past30 = Ticket.objects.filter(
-            department=user.userdepartment,
-            category=completed_category,
-            completed_date__gte=thirty_days_ago
-        ).count()
-
-        context.update({
-            'total_ticket_count': total_ticket_count,
-            'total_in_past30': total_in_past30,
-            'completed_in_past30': completed_in_past30
-        })
+        try:
+            completed_category = Category.objects.by_name('completed')
+        except Category.DoesNotExist:
+            raise Http404('No Category matches the given query.')
+
+        # How many tickets we have in total, how many new tickets and how
+        # many completed tickets in the last 30 days, in a single query
+        context.update(Ticket.objects.visible_to(role).aggregate(
+            total_ticket_count=Count('id'),
+            total_in_past30=Count(
+                'id', filter=Q(created_date__gte=thirty_days_ago)),
+            completed_in_past30=Count(
+                'id', filter=Q(category=completed_category,
+                               completed_date__gte=thirty_days_ago)),
+        ))
+        # Archived tickets were completed long ago, they only add to the total
+        context['total_ticket_count'] += ArchivedTicket.objects.visible_to(
+            role).count()
+
+        context['trends'] = self.get_trends(role)
         return context
 
+    def get_trends(self, role):
+        """
+        Created/completed ticket counts for each trend period, read from the
+        daily rollup in one query instead of scanning the tickets.
+        """
+        today = timezone.localdate()
+        periods = {days: today - timedelta(days=days - 1)
+                   for days in self.trend_periods}
+        aggregates = {}
+        for days, since in periods.items():
+            aggregates[f'created_{days}'] = Sum(
+                'created_count', filter=Q(date__gte=since), default=0)
+            aggregates[f'completed_{days}'] = Sum(
+                'completed_count', filter=Q(date__gte=since), default=0)
+        totals = TicketDailyStats.objects.filter(
+            department_id=role.department_id, date__gte=min(periods.values())
+        ).aggregate(**aggregates)
+
+        return [{'days': days,
+                 'created': totals[f'created_{days}'],
+                 'completed': totals[f'completed_{days}']}
+                for days in self.trend_periods]
+
 
 class SignupView(generic.CreateView):
     """View for user registration."""
@@ -1 +1,27 @@
-console.log("Main.js")
\ No newline at end of file
+console.log("Main.js")
+
+// Replace a 'Load older' link with the follow-ups fragment it points to,
+// which ends with the link to the next page if there is one.
+document.addEventListener('click', async (event) => {
+    const link = event.target.closest('a[data-load-older]');
+    if (!link) {
+        return;
+    }
+    event.preventDefault();
+    const response = await fetch(link.href, {credentials: 'same-origin'});
+    if (response.ok) {
+        link.outerHTML = await response.text();
+    }
+});
+
+// Tick or untick every ticket checkbox of the bulk actions form.
+document.addEventListener('change', (event) => {
+    const toggle = event.target.closest('input[data-select-all]');
+    if (!toggle) {
+        return;
+    }
+    const selector = `input[name="${toggle.dataset.selectAll}"]`;
+    document.querySelectorAll(selector).forEach((checkbox) => {
+        checkbox.checked = toggle.checked;
+    });
+});
@@ -0,0 +1,66 @@
+"""
+Moving long-completed tickets out of the tables every page reads.
+
+archive_batch() copies a batch of completed tickets and their follow-ups
+into tickets_archivedticket and tickets_archivedfollowup with INSERT ...
+SELECT, keeping their ids, then deletes them from the hot tables along with
+their category counters and transition log, whose dwell times are already
+counted in TicketDwellStats. Attachments keep their blob references and the
+SQLite FTS5 entries stay, as they are keyed by the unchanged ticket id.
+"""
+from django.db import connections, transaction
+
+from tickets.models import (Ticket, FollowUp, ArchivedTicket, ArchivedFollowUp,
+                            Category, TicketCategoryCount, TicketTransition)
+
+
+def archivable(cutoff, department_id=None):
+    """ The tickets completed before `cutoff`, which is a datetime. """
+    tickets = Ticket.objects.filter(
+        category=Category.objects.by_name('completed'),
+        completed_date__lt=cutoff)
+    if department_id is not None:
+        tickets = tickets.filter(department_id=department_id)
+    return tickets
+
+
+def copy_rows(model, queryset):
+    """
+    INSERT ... SELECT the rows of `queryset` into the table of `model`,
+    which has the same columns.
+    """
+    fields = model._meta.concrete_fields
+    connection = connections[queryset.db]
+    select, params = queryset.order_by().values_list(
+        *(field.attname for field in fields)).query.get_compiler(
+        using=queryset.db).as_sql()
+    columns = ', '.join(connection.ops.quote_name(field.column)
+                        for field in fields)
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {model._meta.db_table} ({columns}) '
+                       f'{select}', params)
+
+
+def archive_batch(tickets, batch_size, after=0):
+    """
+    Archive up to `batch_size` tickets of `tickets` with an id above
+    `after`, in one transaction. Return the archived ids, in order.
+    """
+    using = tickets.db
+    with transaction.atomic(using=using):
+        ids = list(tickets.filter(pk__gt=after).order_by('pk')
+                   .select_for_update().values_list('pk', flat=True)
+                   [:batch_size])
+        if not ids:
+            return ids
+        batch = Ticket.objects.using(using).filter(pk__in=ids)
+        followups = FollowUp.objects.using(using).filter(ticket_id__in=ids)
+
+        copy_rows(ArchivedTicket, batch)
+        copy_rows(ArchivedFollowUp, followups)
+        TicketCategoryCount.objects.add_queryset(batch, sign=-1)
+        TicketTransition.objects.using(using).filter(
+            ticket_id__in=ids)._raw_delete(using)
+        followups._raw_delete(using)
+        batch._raw_delete(using)
+    return ids
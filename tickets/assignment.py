@@ -0,0 +1,108 @@
+"""
+Automatic assignment of tickets to the least loaded associate.
+
+The workload of an associate is the summed weight (TICKET_TYPE_WEIGHTS) of
+their open tickets, those not 'completed', read for a whole department with
+one aggregate query over the (department, associate, category) index.
+Assignments in a department are serialized by locking its associate rows
+until the transaction commits, so concurrent requests see each other's
+assignments instead of all picking the same associate.
+"""
+import heapq
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+
+from associates.models import Associate
+from tickets.models import Ticket, Category
+
+
+def get_weight(ticket_type):
+    return settings.TICKET_TYPE_WEIGHTS.get(ticket_type, 1)
+
+
+def weight_expression():
+    """ The weight of a ticket, for use in queries. """
+    return models.Case(
+        *(models.When(type=ticket_type, then=models.Value(weight))
+          for ticket_type, weight in settings.TICKET_TYPE_WEIGHTS.items()),
+        default=models.Value(1), output_field=models.IntegerField())
+
+
+def lock_associates(department_id, using=DEFAULT_DB_ALIAS):
+    """
+    Lock and return the associates of a department, in id order so that
+    concurrent lockers cannot deadlock. Must run in a transaction.
+    """
+    return list(Associate.objects.using(using).select_for_update()
+                .filter(department_id=department_id).order_by('pk').only('pk'))
+
+
+def get_workloads(department_id, using=DEFAULT_DB_ALIAS):
+    """ Return {associate id: workload} of the associates with open tickets. """
+    tickets = Ticket.objects.using(using).filter(department_id=department_id,
+                                                 associate__isnull=False)
+    try:
+        tickets = tickets.exclude(
+            category=Category.objects.by_name('completed'))
+    except Category.DoesNotExist:
+        pass
+    return dict(tickets.order_by().values('associate')
+                .annotate(load=models.Sum(weight_expression()))
+                .values_list('associate', 'load'))
+
+
+def pick_associate(department_id, using=DEFAULT_DB_ALIAS):
+    """
+    Return the least loaded associate of a department, the first one on a
+    tie, or None if it has none. The associates stay locked until the end
+    of the transaction, which the assignment must be saved in.
+    """
+    associates = lock_associates(department_id, using=using)
+    if not associates:
+        return None
+    workloads = get_workloads(department_id, using=using)
+    return min(associates,
+               key=lambda associate: workloads.get(associate.pk, 0))
+
+
+def distribute(tickets):
+    """
+    Assign the unassigned tickets of a queryset, oldest first, each to the
+    associate of its department that is the least loaded once the
+    previous ones are counted. Return the number of tickets assigned.
+    """
+    using = tickets.db
+    assigned = 0
+    with transaction.atomic(using=using):
+        by_department = defaultdict(list)
+        rows = (tickets.filter(associate__isnull=True,
+                               department__isnull=False)
+                .select_for_update().order_by('created_date', 'pk')
+                .values_list('pk', 'department_id', 'type'))
+        for pk, department_id, ticket_type in rows:
+            by_department[department_id].append((pk, ticket_type))
+
+        for department_id, department_tickets in by_department.items():
+            associates = {associate.pk: associate for associate
+                          in lock_associates(department_id, using=using)}
+            if not associates:
+                continue
+            workloads = get_workloads(department_id, using=using)
+            heap = [(workloads.get(pk, 0), pk) for pk in associates]
+            heapq.heapify(heap)
+
+            assignments = defaultdict(list)
+            for pk, ticket_type in department_tickets:
+                load, associate_id = heap[0]
+                assignments[associate_id].append(pk)
+                heapq.heapreplace(heap, (load + get_weight(ticket_type),
+                                         associate_id))
+
+            for associate_id, ids in assignments.items():
+                # One UPDATE per associate, skipping tickets assigned since
+                assigned += Ticket.objects.using(using).filter(
+                    pk__in=ids, associate__isnull=True,
+                ).bulk_assign(associates[associate_id])
+    return assigned
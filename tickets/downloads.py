@@ -0,0 +1,134 @@
+"""
+Serving of stored attachments once a view has checked that the user may
+see them.
+
+With MEDIA_ACCEL_REDIRECT set, the response only carries an
+X-Accel-Redirect (nginx) or X-Sendfile (Apache, lighttpd) header and the
+front-end server sends the file, so large downloads do not hold a worker.
+Otherwise the file is streamed by Django, honouring single byte ranges
+(Range/If-Range) and conditional requests (ETag/If-None-Match,
+Last-Modified/If-Modified-Since).
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import (Http404, HttpResponse, FileResponse,
+                         StreamingHttpResponse)
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+from tickets.storage import is_blob
+
+CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def get_etag(name, stat):
+    # Blob names are the SHA-256 of their content
+    if is_blob(name):
+        return f'"{os.path.splitext(os.path.basename(name))[0]}"'
+    return f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+
+
+def download_filename(prefix, pk, name):
+    """ Blobs are named after their hash, name downloads after the object. """
+    if is_blob(name):
+        return f'{prefix}-{pk}{os.path.splitext(name)[1]}'
+    return os.path.basename(name)
+
+
+def parse_range(header, size):
+    """
+    Return the (start, end) inclusive byte range of a single-range Range
+    header, None to send the whole file, or False if it is unsatisfiable.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        # Malformed or multiple ranges: ignore the header
+        return None
+    start, end = match.groups()
+    if start:
+        start = int(start)
+        if end and int(end) < start:
+            # Invalid rather than unsatisfiable: ignore the header
+            return None
+        end = min(int(end), size - 1) if end else size - 1
+    else:
+        # Suffix range: the last `end` bytes
+        start, end = max(size - int(end), 0), size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def read_range(f, start, length):
+    with f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_file(request, storage, name, filename=None, as_attachment=False):
+    """ Return a response sending the stored file `name`. """
+    path = storage.path(name)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404('The file is missing.')
+    etag = get_etag(name, stat)
+    last_modified = int(stat.st_mtime)
+    content_type = (mimetypes.guess_type(filename or name)[0]
+                    or 'application/octet-stream')
+    filename = filename or os.path.basename(name)
+
+    response = get_conditional_response(request, etag=etag,
+                                        last_modified=last_modified)
+    if response is not None:
+        return response
+
+    accel = getattr(settings, 'MEDIA_ACCEL_REDIRECT', '')
+    if accel:
+        response = HttpResponse(content_type=content_type)
+        if accel == 'x-sendfile':
+            response['X-Sendfile'] = path
+        else:
+            response['X-Accel-Redirect'] = quote(
+                settings.MEDIA_ACCEL_PREFIX + name)
+    else:
+        byte_range = None
+        if_range = request.headers.get('If-Range')
+        if 'Range' in request.headers and (
+                not if_range or if_range == etag
+                or parse_http_date_safe(if_range) == last_modified):
+            byte_range = parse_range(request.headers['Range'], stat.st_size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+        if byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                read_range(storage.open(name), start, end - start + 1),
+                status=206, content_type=content_type)
+            response['Content-Length'] = end - start + 1
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        else:
+            response = FileResponse(storage.open(name),
+                                    content_type=content_type)
+        response['Accept-Ranges'] = 'bytes'
+
+    disposition = 'attachment' if as_attachment else 'inline'
+    response['Content-Disposition'] = (
+        f"{disposition}; filename*=UTF-8''{quote(filename)}")
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, max-age=3600'
+    return response
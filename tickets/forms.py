@@ -1,7 +1,7 @@
 from django import forms
 
 from associates.models import Associate
-from .models import Ticket, Category, FollowUp
+from .models import Ticket, Category, FollowUp, TICKET_TYPES
 
 
 class TicketForm(forms.ModelForm):
@@ -24,6 +24,14 @@ class TicketForm(forms.ModelForm):
             self.fields['associate'].queryset = associates
 
 
+class TicketCreateForm(TicketForm):
+    """ TicketForm with the option to let the ticket be assigned for you. """
+    auto_assign = forms.BooleanField(
+        required=False,
+        label='Assign to the least loaded associate',
+        help_text='Ignored if an associate is selected.')
+
+
 class AssignAssociateForm(forms.Form):
     associate = forms.ModelChoiceField(queryset=Associate.objects.none())
 
@@ -37,6 +45,42 @@ class AssignAssociateForm(forms.Form):
             self.fields['associate'].queryset = associates
 
 
+class TicketBulkActionForm(forms.Form):
+    """ Tickets selected on the ticket list and the action to apply. """
+    ACTIONS = (
+        ('assign', 'Assign associate'),
+        ('category', 'Set category'),
+        ('distribute', 'Assign to the least loaded associates'),
+        ('delete', 'Delete'),
+    )
+
+    tickets = forms.ModelMultipleChoiceField(queryset=Ticket.objects.none())
+    action = forms.ChoiceField(choices=ACTIONS)
+    associate = forms.ModelChoiceField(queryset=Associate.objects.none(),
+                                       required=False,
+                                       empty_label='No associate')
+    category = forms.ModelChoiceField(queryset=Category.objects.all(),
+                                      required=False)
+
+    def __init__(self, *args, **kwargs):
+        user_department = kwargs.pop('user_department', None)
+        super().__init__(*args, **kwargs)
+
+        if user_department:
+            # Only tickets and associates of the user's department
+            self.fields['tickets'].queryset = Ticket.objects.filter(
+                department=user_department).only('id')
+            self.fields['associate'].queryset = Associate.objects.filter(
+                department=user_department).select_related('user')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if (cleaned_data.get('action') == 'category'
+                and not cleaned_data.get('category')):
+            self.add_error('category', 'Select the category to set.')
+        return cleaned_data
+
+
 class TicketCategoryUpdateForm(forms.ModelForm):
     """ 
     Dynamically set the choices for the category field based on the user's role. 
@@ -71,3 +115,56 @@ class FollowUpForm(forms.ModelForm):
     class Meta:
         model = FollowUp
         fields = ('notes', 'file')
+
+
+class TicketSearchForm(forms.Form):
+    q = forms.CharField(max_length=200, required=False, label='Search')
+    archived = forms.BooleanField(required=False,
+                                  label='Include archived tickets')
+
+
+class TicketApiFilterForm(forms.Form):
+    """ Validates the query parameters of the ticket JSON API. """
+    FIELDS = ('id', 'title', 'description', 'type', 'category', 'department',
+              'associate', 'created_date', 'completed_date', 'updated_date')
+
+    type = forms.TypedChoiceField(choices=TICKET_TYPES, coerce=int,
+                                  required=False)
+    category = forms.CharField(required=False)
+    associate = forms.IntegerField(required=False)
+    created_after = forms.DateTimeField(required=False)
+    created_before = forms.DateTimeField(required=False)
+    fields = forms.CharField(required=False)
+    stream = forms.BooleanField(required=False)
+
+    def clean_fields(self):
+        """ Sparse fieldsets: a comma separated subset of FIELDS. """
+        value = self.cleaned_data['fields']
+        if not value:
+            return self.FIELDS
+        fields = tuple(dict.fromkeys(f.strip() for f in value.split(',')
+                                     if f.strip()))
+        unknown = set(fields) - set(self.FIELDS)
+        if unknown:
+            raise forms.ValidationError(
+                f'Unknown fields: {", ".join(sorted(unknown))}.')
+        return fields
+
+    def filter_queryset(self, queryset):
+        """ Apply the validated filters to a ticket queryset. """
+        data = self.cleaned_data
+        if data['type']:
+            queryset = queryset.filter(type=data['type'])
+        if data['category']:
+            # Accept either the category id or its name
+            if data['category'].isdigit():
+                queryset = queryset.filter(category_id=data['category'])
+            else:
+                queryset = queryset.filter(category__name=data['category'])
+        if data['associate'] is not None:
+            queryset = queryset.filter(associate_id=data['associate'])
+        if data['created_after']:
+            queryset = queryset.filter(created_date__gte=data['created_after'])
+        if data['created_before']:
+            queryset = queryset.filter(created_date__lt=data['created_before'])
+        return queryset
@@ -0,0 +1,70 @@
+import re
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from tickets.archive import archivable, archive_batch
+from tickets.models import Category
+
+UNITS = {'h': 'hours', 'd': 'days', 'w': 'weeks'}
+
+
+def parse_age(value):
+    """ Parse an age such as 180d, 26w or 12h (days without a unit). """
+    match = re.fullmatch(r'(\d+)([hdw]?)', value.strip())
+    if not match:
+        raise CommandError(f'Invalid --older-than value: {value}')
+    amount, unit = match.groups()
+    return timedelta(**{UNITS[unit or 'd']: int(amount)})
+
+
+class Command(BaseCommand):
+    help = ('Move tickets completed longer ago than --older-than, with '
+            'their follow-ups, into the archive tables in batches.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', default='180d',
+                            help='Archive tickets completed before this age, '
+                                 'e.g. 180d, 26w or 12h.')
+        parser.add_argument('--department', type=int,
+                            help='Only archive this UserDepartment id.')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Tickets moved per transaction.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count the tickets to archive.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        cutoff = timezone.now() - parse_age(options['older_than'])
+        try:
+            tickets = archivable(cutoff, options['department'])
+        except Category.DoesNotExist:
+            self.stdout.write('There is no completed category, nothing to '
+                              'archive.')
+            return
+
+        if options['dry_run']:
+            self.stdout.write(f'{tickets.count()} tickets completed before '
+                              f'{cutoff:%Y-%m-%d %H:%M} would be archived.')
+            return
+
+        started = time.monotonic()
+        archived = last_id = 0
+        # Short transactions, so the hot tables stay writable meanwhile
+        while True:
+            ids = archive_batch(tickets, options['batch_size'], after=last_id)
+            if not ids:
+                break
+            archived += len(ids)
+            last_id = ids[-1]
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Archived {archived} tickets...')
+        elapsed = time.monotonic() - started
+
+        rate = archived / elapsed if elapsed else archived
+        self.stdout.write(f'Archived {archived} tickets completed before '
+                          f'{cutoff:%Y-%m-%d %H:%M} in {elapsed:.2f}s '
+                          f'({rate:.0f} rows/sec).')
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+from tickets.models import Ticket, ArchivedTicket, TicketDailyStats
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the TicketDailyStats rollup from the tickets and '
+            'archived tickets tables.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--department', type=int,
+                            help='Only rebuild this UserDepartment id.')
+
+    def handle(self, *args, **options):
+        querysets = [Ticket.objects.order_by(),
+                     ArchivedTicket.objects.order_by()]
+        stats = TicketDailyStats.objects.all()
+        if options['department']:
+            querysets = [tickets.filter(department_id=options['department'])
+                         for tickets in querysets]
+            stats = stats.filter(department_id=options['department'])
+
+        days = {}
+        for tickets in querysets:
+            for date_field, counter in (('created_date', 'created_count'),
+                                        ('completed_date', 'completed_count')):
+                rows = tickets.filter(
+                    **{f'{date_field}__isnull': False}
+                ).annotate(date=TruncDate(date_field)).values(
+                    'department_id', 'date').annotate(count=Count('id'))
+                for row in rows.iterator():
+                    key = (row['department_id'], row['date'])
+                    day = days.setdefault(key, TicketDailyStats(
+                        department_id=row['department_id'], date=row['date']))
+                    setattr(day, counter,
+                            getattr(day, counter) + row['count'])
+
+        with transaction.atomic():
+            stats.delete()
+            TicketDailyStats.objects.bulk_create(days.values(),
+                                                 batch_size=1000)
+
+        self.stdout.write(f'Rebuilt {len(days)} daily stats rows.')
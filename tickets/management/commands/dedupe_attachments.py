@@ -0,0 +1,147 @@
+import hashlib
+import os
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from tickets.models import (Ticket, FollowUp, ArchivedTicket,
+                            ArchivedFollowUp, Blob)
+from tickets.storage import attachment_storage, BLOB_PREFIX, CHUNK_SIZE
+
+# Archived tickets keep their references
+ATTACHMENT_FIELDS = ((Ticket, 'uploaded_file'), (Ticket, 'uploaded_image'),
+                     (FollowUp, 'file'),
+                     (ArchivedTicket, 'uploaded_file'),
+                     (ArchivedTicket, 'uploaded_image'),
+                     (ArchivedFollowUp, 'file'))
+
+
+class Command(BaseCommand):
+    help = ('Move existing attachments into the deduplicated blob storage, '
+            'recount blob references and delete orphaned blobs.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report the savings without changing '
+                                 'anything.')
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help='Only delete orphaned blob files older than '
+                                 'this (uploads of unfinished requests).')
+
+    def handle(self, *args, **options):
+        legacy = self.legacy_names()
+        if options['dry_run']:
+            return self.report(legacy)
+
+        moved, freed = self.move_legacy(legacy)
+        recounted = self.recount()
+        orphans = self.delete_orphans(options['grace_hours'] * 3600)
+        self.stdout.write(
+            f'Moved {moved} attachments into blob storage and freed {freed} '
+            f'bytes. Recounted {recounted} blobs, deleted {orphans} orphaned '
+            f'files.')
+
+    @staticmethod
+    def legacy_names():
+        """ Attachment names stored before the blob storage. """
+        names = set()
+        for model, field in ATTACHMENT_FIELDS:
+            names.update(model.objects.exclude(**{f'{field}__isnull': True})
+                         .exclude(**{field: ''})
+                         .exclude(**{f'{field}__startswith': BLOB_PREFIX})
+                         .values_list(field, flat=True).distinct())
+        return sorted(names)
+
+    def report(self, names):
+        digests = Counter()
+        total = unique = 0
+        for name in names:
+            if not attachment_storage.exists(name):
+                self.stderr.write(f'Missing file: {name}')
+                continue
+            hasher = hashlib.sha256()
+            with attachment_storage.open(name) as f:
+                for chunk in f.chunks(CHUNK_SIZE):
+                    hasher.update(chunk)
+            size = attachment_storage.size(name)
+            total += size
+            if not digests[hasher.hexdigest()]:
+                unique += size
+            digests[hasher.hexdigest()] += 1
+        self.stdout.write(f'{len(digests)} unique files out of {len(names)}, '
+                          f'{total - unique} of {total} bytes would be freed.')
+
+    def move_legacy(self, names):
+        moved = freed = 0
+        stored_names = set(Blob.objects.values_list('name', flat=True))
+        for name in names:
+            if not attachment_storage.exists(name):
+                self.stderr.write(f'Missing file: {name}')
+                continue
+            size = attachment_storage.size(name)
+            with attachment_storage.open(name) as f:
+                stored = attachment_storage.save(name, f)
+            if stored in stored_names:
+                freed += size
+            stored_names.add(stored)
+
+            with transaction.atomic():
+                for model, field in ATTACHMENT_FIELDS:
+                    # update() skips the signal receivers, the references
+                    # are recounted afterwards
+                    moved += model.objects.filter(**{field: name}).update(
+                        **{field: stored})
+            attachment_storage.delete(name)
+        return moved, freed
+
+    @staticmethod
+    def recount():
+        """ Rewrite every refcount from the attachment columns. """
+        references = Counter()
+        for model, field in ATTACHMENT_FIELDS:
+            for row in (model.objects.filter(
+                    **{f'{field}__startswith': BLOB_PREFIX})
+                    .values(field).annotate(count=Count('id')).order_by()):
+                references[row[field]] += row['count']
+
+        changed = 0
+        with transaction.atomic():
+            blobs = {blob.name: blob
+                     for blob in Blob.objects.select_for_update()}
+            for name, count in references.items():
+                blob = blobs.pop(name, None)
+                if blob is None:
+                    Blob.objects.retain(name)
+                    Blob.objects.filter(name=name).update(refcount=count)
+                    changed += 1
+                elif blob.refcount != count:
+                    Blob.objects.filter(pk=blob.pk).update(refcount=count)
+                    changed += 1
+            # Nothing refers to the remaining blobs
+            for name, blob in blobs.items():
+                if blob.refcount:
+                    Blob.objects.filter(pk=blob.pk).update(refcount=0)
+                    changed += 1
+                transaction.on_commit(
+                    lambda name=name: Blob.objects.purge(name))
+        return changed
+
+    @staticmethod
+    def delete_orphans(grace_seconds):
+        """ Delete blob files without a Blob row, e.g. of failed saves. """
+        root = attachment_storage.path(BLOB_PREFIX)
+        known = set(Blob.objects.values_list('name', flat=True))
+        deadline = time.time() - grace_seconds
+        deleted = 0
+        for directory, subdirectories, files in os.walk(root):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, attachment_storage.location)
+                name = name.replace(os.sep, '/')
+                if name not in known and os.path.getmtime(path) < deadline:
+                    os.remove(path)
+                    deleted += 1
+        return deleted
@@ -0,0 +1,157 @@
+import csv
+import datetime
+import gzip
+import io
+import json
+import sys
+import time
+from contextlib import ExitStack
+from itertools import chain
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime, parse_date
+
+from associates.models import UserDepartment
+from tickets.models import Ticket, FollowUp, ArchivedTicket, ArchivedFollowUp
+
+TICKET_FIELDS = ('id', 'title', 'type', 'description', 'uploaded_file',
+                 'uploaded_image', 'created_date', 'completed_date',
+                 'department', 'associate', 'category')
+FOLLOWUP_FIELDS = ('id', 'created_date', 'notes', 'file')
+
+
+def parse_since(value):
+    """ Parse an ISO date or datetime into an aware datetime. """
+    try:
+        since = parse_datetime(value)
+        if since is None:
+            date = parse_date(value)
+            since = date and datetime.datetime.combine(date, datetime.time())
+    except ValueError:
+        since = None
+    if since is None:
+        raise CommandError(f'Invalid --since value: {value}')
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+class Command(BaseCommand):
+    help = ('Stream the tickets of a department, with their follow-ups, '
+            'as CSV or NDJSON in constant memory.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--department', type=int, required=True,
+                            help='UserDepartment id to export.')
+        parser.add_argument('--format', choices=('csv', 'ndjson'),
+                            default='ndjson')
+        parser.add_argument('--gzip', action='store_true',
+                            help='Gzip the output.')
+        parser.add_argument('--since',
+                            help='Only export tickets created on or after '
+                                 'this ISO date or datetime.')
+        parser.add_argument('--output', default='-',
+                            help='File to write to, "-" for stdout.')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Rows fetched from the database at a time.')
+        parser.add_argument('--include-archived', action='store_true',
+                            help='Also export archived tickets, after the '
+                                 'others.')
+
+    def handle(self, *args, **options):
+        if not UserDepartment.objects.filter(pk=options['department']).exists():
+            raise CommandError(
+                f'Department {options["department"]} does not exist.')
+
+        # On PostgreSQL .iterator() uses a server-side cursor, on SQLite it
+        # fetches chunk_size rows at a time. Follow-ups are prefetched per
+        # chunk, so memory stays flat whatever the number of tickets.
+        tickets = self.get_queryset(options).iterator(
+            chunk_size=options['chunk_size'])
+        if options['include_archived']:
+            archived = self.get_queryset(options, ArchivedTicket,
+                                         ArchivedFollowUp)
+            tickets = chain(tickets, archived.iterator(
+                chunk_size=options['chunk_size']))
+
+        started = time.monotonic()
+        with ExitStack() as stack:
+            stream = self.open_output(stack, options['output'],
+                                      options['gzip'])
+            if options['format'] == 'csv':
+                count = self.write_csv(stream, tickets)
+            else:
+                count = self.write_ndjson(stream, tickets)
+        elapsed = time.monotonic() - started
+
+        rate = count / elapsed if elapsed else count
+        self.stderr.write(f'Exported {count} tickets in {elapsed:.2f}s '
+                          f'({rate:.0f} rows/sec).')
+
+    def get_queryset(self, options, model=Ticket, followup_model=FollowUp):
+        queryset = model.objects.filter(
+            department_id=options['department']).order_by('id')
+        if options['since']:
+            queryset = queryset.filter(
+                created_date__gte=parse_since(options['since']))
+        followups = followup_model.objects.only('ticket_id', *FOLLOWUP_FIELDS)
+        return queryset.prefetch_related(
+            Prefetch('followups', queryset=followups))
+
+    def open_output(self, stack, path, use_gzip):
+        """ Open a text stream on the output, gzipped if requested. """
+        if path == '-':
+            raw = sys.stdout.buffer
+        else:
+            raw = stack.enter_context(open(path, 'wb'))
+        if use_gzip:
+            raw = stack.enter_context(gzip.GzipFile(fileobj=raw, mode='wb'))
+        stream = io.TextIOWrapper(raw, encoding='utf-8', newline='',
+                                  write_through=False)
+        # Flush but never close stdout when the export is done
+        stack.callback(stream.detach if path == '-' and not use_gzip
+                       else stream.close)
+        stack.callback(stream.flush)
+        return stream
+
+    @staticmethod
+    def ticket_to_dict(ticket):
+        # Tickets and archived tickets have the same fields
+        opts = type(ticket)._meta
+        row = {name: opts.get_field(name).value_from_object(ticket)
+               for name in TICKET_FIELDS}
+        row['uploaded_file'] = row['uploaded_file'].name or None
+        row['uploaded_image'] = row['uploaded_image'].name or None
+        row['followups'] = [
+            {'id': followup.id,
+             'created_date': followup.created_date,
+             'notes': followup.notes,
+             'file': followup.file.name or None}
+            for followup in ticket.followups.all()
+        ]
+        return row
+
+    def write_ndjson(self, stream, tickets):
+        count = 0
+        for ticket in tickets:
+            stream.write(json.dumps(self.ticket_to_dict(ticket),
+                                    cls=DjangoJSONEncoder))
+            stream.write('\n')
+            count += 1
+        return count
+
+    def write_csv(self, stream, tickets):
+        """ One row per ticket, follow-ups are embedded as a JSON column. """
+        writer = csv.DictWriter(stream, fieldnames=TICKET_FIELDS + ('followups',))
+        writer.writeheader()
+        count = 0
+        for ticket in tickets:
+            row = self.ticket_to_dict(ticket)
+            row['followups'] = json.dumps(row['followups'],
+                                          cls=DjangoJSONEncoder)
+            writer.writerow(row)
+            count += 1
+        return count
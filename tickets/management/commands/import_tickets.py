@@ -0,0 +1,164 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from associates.models import Associate, UserDepartment
+from tickets.models import Ticket, Category, TICKET_TYPES
+
+TICKET_TYPE_VALUES = {value for value, label in TICKET_TYPES}
+# JSON types accepted for each column, CSV values are always strings
+FIELD_TYPES = {'title': (str,), 'description': (str,), 'category': (str,),
+               'type': (str, int), 'department': (str, int),
+               'associate': (str, int)}
+
+
+def read_rows(path, file_format):
+    """ Lazily yield (line number, row dict) pairs from a CSV/NDJSON file. """
+    with open(path, newline='', encoding='utf-8') as f:
+        if file_format == 'csv':
+            # Line 1 is the header
+            yield from enumerate(csv.DictReader(f), start=2)
+        else:
+            for line_number, line in enumerate(f, start=1):
+                if line.strip():
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        row = {'_error': str(e)}
+                    if not isinstance(row, dict):
+                        row = {'_error': f'expected an object, got '
+                                         f'{type(row).__name__}'}
+                    yield line_number, row
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = ('Import tickets from a CSV or NDJSON file in validated, '
+            'set-based batches.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or NDJSON file to import.')
+        parser.add_argument('--format', choices=('csv', 'ndjson'),
+                            help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows validated and inserted per transaction.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Validate the file without inserting.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'{path} does not exist.')
+        file_format = options['format'] or (
+            'csv' if path.lower().endswith('.csv') else 'ndjson')
+
+        categories = Category.objects.registry()
+        imported = rejected = 0
+        started = time.monotonic()
+
+        for batch in batched(read_rows(path, file_format),
+                             options['batch_size']):
+            tickets, errors = self.build_batch(batch, categories)
+            for line_number, error in errors:
+                self.stderr.write(f'Line {line_number}: {error}')
+            rejected += len(errors)
+
+            if tickets and not options['dry_run']:
+                with transaction.atomic():
+                    Ticket.objects.bulk_create_assigned(
+                        tickets, assigned=categories.get('assigned'))
+            imported += len(tickets)
+
+        elapsed = time.monotonic() - started
+        rate = imported / elapsed if elapsed else imported
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(f'{verb} {imported} tickets, rejected {rejected} '
+                          f'rows in {elapsed:.2f}s ({rate:.0f} rows/sec).')
+
+    def build_batch(self, batch, categories):
+        """
+        Validate a batch of rows and build unsaved tickets. Departments and
+        associates are resolved with one query each for the whole batch.
+        """
+        department_ids = set()
+        associate_keys = set()
+        for line_number, row in batch:
+            department_ids.add(str(row.get('department') or ''))
+            associate_keys.add(str(row.get('associate') or ''))
+
+        departments = UserDepartment.objects.in_bulk(
+            [value for value in department_ids if value.isdigit()])
+        associate_ids = [value for value in associate_keys if value.isdigit()]
+        associate_emails = [value for value in associate_keys if '@' in value]
+        associates = {}
+        for associate in Associate.objects.filter(
+                Q(id__in=associate_ids) | Q(user__email__in=associate_emails)
+        ).select_related('user'):
+            associates[str(associate.id)] = associate
+            associates[associate.user.email] = associate
+
+        tickets, errors = [], []
+        for line_number, row in batch:
+            try:
+                tickets.append(self.build_ticket(row, departments, associates,
+                                                 categories))
+            except ValueError as e:
+                errors.append((line_number, e))
+        return tickets, errors
+
+    @staticmethod
+    def build_ticket(row, departments, associates, categories):
+        if '_error' in row:
+            raise ValueError(f'Invalid JSON: {row["_error"]}')
+        for name, types in FIELD_TYPES.items():
+            value = row.get(name)
+            if value is not None and (isinstance(value, bool)
+                                      or not isinstance(value, types)):
+                raise ValueError(f'Invalid {name}: {value!r}.')
+
+        title = (row.get('title') or '').strip()
+        if not title or len(title) > Ticket._meta.get_field('title').max_length:
+            raise ValueError('A title of at most 150 characters is required.')
+
+        try:
+            ticket_type = int(row.get('type'))
+        except (TypeError, ValueError):
+            ticket_type = None
+        if ticket_type not in TICKET_TYPE_VALUES:
+            raise ValueError(f'Invalid type: {row.get("type")!r}.')
+
+        department_key = str(row.get('department') or '')
+        department = (departments.get(int(department_key))
+                      if department_key.isdigit() else None)
+        if department is None:
+            raise ValueError(f'Unknown department: {department_key!r}.')
+
+        associate = None
+        if row.get('associate'):
+            associate = associates.get(str(row['associate']))
+            if associate is None or associate.department_id != department.id:
+                raise ValueError(f'Unknown associate in department '
+                                 f'{department.id}: {row["associate"]!r}.')
+
+        category = None
+        if row.get('category'):
+            category = categories.get(row['category'])
+            if category is None:
+                raise ValueError(f'Unknown category: {row["category"]!r}.')
+
+        ticket = Ticket(title=title, type=ticket_type, department=department,
+                        associate=associate, category=category)
+        if row.get('description'):
+            ticket.description = row['description']
+        return ticket
@@ -0,0 +1,186 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from associates.models import Associate, UserDepartment
+from tickets.models import (Ticket, Category, FollowUp, TicketCategoryCount,
+                            TicketTransition, CATEGORIES, TICKET_TYPES)
+from tickets.search import update_search_index
+
+User = get_user_model()
+
+WORDS = ('invoice', 'printer', 'login', 'server', 'report', 'contract',
+         'delivery', 'refund', 'network', 'license', 'meeting', 'backup',
+         'account', 'order', 'payment', 'update', 'access', 'migration')
+
+# Share of assigned tickets in each category, in CATEGORIES order
+CATEGORY_WEIGHTS = (30, 25, 15, 25, 5)
+
+
+@contextmanager
+def explicit_created_dates(*models):
+    """
+    Let bulk_create() keep the created_date set on each instance instead of
+    stamping the current time.
+    """
+    fields = [model._meta.get_field('created_date') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = ('Generate a synthetic dataset of departments, associates, '
+            'tickets and follow-ups with bulk_create.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--departments', type=int, default=1,
+                            help='Organizers (departments) to create.')
+        parser.add_argument('--associates', type=int, default=10,
+                            help='Associates per department.')
+        parser.add_argument('--tickets', type=int, default=1000,
+                            help='Tickets per department.')
+        parser.add_argument('--followups', type=int, default=2,
+                            help='Follow-ups per ticket.')
+        parser.add_argument('--days', type=int, default=365,
+                            help='Spread creation dates over this many days.')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--password', default='seed_password',
+                            help='Password of every generated user.')
+        parser.add_argument('--seed', type=int,
+                            help='Random seed, for a reproducible dataset.')
+
+    def handle(self, *args, **options):
+        if options['departments'] < 1 or options['tickets'] < 0:
+            raise CommandError('--departments must be at least 1 and '
+                               '--tickets at least 0.')
+        self.random = random.Random(options['seed'])
+        self.now = timezone.now()
+        self.days = max(options['days'], 1)
+        started = time.monotonic()
+
+        for name, label in CATEGORIES:
+            Category.objects.get_or_create(name=name)
+        self.categories = [Category.objects.by_name(name)
+                           for name, label in CATEGORIES]
+        self.completed = Category.objects.by_name('completed')
+
+        departments, associates = self.create_users(
+            options['departments'], options['associates'],
+            make_password(options['password']))
+
+        tickets = followups = 0
+        for department in departments:
+            for start in range(0, options['tickets'], options['batch_size']):
+                size = min(options['batch_size'], options['tickets'] - start)
+                with transaction.atomic(), \
+                        explicit_created_dates(Ticket, FollowUp):
+                    created = self.create_tickets(
+                        department, associates[department.id], size)
+                    tickets += len(created)
+                    followups += self.create_followups(
+                        created, options['followups'])
+                    update_search_index([ticket.id for ticket in created])
+            # One pass over the tickets instead of a rollup write per batch
+            # and day
+            call_command('backfill_ticket_stats', department=department.id,
+                         stdout=StringIO())
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'Created {len(departments)} departments, '
+            f'{sum(map(len, associates.values()))} associates, {tickets} '
+            f'tickets and {followups} follow-ups in {elapsed:.2f}s.')
+        self.stdout.write('Organizers: ' + ', '.join(
+            department.user.username for department in departments))
+
+    def create_users(self, departments, associates, password):
+        """ Create the organizers with their departments and associates. """
+        # Offset usernames so the command can be run again on the same data
+        offset = User.objects.order_by('-id').values_list('id', flat=True)[:1]
+        offset = (offset[0] if offset else 0) + 1
+
+        with transaction.atomic():
+            organizers = User.objects.bulk_create([
+                User(username=f'seed-organizer-{offset + i}',
+                     email=f'seed-organizer-{offset + i}@crm.com',
+                     first_name='Organizer', last_name=str(offset + i),
+                     password=password, is_organizer=True)
+                for i in range(departments)
+            ])
+            department_list = UserDepartment.objects.bulk_create([
+                UserDepartment(user=user) for user in organizers
+            ])
+
+            associate_users = User.objects.bulk_create([
+                User(username=f'seed-associate-{offset}-{d}-{i}',
+                     email=f'seed-associate-{offset}-{d}-{i}@crm.com',
+                     first_name='Associate', last_name=f'{d}-{i}',
+                     password=password, is_organizer=False,
+                     is_associate=True)
+                for d in range(departments) for i in range(associates)
+            ])
+            associate_list = Associate.objects.bulk_create([
+                Associate(user=user,
+                          department=department_list[index // associates])
+                for index, user in enumerate(associate_users)
+            ])
+
+        by_department = {department.id: [] for department in department_list}
+        for associate in associate_list:
+            by_department[associate.department_id].append(associate)
+        return department_list, by_department
+
+    def create_tickets(self, department, associates, size):
+        tickets = []
+        for i in range(size):
+            # Most tickets are assigned, a few still wait for an associate
+            associate = category = None
+            if associates and self.random.random() < 0.8:
+                associate = self.random.choice(associates)
+                category = self.random.choices(self.categories,
+                                               CATEGORY_WEIGHTS)[0]
+            words = self.random.sample(WORDS, 3)
+            created_date = self.now - timedelta(
+                seconds=self.random.randrange(self.days * 86400))
+            completed_date = None
+            if category == self.completed:
+                completed_date = min(self.now, created_date + timedelta(
+                    hours=self.random.randrange(1, 24 * 14)))
+            tickets.append(Ticket(
+                title=' '.join(words).capitalize(),
+                type=self.random.choice(TICKET_TYPES)[0],
+                description=f'Please look into the {words[0]} issue. ' * 5,
+                department=department, associate=associate,
+                category=category, created_date=created_date,
+                completed_date=completed_date,
+                category_date=completed_date or created_date))
+
+        # Every assigned ticket already has a category, as the pre_save
+        # receivers would ensure; the daily stats are rebuilt by handle()
+        tickets = Ticket.objects.bulk_create(tickets)
+        TicketCategoryCount.objects.add_tickets(tickets)
+        TicketTransition.objects.record_created(tickets)
+        return tickets
+
+    def create_followups(self, tickets, per_ticket):
+        followups = FollowUp.objects.bulk_create([
+            FollowUp(ticket=ticket, notes=f'Update {i + 1} on {ticket.title}.',
+                     created_date=min(self.now, ticket.created_date + timedelta(
+                         minutes=self.random.randrange(1, 60 * 24 * 7))))
+            for ticket in tickets for i in range(per_ticket)
+        ])
+        return len(followups)
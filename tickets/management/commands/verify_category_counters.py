@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from tickets.models import Ticket, TicketCategoryCount
+
+KEY = ('department_id', 'associate_id', 'category_id')
+
+
+class Command(BaseCommand):
+    help = ('Compare the TicketCategoryCount counters with the tickets '
+            'table and optionally repair any drift.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--department', type=int,
+                            help='Only check this UserDepartment id.')
+        parser.add_argument('--repair', action='store_true',
+                            help='Rewrite the counters that drifted.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            tickets = Ticket.objects.order_by()
+            counters = TicketCategoryCount.objects.order_by()
+            if options['department']:
+                tickets = tickets.filter(department_id=options['department'])
+                counters = counters.filter(
+                    department_id=options['department'])
+            if options['repair']:
+                # Keep the counters from moving while they are rewritten
+                list(counters.select_for_update().values_list('id'))
+
+            expected = {tuple(row[k] for k in KEY): row['total'] for row in
+                        tickets.values(*KEY).annotate(total=Count('id'))}
+            actual = {tuple(row[k] for k in KEY): row['total'] for row in
+                      counters.values(*KEY).annotate(total=Sum('count'))}
+
+            drifted = {key: expected.get(key, 0)
+                       for key in expected.keys() | actual.keys()
+                       if expected.get(key, 0) != actual.get(key, 0)}
+            for key, count in sorted(drifted.items(), key=str):
+                self.stdout.write(
+                    'department={} associate={} category={}: counter {}, '
+                    'actual {}'.format(*key, actual.get(key, 0), count))
+
+            if drifted and options['repair']:
+                for key, count in drifted.items():
+                    key = dict(zip(KEY, key))
+                    counters.filter(**key).delete()
+                    if count:
+                        TicketCategoryCount.objects.create(count=count, **key)
+
+        if not drifted:
+            self.stdout.write('Category counters are consistent.')
+        elif options['repair']:
+            self.stdout.write(f'Repaired {len(drifted)} counters.')
+        else:
+            raise CommandError(f'{len(drifted)} counters drifted, '
+                               f'run with --repair to fix them.')
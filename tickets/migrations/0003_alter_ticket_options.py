@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-18 07:23
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0002_alter_category_options'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='ticket',
+            options={'ordering': ('-created_date', '-id'), 'verbose_name': 'Ticket', 'verbose_name_plural': 'Tickets'},
+        ),
+    ]
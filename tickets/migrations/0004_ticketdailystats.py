@@ -0,0 +1,34 @@
+# Generated by Django 5.0.1 on 2026-10-18 07:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('associates', '0002_alter_user_email'),
+        ('tickets', '0003_alter_ticket_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('created_count', models.PositiveIntegerField(default=0)),
+                ('completed_count', models.PositiveIntegerField(default=0)),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='associates.userdepartment')),
+            ],
+            options={
+                'verbose_name': 'Ticket Daily Stats',
+                'verbose_name_plural': 'Ticket Daily Stats',
+                'ordering': ('department', 'date'),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='ticketdailystats',
+            constraint=models.UniqueConstraint(fields=('department', 'date'), name='unique_ticket_daily_stats'),
+        ),
+    ]
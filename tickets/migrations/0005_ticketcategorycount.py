@@ -0,0 +1,43 @@
+# Generated by Django 5.0.1 on 2026-10-18 07:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_tickets(apps, schema_editor):
+    Ticket = apps.get_model('tickets', 'Ticket')
+    TicketCategoryCount = apps.get_model('tickets', 'TicketCategoryCount')
+    groups = Ticket.objects.order_by().values(
+        'department_id', 'associate_id', 'category_id'
+    ).annotate(count=Count('id'))
+    TicketCategoryCount.objects.bulk_create(
+        [TicketCategoryCount(**group) for group in groups.iterator()],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('associates', '0002_alter_user_email'),
+        ('tickets', '0004_ticketdailystats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketCategoryCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0)),
+                ('associate', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='category_counts', to='associates.associate')),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ticket_counts', to='tickets.category')),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_counts', to='associates.userdepartment')),
+            ],
+            options={
+                'verbose_name': 'Ticket Category Count',
+                'verbose_name_plural': 'Ticket Category Counts',
+                'indexes': [models.Index(fields=['department', 'associate', 'category'], name='ticket_category_count_key')],
+            },
+        ),
+        migrations.RunPython(count_tickets, migrations.RunPython.noop),
+    ]
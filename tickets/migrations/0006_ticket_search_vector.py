@@ -0,0 +1,62 @@
+import django.contrib.postgres.search
+from django.db import migrations
+
+POSTGRES_FORWARD = [
+    'CREATE INDEX ticket_search_vector_gin ON tickets_ticket '
+    'USING gin (search_vector)',
+    """
+    UPDATE tickets_ticket t SET search_vector =
+        setweight(to_tsvector('english', coalesce(t.title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(t.description, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(
+            (SELECT string_agg(f.notes, ' ') FROM tickets_followup f
+             WHERE f.ticket_id = t.id), '')), 'C')
+    """,
+]
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE tickets_ticket_fts USING fts5("
+    "title, description, notes, tokenize='porter unicode61')",
+    """
+    INSERT INTO tickets_ticket_fts (rowid, title, description, notes)
+    SELECT t.id, t.title, t.description,
+           (SELECT group_concat(f.notes, ' ') FROM tickets_followup f
+            WHERE f.ticket_id = t.id)
+    FROM tickets_ticket t
+    """,
+]
+
+
+def create_search_index(apps, schema_editor):
+    """
+    The GIN index and the FTS5 table are vendor specific, so they are kept
+    out of the model state and created here.
+    """
+    statements = {'postgresql': POSTGRES_FORWARD,
+                  'sqlite': SQLITE_FORWARD}.get(schema_editor.connection.vendor,
+                                                [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX ticket_search_vector_gin')
+    elif schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE tickets_ticket_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0005_ticketcategorycount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.1 on 2026-10-18 07:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('associates', '0002_alter_user_email'),
+        ('tickets', '0006_ticket_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='followup',
+            index=models.Index(fields=['ticket', '-created_date'], name='followup_ticket_created'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['department', '-created_date', '-id'], name='ticket_department_created'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(condition=models.Q(('associate__isnull', True)), fields=['department', '-created_date', '-id'], name='ticket_unassigned_created'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['department', 'associate', 'category'], name='ticket_department_associate'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['department', 'category', 'completed_date'], name='ticket_department_completed'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.1 on 2026-10-18 07:58
+
+import tickets.models
+import tickets.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0007_ticket_followup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('size', models.BigIntegerField(default=0)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Blob',
+                'verbose_name_plural': 'Blobs',
+            },
+        ),
+        migrations.AlterField(
+            model_name='followup',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=tickets.storage.DedupStorage(), upload_to=tickets.models.upload_follow_ups),
+        ),
+        migrations.AlterField(
+            model_name='ticket',
+            name='uploaded_file',
+            field=models.FileField(blank=True, null=True, storage=tickets.storage.DedupStorage(), upload_to=tickets.models.ticket_upload_files),
+        ),
+        migrations.AlterField(
+            model_name='ticket',
+            name='uploaded_image',
+            field=models.ImageField(blank=True, null=True, storage=tickets.storage.DedupStorage(), upload_to=tickets.models.ticket_upload_files),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.1 on 2026-10-18 08:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0008_blob_attachment_storage'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='followup',
+            options={'ordering': ('-created_date', '-id'), 'verbose_name': 'FollowUp', 'verbose_name_plural': 'FollowUps'},
+        ),
+        migrations.RemoveIndex(
+            model_name='followup',
+            name='followup_ticket_created',
+        ),
+        migrations.AddIndex(
+            model_name='followup',
+            index=models.Index(fields=['ticket', '-created_date', '-id'], name='followup_ticket_created'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+import django.utils.timezone
+
+
+def backfill_updated_date(apps, schema_editor):
+    """ Existing tickets were last changed when created or completed. """
+    Ticket = apps.get_model('tickets', 'Ticket')
+    Ticket.objects.using(schema_editor.connection.alias).update(
+        updated_date=Coalesce('completed_date', 'created_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('associates', '0002_alter_user_email'),
+        ('tickets', '0009_followup_timeline_ordering'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='updated_date',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_updated_date, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['department', 'updated_date'], name='ticket_department_updated'),
+        ),
+    ]
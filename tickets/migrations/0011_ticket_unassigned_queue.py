@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 08:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('associates', '0002_alter_user_email'),
+        ('tickets', '0010_ticket_updated_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(condition=models.Q(('associate__isnull', True)), fields=['department', 'type', 'created_date', 'id'], name='ticket_unassigned_queue'),
+        ),
+    ]
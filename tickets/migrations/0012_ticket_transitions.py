@@ -0,0 +1,71 @@
+# Generated by Django 5.0.1 on 2026-10-18 08:23
+
+import datetime
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_category_date(apps, schema_editor):
+    """
+    Completed tickets entered their category when completed, for the
+    others the creation date is the best known bound.
+    """
+    Ticket = apps.get_model('tickets', 'Ticket')
+    Ticket.objects.using(schema_editor.connection.alias).update(
+        category_date=Coalesce('completed_date', 'created_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('associates', '0002_alter_user_email'),
+        ('tickets', '0011_ticket_unassigned_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='category_date',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill_category_date,
+                             migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='TicketDwellStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('total', models.DurationField(default=datetime.timedelta)),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='dwell_stats', to='tickets.category')),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dwell_stats', to='associates.userdepartment')),
+            ],
+            options={
+                'verbose_name': 'Ticket Dwell Stats',
+                'verbose_name_plural': 'Ticket Dwell Stats',
+                'indexes': [models.Index(fields=['department', 'category', 'bucket'], name='ticket_dwell_stats_key')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TicketTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dwell', models.DurationField(blank=True, null=True)),
+                ('created_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ticket_transitions', to='associates.userdepartment')),
+                ('from_associate', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='associates.associate')),
+                ('from_category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tickets.category')),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transitions', to='tickets.ticket')),
+                ('to_associate', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='associates.associate')),
+                ('to_category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tickets.category')),
+            ],
+            options={
+                'verbose_name': 'Ticket Transition',
+                'verbose_name_plural': 'Ticket Transitions',
+                'ordering': ('created_date', 'id'),
+                'indexes': [models.Index(fields=['ticket', 'created_date'], name='ticket_transition_ticket')],
+            },
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.0.1 on 2026-10-18 08:25
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+import tickets.models
+import tickets.storage
+from django.db import migrations, models
+
+
+def create_search_index(apps, schema_editor):
+    """ Archived tickets keep their tsvector, searched like in 0006. """
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX archived_ticket_search_vector_gin '
+            'ON tickets_archivedticket USING gin (search_vector)')
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX archived_ticket_search_vector_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('associates', '0002_alter_user_email'),
+        ('tickets', '0012_ticket_transitions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTicket',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=150)),
+                ('type', models.IntegerField(choices=[(1, 'Type 1'), (2, 'Type 2'), (3, 'Type 3')])),
+                ('description', models.TextField(default='Describe your task here.')),
+                ('uploaded_file', models.FileField(blank=True, null=True, storage=tickets.storage.DedupStorage(), upload_to=tickets.models.ticket_upload_files)),
+                ('uploaded_image', models.ImageField(blank=True, null=True, storage=tickets.storage.DedupStorage(), upload_to=tickets.models.ticket_upload_files)),
+                ('created_date', models.DateTimeField()),
+                ('completed_date', models.DateTimeField(blank=True, null=True)),
+                ('updated_date', models.DateTimeField()),
+                ('category_date', models.DateTimeField()),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+                ('associate', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='associates.associate')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tickets.category')),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='associates.userdepartment')),
+            ],
+            options={
+                'verbose_name': 'Archived Ticket',
+                'verbose_name_plural': 'Archived Tickets',
+                'ordering': ('-created_date', '-id'),
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedFollowUp',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('created_date', models.DateTimeField()),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('file', models.FileField(blank=True, null=True, storage=tickets.storage.DedupStorage(), upload_to=tickets.models.upload_follow_ups)),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='followups', to='tickets.archivedticket')),
+            ],
+            options={
+                'verbose_name': 'Archived FollowUp',
+                'verbose_name_plural': 'Archived FollowUps',
+                'ordering': ('-created_date', '-id'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedticket',
+            index=models.Index(fields=['department', '-created_date', '-id'], name='archived_ticket_department'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedfollowup',
+            index=models.Index(fields=['ticket', '-created_date', '-id'], name='archived_followup_ticket'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.1 on 2026-10-18 08:37
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicates(apps, schema_editor):
+    """ Fold the rows concurrent first writers created for a key into one. """
+    TicketDwellStats = apps.get_model('tickets', 'TicketDwellStats')
+    counters = TicketDwellStats.objects.using(
+        schema_editor.connection.alias).order_by()
+    duplicates = counters.values(
+        'department_id', 'category_id', 'bucket'
+    ).annotate(rows=Count('id'), first=Min('id'), count_sum=Sum('count'),
+               total_sum=Sum('total')).filter(rows__gt=1)
+    for group in duplicates:
+        key = {'department_id': group['department_id'],
+               'category_id': group['category_id'],
+               'bucket': group['bucket']}
+        counters.filter(**key).exclude(pk=group['first']).delete()
+        counters.filter(pk=group['first']).update(count=group['count_sum'],
+                                                  total=group['total_sum'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('associates', '0002_alter_user_email'),
+        ('tickets', '0014_unique_ticket_category_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ticketdwellstats',
+            constraint=models.UniqueConstraint(fields=('department', 'category', 'bucket'), name='unique_ticket_dwell_stats', nulls_distinct=False),
+        ),
+        migrations.RemoveIndex(
+            model_name='ticketdwellstats',
+            name='ticket_dwell_stats_key',
+        ),
+    ]
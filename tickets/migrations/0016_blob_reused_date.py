@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 08:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0015_unique_ticket_dwell_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blob',
+            name='reused_date',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.1 on 2026-10-18 08:55
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicates(apps, schema_editor):
+    """
+    Fold the rows created for a key while the previous constraint was not
+    enforced (SQLite, PostgreSQL before 15) into one.
+    """
+    TicketCategoryCount = apps.get_model('tickets', 'TicketCategoryCount')
+    counters = TicketCategoryCount.objects.using(
+        schema_editor.connection.alias).order_by()
+    duplicates = counters.values(
+        'department_id', 'associate_id', 'category_id'
+    ).annotate(rows=Count('id'), first=Min('id'), total=Sum('count')
+               ).filter(rows__gt=1)
+    for group in duplicates:
+        key = {'department_id': group['department_id'],
+               'associate_id': group['associate_id'],
+               'category_id': group['category_id']}
+        counters.filter(**key).exclude(pk=group['first']).delete()
+        counters.filter(pk=group['first']).update(count=group['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('associates', '0002_alter_user_email'),
+        ('tickets', '0016_blob_reused_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='ticketcategorycount',
+            name='unique_ticket_category_count',
+        ),
+        migrations.AddConstraint(
+            model_name='ticketcategorycount',
+            constraint=models.UniqueConstraint(models.F('department'), django.db.models.functions.comparison.Coalesce('associate', 0), django.db.models.functions.comparison.Coalesce('category', 0), name='unique_ticket_category_count_key'),
+        ),
+    ]
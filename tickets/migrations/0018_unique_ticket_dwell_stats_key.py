@@ -0,0 +1,46 @@
+# Generated by Django 5.0.1 on 2026-10-18 08:56
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicates(apps, schema_editor):
+    """
+    Fold the rows created for a key while the previous constraint was not
+    enforced (SQLite, PostgreSQL before 15) into one.
+    """
+    TicketDwellStats = apps.get_model('tickets', 'TicketDwellStats')
+    counters = TicketDwellStats.objects.using(
+        schema_editor.connection.alias).order_by()
+    duplicates = counters.values(
+        'department_id', 'category_id', 'bucket'
+    ).annotate(rows=Count('id'), first=Min('id'), count_sum=Sum('count'),
+               total_sum=Sum('total')).filter(rows__gt=1)
+    for group in duplicates:
+        key = {'department_id': group['department_id'],
+               'category_id': group['category_id'],
+               'bucket': group['bucket']}
+        counters.filter(**key).exclude(pk=group['first']).delete()
+        counters.filter(pk=group['first']).update(count=group['count_sum'],
+                                                  total=group['total_sum'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('associates', '0002_alter_user_email'),
+        ('tickets', '0017_unique_ticket_category_count_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='ticketdwellstats',
+            name='unique_ticket_dwell_stats',
+        ),
+        migrations.AddConstraint(
+            model_name='ticketdwellstats',
+            constraint=models.UniqueConstraint(models.F('department'), django.db.models.functions.comparison.Coalesce('category', 0), models.F('bucket'), name='unique_ticket_dwell_stats_key'),
+        ),
+    ]
@@ -1,7 +1,19 @@
+import hashlib
+
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import Http404
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response
 from django.urls import reverse
+from django.utils.http import urlencode
 
-from tickets.models import Ticket, FollowUp
+from associates import roles
+from tickets.models import Ticket, FollowUp, Category
+from tickets.pagination import KeysetPaginator, InvalidCursor
 
 
 class TicketFormAndUrlMixin:
@@ -18,7 +30,7 @@ class TicketFormAndUrlMixin:
         dict: Keyword arguments for form instantiation, including 'user_department'.
         """
         kwargs = super().get_form_kwargs()
-        kwargs['user_department'] = self.request.user.userdepartment
+        kwargs['user_department'] = self.request.role.department_id
         return kwargs
 
     def get_success_url(self):
@@ -31,17 +43,8 @@ class TicketQuerysetMixin:
     """
 
     def get_queryset(self):
-        user = self.request.user
-
-        if user.is_organizer:
-            # For organizers, show all tickets in the user's department
-            queryset = Ticket.objects.filter(department=user.userdepartment)
-        else:
-            # For associates, show only their assigned tickets
-            queryset = Ticket.objects.filter(
-                department=user.associate.department, associate=user.associate)
-
-        return queryset
+        # Organizers see their department, associates their assigned tickets
+        return Ticket.objects.visible_to(self.request.role).for_detail()
 
 
 class FollowUpMixin(LoginRequiredMixin):
@@ -51,19 +54,146 @@ class FollowUpMixin(LoginRequiredMixin):
     """
 
     def get_queryset(self):
-        user = self.request.user
-
-        if user.is_organizer:
-            # Filter for the entire department
-            queryset = FollowUp.objects.filter(
-                ticket__department=user.userdepartment)
-        else:
-            queryset = FollowUp.objects.filter(
-                ticket__department=user.associate.department)
+        role = self.request.role
+
+        # Filter for the entire department
+        queryset = FollowUp.objects.filter(
+            ticket__department_id=role.department_id)
+        if not role.is_organizer:
             # Filter for the specific associate
-            queryset = queryset.filter(ticket__associate__user=user)
+            queryset = queryset.filter(ticket__associate_id=role.associate_id)
         return queryset
 
     def get_success_url(self):
         return reverse('tickets:ticket-detail',
                        kwargs={'pk': self.get_object().ticket.id})
+
+
+class FollowUpTimelineMixin:
+    """
+    This mixin includes method for getting a keyset page of a ticket's
+    follow-ups, newest first, whose next_url loads the older ones from the
+    follow-up list fragment.
+    """
+    followups_page_size = None
+
+    def get_followup_page(self, ticket_id, cursor=None):
+        paginator = KeysetPaginator(
+            FollowUp.objects.filter(ticket_id=ticket_id),
+            self.followups_page_size or settings.FOLLOWUPS_PAGE_SIZE)
+        try:
+            page = paginator.page(cursor)
+        except InvalidCursor as e:
+            raise Http404(str(e))
+
+        page.next_url = None
+        if page.has_next():
+            page.next_url = '{}?{}'.format(
+                reverse('tickets:ticket-followup-list', args=(ticket_id,)),
+                urlencode({'cursor': page.next_cursor}))
+        return page
+
+
+class KeysetPaginationMixin:
+    """
+    This mixin replaces the OFFSET based pagination of ListView with
+    KeysetPaginator. The page size defaults to TICKETS_PAGE_SIZE and can be
+    lowered or raised per request with ?page_size= up to
+    TICKETS_MAX_PAGE_SIZE.
+    """
+    paginator_class = KeysetPaginator
+    cursor_kwarg = 'cursor'
+
+    def get_paginate_by(self, queryset):
+        try:
+            page_size = int(self.request.GET.get('page_size',
+                                                 settings.TICKETS_PAGE_SIZE))
+        except ValueError:
+            page_size = settings.TICKETS_PAGE_SIZE
+        return max(1, min(page_size, settings.TICKETS_MAX_PAGE_SIZE))
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        return self.paginator_class(queryset, per_page, **kwargs)
+
+    def get_keyset_page(self, queryset, cursor_kwarg, page_size=None):
+        """
+        Return the page selected by the request's cursor_kwarg parameter,
+        with next_url/previous_url querystrings that keep the other
+        request parameters (e.g. the cursor of another panel).
+        """
+        if page_size is None:
+            page_size = self.get_paginate_by(queryset)
+        paginator = self.get_paginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(cursor_kwarg))
+        except InvalidCursor as e:
+            raise Http404(str(e))
+
+        for attr, cursor in (('next_url', page.next_cursor),
+                             ('previous_url', page.previous_cursor)):
+            url = None
+            if cursor:
+                params = self.request.GET.copy()
+                params[cursor_kwarg] = cursor
+                url = f'?{params.urlencode()}'
+            setattr(page, attr, url)
+        return page
+
+    def paginate_queryset(self, queryset, page_size):
+        page = self.get_keyset_page(queryset, self.cursor_kwarg, page_size)
+        return page.paginator, page, page.object_list, page.has_other_pages()
+
+
+class ConditionalGetMixin:
+    """
+    This mixin answers GET requests with 304 Not Modified, before anything
+    is rendered, when the client's copy of the page is still current.
+
+    The ETag comes from a single Max(updated_date)/Count query over the
+    tickets the page shows, returned by get_conditional_queryset(). Saving a
+    ticket or its follow-ups bumps updated_date and the count changes when
+    tickets are deleted or archived; the ETag also covers the user, the
+    category registry and role versions, and the session and CSRF secret,
+    so that a page is never reused with the forms of a previous login.
+    There is no Last-Modified: a date alone misses tickets that leave the
+    page.
+    """
+
+    def get_conditional_queryset(self):
+        """ Return the tickets the page shows, or None to skip validation. """
+        return None
+
+    def get_etag(self):
+        queryset = self.get_conditional_queryset()
+        if queryset is None:
+            return None
+        state = queryset.order_by().aggregate(
+            last_modified=Max('updated_date'), count=Count('id'))
+        if not state['count']:
+            # Nothing to revalidate, and missing tickets must 404
+            return None
+        # Sets the secret up front if the page is about to create it
+        get_token(self.request)
+        key = ':'.join(str(value) for value in (
+            self.request.role.user_id, state['count'], state['last_modified'],
+            cache.get(Category.objects.version_key), roles.get_version(),
+            self.request.session.session_key,
+            self.request.META.get('CSRF_COOKIE')))
+        return f'"{hashlib.md5(key.encode()).hexdigest()}"'
+
+    def dispatch(self, request, *args, **kwargs):
+        # Pages with pending flash messages must be rendered to show them
+        if (request.method not in ('GET', 'HEAD')
+                or not request.user.is_authenticated
+                or len(get_messages(request))):
+            return super().dispatch(request, *args, **kwargs)
+
+        etag = self.get_etag()
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+        if etag is not None and response.status_code in (200, 304):
+            response.headers.setdefault('ETag', etag)
+            # Revalidate on every use instead of caching heuristically
+            response.headers.setdefault('Cache-Control', 'private, no-cache')
+        return response
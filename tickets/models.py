@@ -1,14 +1,276 @@
+import bisect
 import os
+import threading
+from collections import Counter, defaultdict, namedtuple
+from datetime import timedelta
 
-from django.db import models
+from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, models, transaction, IntegrityError
+from django.db.models.functions import Coalesce, Greatest
 from django.urls import reverse
+from django.utils import timezone
 
 from associates.models import Associate, UserDepartment
+from associates.roles import Role
+from tickets.downloads import download_filename
+from tickets.renditions import delete_renditions
+from tickets.search import update_search_index, remove_from_search_index
+from tickets.storage import attachment_storage, is_blob, BLOB_PREFIX
 
 
-class TicketManager(models.Manager):
-    def get_queryset(self):
-        return super().get_queryset()
+def scope_to(queryset, user):
+    """
+    Filter a queryset of tickets, or of rows with the ticket's department
+    and associate columns, to those visible to a user or Role.
+    """
+    if isinstance(user, Role):
+        if user.department_id is None:
+            return queryset.none()
+        if user.is_organizer:
+            return queryset.filter(department_id=user.department_id)
+        return queryset.filter(associate_id=user.associate_id,
+                               department_id=user.department_id)
+    if user.is_organizer:
+        return queryset.filter(department__user=user)
+    return queryset.filter(associate__user=user,
+                           department=models.F('associate__department'))
+
+
+class TicketQuerySet(models.QuerySet):
+    """
+    Role scoping and loading profiles for tickets.
+
+    Scoping takes the request's Role and filters on its ids, or a user and
+    joins through their department/associate row, instead of dereferencing
+    user.userdepartment or user.associate. The loading profiles join the
+    rows the templates print, so every page runs a fixed number of queries.
+    """
+
+    def visible_to(self, user):
+        """
+        Organizers see every ticket in their department, associates only the
+        tickets assigned to them.
+        """
+        return scope_to(self, user)
+
+    def editable_by(self, user):
+        """ Only organizers may update or delete tickets of their department. """
+        if user.is_organizer:
+            return scope_to(self, user)
+        return self.none()
+
+    def assigned(self):
+        return self.filter(associate__isnull=False)
+
+    def unassigned(self):
+        return self.filter(associate__isnull=True)
+
+    def for_detail(self):
+        return self.select_related(
+            'department__user', 'associate__user', 'category'
+        ).defer('search_vector')
+
+    def for_list(self):
+        return self.for_detail().defer('description')
+
+    # Set-based versions of the single ticket views. Each runs one UPDATE
+    # (or DELETE) and keeps the counters, daily stats and updated_date the
+    # signal receivers maintain on save, with their rules expressed in SQL.
+
+    def locked(self):
+        """
+        The tickets selected now, by id, locked until the end of the
+        transaction so the bookkeeping around an update sees the same rows.
+        """
+        ids = list(self.select_for_update().order_by().values_list(
+            'pk', flat=True))
+        return self.model.objects.using(self.db).filter(pk__in=ids)
+
+    def _update_counted(self, **values):
+        """
+        UPDATE the tickets, moving them between the category counters and
+        logging their category and associate transitions, as the signals
+        would for each ticket.
+        """
+        now = timezone.now()
+        before = {pk: values_before for pk, *values_before
+                  in self.order_by().values_list(
+                      'pk', 'department_id', 'category_id', 'associate_id',
+                      'category_date')}
+        updated = self.update(updated_date=now, **values)
+
+        tickets = self.model.objects.using(self.db).filter(pk__in=before)
+        deltas = Counter()
+        transitions = []
+        for pk, category_id, associate_id in tickets.order_by().values_list(
+                'pk', 'category_id', 'associate_id'):
+            department_id, old_category_id, old_associate_id, entered = (
+                before[pk])
+            transition = TicketTransition.for_change(
+                pk, department_id, (old_category_id, old_associate_id),
+                (category_id, associate_id), entered, now)
+            if transition is not None:
+                deltas[department_id, old_associate_id, old_category_id] -= 1
+                deltas[department_id, associate_id, category_id] += 1
+                transitions.append(transition)
+
+        for key, delta in deltas.items():
+            TicketCategoryCount.objects.add(*key, delta)
+        tickets.filter(pk__in=[
+            transition.ticket_id for transition in transitions
+            if transition.from_category_id != transition.to_category_id
+        ]).update(category_date=now)
+        TicketTransition.objects.record(transitions)
+        return updated
+
+    def bulk_assign(self, associate):
+        """
+        Assign the tickets to an associate, or unassign them with None. As
+        on save, tickets without a category become 'assigned' and
+        unassigned tickets lose their category.
+        """
+        if associate is None:
+            category = None
+        else:
+            assigned = Category.objects.by_name('assigned', create=True)
+            category = models.Case(
+                models.When(category__isnull=True, then=assigned.pk),
+                default=models.F('category'),
+                output_field=models.BigIntegerField())
+        with transaction.atomic(using=self.db):
+            return self.locked()._update_counted(associate=associate,
+                                                 category=category)
+
+    def bulk_set_category(self, category):
+        """
+        Set the category of the tickets that have an associate (unassigned
+        tickets have none). Tickets moved into 'completed' get their
+        completion date, counted in the daily stats.
+        """
+        values = {'category': models.Case(
+            models.When(associate__isnull=True, then=None),
+            default=category.pk, output_field=models.BigIntegerField())}
+        now = timezone.now()
+        completing = category.name == 'completed'
+        newly_completed = (models.Q(associate__isnull=False)
+                           & (models.Q(category__isnull=True)
+                              | ~models.Q(category=category)))
+        if completing:
+            values['completed_date'] = models.Case(
+                models.When(newly_completed, then=now),
+                default=models.F('completed_date'))
+
+        with transaction.atomic(using=self.db):
+            tickets = self.locked()
+            completed = []
+            if completing:
+                completed = list(tickets.filter(newly_completed).order_by()
+                                 .values('department_id')
+                                 .annotate(total=models.Count('id')))
+            updated = tickets._update_counted(**values)
+            for row in completed:
+                TicketDailyStats.objects.record(row['department_id'],
+                                                local_date(now),
+                                                completed=row['total'])
+        return updated
+
+    def bulk_delete(self):
+        """
+        Delete the tickets and their follow-ups without loading them or
+        sending a signal per row: uncount them, drop them from the search
+        index and release their attachments in grouped queries, then
+        delete the rows. Returns the number of tickets deleted.
+        """
+        with transaction.atomic(using=self.db):
+            ids = list(self.select_for_update().order_by().values_list(
+                'pk', flat=True))
+            tickets = self.model.objects.using(self.db).filter(pk__in=ids)
+            followups = FollowUp.objects.using(self.db).filter(
+                ticket_id__in=ids)
+            TicketCategoryCount.objects.add_queryset(tickets, sign=-1)
+            Blob.objects.release_queryset(tickets, ('uploaded_file',
+                                                    'uploaded_image'))
+            Blob.objects.release_queryset(followups, ('file',))
+            remove_from_search_index(ids, using=self.db)
+            # FollowUp and TicketTransition are the only models referring
+            # to tickets
+            followups._raw_delete(self.db)
+            TicketTransition.objects.using(self.db).filter(
+                ticket_id__in=ids)._raw_delete(self.db)
+            return tickets._raw_delete(self.db)
+
+    def claim_next(self, associate_id, department_id):
+        """
+        Assign the next unassigned ticket of a department to an associate
+        and return it, or None if there is none left. Tickets are handed
+        out by type in TICKET_CLAIM_ORDER, oldest first within a type.
+
+        The candidate is locked with SELECT ... FOR UPDATE SKIP LOCKED where
+        the database supports it, so concurrent claimers skip each other's
+        ticket instead of waiting for it. Without row locks (SQLite), claims
+        are serialized within the process, and the UPDATE, which sets the
+        associate and the 'assigned' category at once, only applies to a
+        ticket that is still unassigned, so no ticket is claimed twice.
+        """
+        if transaction.get_connection(
+                self.db).features.has_select_for_update_skip_locked:
+            return self._claim_next(associate_id, department_id,
+                                    skip_locked=True)
+        with _claim_lock:
+            return self._claim_next(associate_id, department_id)
+
+    def _claim_next(self, associate_id, department_id, skip_locked=False):
+        assigned = Category.objects.by_name('assigned', create=True)
+        queue = self.filter(department_id=department_id,
+                            associate__isnull=True)
+        with transaction.atomic(using=self.db):
+            for ticket_type in settings.TICKET_CLAIM_ORDER:
+                # One top-1 read of the ticket_unassigned_queue index per type
+                candidates = queue.filter(type=ticket_type).order_by(
+                    'created_date', 'id')
+                if skip_locked:
+                    candidates = candidates.select_for_update(
+                        skip_locked=True)
+                ticket_id = candidates.values_list('id', flat=True).first()
+                if ticket_id is None:
+                    continue
+                if queue.filter(pk=ticket_id)._update_counted(
+                        associate_id=associate_id, category=assigned):
+                    return self.model.objects.using(self.db).get(pk=ticket_id)
+        return None
+
+
+# Serializes claim_next() on databases without SKIP LOCKED
+_claim_lock = threading.Lock()
+
+
+class TicketManager(models.Manager.from_queryset(TicketQuerySet)):
+
+    def bulk_create_assigned(self, tickets, batch_size=None, assigned=None):
+        """
+        bulk_create() skips the pre_save receivers of tickets/signals.py, so
+        apply their category rule to the whole batch first: a ticket with an
+        associate and no category becomes 'assigned' (looked up unless
+        given, or created like the bulk updates do), a ticket without an
+        associate has no category.
+        """
+        if assigned is None and any(t.associate_id and not t.category_id
+                                    for t in tickets):
+            assigned = Category.objects.by_name('assigned', create=True)
+
+        for ticket in tickets:
+            if ticket.associate_id is None:
+                ticket.category = None
+            elif ticket.category_id is None:
+                ticket.category = assigned
+        tickets = self.bulk_create(tickets, batch_size=batch_size)
+        TicketDailyStats.objects.record_tickets(tickets)
+        TicketCategoryCount.objects.add_tickets(tickets)
+        TicketTransition.objects.record_created(tickets)
+        update_search_index([ticket.id for ticket in tickets], using=self.db)
+        return tickets
 
 
 TICKET_TYPES = (
@@ -26,21 +288,64 @@ CATEGORIES = (
 )
 
 
+class TrackedModel(models.Model):
+    """
+    Remembers the values an instance was loaded with, so that signal
+    receivers can tell which fields a save changed without querying the
+    database again.
+    """
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Denormalized counters and blob references are written by
+        # post_save receivers, keep them in the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        # The saved values are what the next save is compared against
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            field.attname: field.get_prep_value(getattr(self, field.attname))
+            for field in self._meta.concrete_fields
+            if field.attname not in deferred
+        }
+
+    def get_loaded_value(self, attname, default=None):
+        """
+        Return the value `attname` had when the instance was loaded or last
+        saved (file fields as their name).
+        """
+        return getattr(self, '_loaded_values', {}).get(attname, default)
+
+
 def ticket_upload_files(instance, filename):
     """Generates the file path for ticket files based on ticket ID."""
     return os.path.join('ticket_files', f'ticket_{instance.id}', filename)
 
 
-class Ticket(models.Model):
+class Ticket(TrackedModel):
     title = models.CharField(max_length=150)
     type = models.IntegerField(choices=TICKET_TYPES)
     description = models.TextField(default='Describe your task here.')
     uploaded_file = models.FileField(null=True, blank=True,
-                                     upload_to=ticket_upload_files)
+                                     upload_to=ticket_upload_files,
+                                     storage=attachment_storage)
     uploaded_image = models.ImageField(null=True, blank=True,
-                                       upload_to=ticket_upload_files)
+                                       upload_to=ticket_upload_files,
+                                       storage=attachment_storage)
     created_date = models.DateTimeField(auto_now_add=True)
     completed_date = models.DateTimeField(null=True, blank=True)
+    # Also bumped when the ticket's follow-ups change, see tickets.signals
+    updated_date = models.DateTimeField(auto_now=True)
+    # When the ticket entered its current category, see tickets.signals
+    category_date = models.DateTimeField(default=timezone.now)
 
     department = models.ForeignKey(UserDepartment, on_delete=models.CASCADE)
     associate = models.ForeignKey(Associate, on_delete=models.SET_NULL,
@@ -49,13 +354,38 @@ class Ticket(models.Model):
     category = models.ForeignKey('Category', on_delete=models.SET_NULL,
                                  related_name='categories', null=True,
                                  blank=True)
+    # Maintained by tickets.search on PostgreSQL, unused elsewhere
+    search_vector = SearchVectorField(null=True, editable=False)
 
     objects = TicketManager()
 
     class Meta:
         verbose_name = 'Ticket'
         verbose_name_plural = 'Tickets'
-        ordering = ('-created_date',)
+        # The primary key breaks ties so keyset pagination is stable
+        ordering = ('-created_date', '-id')
+        indexes = [
+            # Ticket list pages, in their keyset order
+            models.Index(fields=('department', '-created_date', '-id'),
+                         name='ticket_department_created'),
+            # The unassigned panel only reads the tickets without associate
+            models.Index(fields=('department', '-created_date', '-id'),
+                         condition=models.Q(associate__isnull=True),
+                         name='ticket_unassigned_created'),
+            # Associates' tickets and the category pages
+            models.Index(fields=('department', 'associate', 'category'),
+                         name='ticket_department_associate'),
+            # Completed tickets on the dashboard
+            models.Index(fields=('department', 'category', 'completed_date'),
+                         name='ticket_department_completed'),
+            # Last-Modified/ETag of the ticket pages
+            models.Index(fields=('department', 'updated_date'),
+                         name='ticket_department_updated'),
+            # The next ticket to claim, by type and age
+            models.Index(fields=('department', 'type', 'created_date', 'id'),
+                         condition=models.Q(associate__isnull=True),
+                         name='ticket_unassigned_queue'),
+        ]
 
     def __str__(self):
         return f'{self.title}, id: {self.pk}'
@@ -64,9 +394,68 @@ class Ticket(models.Model):
         return reverse('tickets:ticket-detail', kwargs={'pk': self.pk})
 
 
+class CategoryManager(models.Manager):
+    """
+    Categories almost never change, so they are kept in a process-wide
+    registry that is loaded with a single query. Every process compares its
+    registry with a version key in the Django cache, which invalidate()
+    bumps whenever a category is saved or deleted.
+    """
+    version_key = 'tickets:category-registry-version'
+    _registry = None
+
+    def registry(self):
+        """ Return a {name: Category} dict of every category. """
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, 1)
+            version = cache.get(self.version_key)
+
+        registry = CategoryManager._registry
+        if registry is None or registry[0] != version:
+            # Cached past the request, so read from the primary
+            categories = {category.name: category for category
+                          in self.get_queryset().using(DEFAULT_DB_ALIAS)}
+            registry = CategoryManager._registry = (version, categories)
+        return registry[1]
+
+    def by_name(self, name, create=False):
+        """
+        Return the category with this name from the registry, creating it
+        if `create` is set. The returned instance is shared and must not be
+        modified.
+        """
+        try:
+            return self.registry()[name]
+        except KeyError:
+            if not create:
+                raise self.model.DoesNotExist(
+                    f'Category matching name={name!r} does not exist.')
+        category, created = self.get_or_create(name=name)
+        return category
+
+    def invalidate(self):
+        """
+        Drop this process's registry and bump the shared version. The bump
+        is repeated on commit so that no process caches the state of a
+        transaction that is still running.
+        """
+        CategoryManager._registry = None
+        self._bump_version()
+        transaction.on_commit(self._bump_version)
+
+    def _bump_version(self):
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.add(self.version_key, 1)
+
+
 class Category(models.Model):
     name = models.CharField(max_length=30, choices=CATEGORIES, unique=True)
 
+    objects = CategoryManager()
+
     class Meta:
         verbose_name = 'Category'
         verbose_name_plural = 'Categories'
@@ -83,17 +472,601 @@ def upload_follow_ups(instance, filename):
     return f'ticket_files/ticket_{instance.ticket.id}/ticket_followups/{filename}'
 
 
-class FollowUp(models.Model):
+class FollowUp(TrackedModel):
     ticket = models.ForeignKey(Ticket, related_name='followups',
                                on_delete=models.CASCADE)
     created_date = models.DateTimeField(auto_now_add=True)
     notes = models.TextField(blank=True, null=True)
-    file = models.FileField(null=True, blank=True, upload_to=upload_follow_ups)
+    file = models.FileField(null=True, blank=True, upload_to=upload_follow_ups,
+                            storage=attachment_storage)
 
     class Meta:
         verbose_name = 'FollowUp'
         verbose_name_plural = 'FollowUps'
-        ordering = ('-created_date',)
+        # The id breaks ties so the timeline can be paginated by keyset
+        ordering = ('-created_date', '-id')
+        indexes = [
+            models.Index(fields=('ticket', '-created_date', '-id'),
+                         name='followup_ticket_created'),
+        ]
 
     def __str__(self):
         return f'Ticket id: {self.ticket.id} FollowUp'
+
+    def get_file_display(self):
+        """ The name the attachment is downloaded as. """
+        return download_filename('followup', self.pk, self.file.name)
+
+
+class ArchivedTicketQuerySet(models.QuerySet):
+    """ Role scoping and loading profiles of archived tickets. """
+
+    def visible_to(self, user):
+        return scope_to(self, user)
+
+    def for_detail(self):
+        return self.select_related(
+            'department__user', 'associate__user', 'category'
+        ).defer('search_vector')
+
+    def for_list(self):
+        return self.for_detail().defer('description')
+
+
+class ArchivedTicket(models.Model):
+    """
+    A completed ticket moved out of tickets_ticket by archive_tickets. The
+    table has the columns of Ticket and keeps the ticket's id, so the rows
+    are copied with INSERT ... SELECT and the search index entries stay
+    valid. Only search and export read it, on request.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=150)
+    type = models.IntegerField(choices=TICKET_TYPES)
+    description = models.TextField(default='Describe your task here.')
+    uploaded_file = models.FileField(null=True, blank=True,
+                                     upload_to=ticket_upload_files,
+                                     storage=attachment_storage)
+    uploaded_image = models.ImageField(null=True, blank=True,
+                                       upload_to=ticket_upload_files,
+                                       storage=attachment_storage)
+    created_date = models.DateTimeField()
+    completed_date = models.DateTimeField(null=True, blank=True)
+    updated_date = models.DateTimeField()
+    category_date = models.DateTimeField()
+
+    department = models.ForeignKey(UserDepartment, on_delete=models.CASCADE,
+                                   related_name='+')
+    associate = models.ForeignKey(Associate, on_delete=models.SET_NULL,
+                                  related_name='+', null=True, blank=True)
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL,
+                                 related_name='+', null=True, blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ArchivedTicketQuerySet.as_manager()
+
+    is_archived = True
+
+    class Meta:
+        verbose_name = 'Archived Ticket'
+        verbose_name_plural = 'Archived Tickets'
+        ordering = ('-created_date', '-id')
+        indexes = [
+            models.Index(fields=('department', '-created_date', '-id'),
+                         name='archived_ticket_department'),
+        ]
+
+    def __str__(self):
+        return f'{self.title}, id: {self.pk} (archived)'
+
+    def get_absolute_url(self):
+        return reverse('tickets:archived-ticket-detail',
+                       kwargs={'pk': self.pk})
+
+
+class ArchivedFollowUp(models.Model):
+    """ A follow-up of an archived ticket, see ArchivedTicket. """
+    id = models.BigIntegerField(primary_key=True)
+    ticket = models.ForeignKey(ArchivedTicket, related_name='followups',
+                               on_delete=models.CASCADE)
+    created_date = models.DateTimeField()
+    notes = models.TextField(blank=True, null=True)
+    file = models.FileField(null=True, blank=True, upload_to=upload_follow_ups,
+                            storage=attachment_storage)
+
+    class Meta:
+        verbose_name = 'Archived FollowUp'
+        verbose_name_plural = 'Archived FollowUps'
+        ordering = ('-created_date', '-id')
+        indexes = [
+            models.Index(fields=('ticket', '-created_date', '-id'),
+                         name='archived_followup_ticket'),
+        ]
+
+    def __str__(self):
+        return f'Archived ticket id: {self.ticket_id} FollowUp'
+
+
+def local_date(value):
+    """ The date of a datetime in the current time zone, naive or aware. """
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return timezone.localdate(value)
+
+
+class TicketDailyStatsManager(models.Manager):
+
+    def record(self, department_id, date, created=0, completed=0):
+        """ Add to the counters of a department's day, creating the row. """
+        counters = {
+            'created_count': models.F('created_count') + created,
+            'completed_count': models.F('completed_count') + completed,
+        }
+        day = self.filter(department_id=department_id, date=date)
+        if day.update(**counters):
+            return
+        try:
+            with transaction.atomic():
+                self.create(department_id=department_id, date=date,
+                            created_count=created, completed_count=completed)
+        except IntegrityError:
+            # Another request created the row in the meantime
+            day.update(**counters)
+
+    def record_tickets(self, tickets):
+        """ Record a batch of newly created tickets, one write per day. """
+        days = {}
+        for ticket in tickets:
+            for attr, date_field in (('created', 'created_date'),
+                                     ('completed', 'completed_date')):
+                value = getattr(ticket, date_field)
+                if value is not None:
+                    key = (ticket.department_id, local_date(value))
+                    counts = days.setdefault(key, {'created': 0,
+                                                   'completed': 0})
+                    counts[attr] += 1
+        for (department_id, date), counts in days.items():
+            self.record(department_id, date, **counts)
+
+
+class TicketDailyStats(models.Model):
+    """
+    Per-department, per-day rollup of created and completed tickets, kept
+    up to date on ticket create/complete and rebuilt by the
+    backfill_ticket_stats command. Dashboard trends read this table instead
+    of scanning the tickets.
+    """
+    department = models.ForeignKey(UserDepartment, on_delete=models.CASCADE,
+                                   related_name='daily_stats')
+    date = models.DateField()
+    created_count = models.PositiveIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+
+    objects = TicketDailyStatsManager()
+
+    class Meta:
+        verbose_name = 'Ticket Daily Stats'
+        verbose_name_plural = 'Ticket Daily Stats'
+        ordering = ('department', 'date')
+        constraints = [
+            models.UniqueConstraint(fields=('department', 'date'),
+                                    name='unique_ticket_daily_stats'),
+        ]
+
+    def __str__(self):
+        return f'{self.department} {self.date}'
+
+
+class TicketCategoryCountManager(models.Manager):
+
+    def add(self, department_id, associate_id, category_id, delta):
+        """ Add delta to the counter of a (department, associate, category). """
+        if not delta:
+            return
+        counter = self.filter(department_id=department_id,
+                              associate_id=associate_id,
+                              category_id=category_id)
+        # A missing row is never created by a decrement: its tickets may be
+        # getting deleted along with their department.
+        if counter.update(count=models.F('count') + delta) or delta < 0:
+            return
+        try:
+            with transaction.atomic():
+                self.create(department_id=department_id,
+                            associate_id=associate_id,
+                            category_id=category_id, count=delta)
+        except IntegrityError:
+            # Another request created the row in the meantime
+            counter.update(count=models.F('count') + delta)
+
+    def add_tickets(self, tickets, sign=1):
+        """ Count (or with sign=-1 uncount) a batch of tickets. """
+        deltas = {}
+        for ticket in tickets:
+            key = (ticket.department_id, ticket.associate_id,
+                   ticket.category_id)
+            deltas[key] = deltas.get(key, 0) + sign
+        for key, delta in deltas.items():
+            self.add(*key, delta)
+
+    def add_queryset(self, queryset, sign=1):
+        """
+        Count (or with sign=-1 uncount) the tickets of a queryset with one
+        grouped query, for updates and deletes that bypass the signals.
+        """
+        groups = queryset.order_by().values(
+            'department_id', 'associate_id', 'category_id'
+        ).annotate(total=models.Count('id'))
+        for group in groups:
+            self.add(group['department_id'], group['associate_id'],
+                     group['category_id'], sign * group['total'])
+
+    def move(self, counters, **key):
+        """
+        Merge the given counter rows into the rows that have `key` replaced,
+        e.g. move(counters, associate_id=None) when an associate is deleted.
+        """
+        with transaction.atomic():
+            for counter in counters.select_for_update():
+                values = {'department_id': counter.department_id,
+                          'associate_id': counter.associate_id,
+                          'category_id': counter.category_id, **key}
+                counter.delete()
+                self.add(delta=counter.count, **values)
+
+    def counts_for(self, user):
+        """
+        Return {category id: ticket count} of the tickets visible to the
+        user, None being the tickets without a category.
+        """
+        counters = scope_to(self, user)
+        return dict(counters.order_by().values_list('category_id').annotate(
+            total=models.Sum('count')))
+
+
+class TicketCategoryCount(models.Model):
+    """
+    Denormalized number of tickets per (department, associate, category),
+    maintained by the ticket signals so the category list is a single
+    indexed read. verify_category_counters detects and repairs drift.
+    """
+    department = models.ForeignKey(UserDepartment, on_delete=models.CASCADE,
+                                   related_name='category_counts')
+    associate = models.ForeignKey(Associate, on_delete=models.CASCADE,
+                                  related_name='category_counts', null=True)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE,
+                                 related_name='ticket_counts', null=True)
+    count = models.IntegerField(default=0)
+
+    objects = TicketCategoryCountManager()
+
+    class Meta:
+        verbose_name = 'Ticket Category Count'
+        verbose_name_plural = 'Ticket Category Counts'
+        constraints = [
+            # One row per key, unassigned and uncategorized included: NULLs
+            # are distinct in a plain unique constraint on every backend,
+            # and nulls_distinct=False is only enforced by PostgreSQL 15+
+            models.UniqueConstraint(
+                'department',
+                Coalesce('associate', 0),
+                Coalesce('category', 0),
+                name='unique_ticket_category_count_key'),
+        ]
+
+    def __str__(self):
+        return f'{self.department} {self.associate} {self.category}: {self.count}'
+
+
+class TicketTransitionManager(models.Manager):
+
+    def record(self, transitions):
+        """ Insert a batch of transitions and add up their dwell times. """
+        if not transitions:
+            return []
+        transitions = self.bulk_create(transitions)
+        TicketDwellStats.objects.add_transitions(transitions)
+        return transitions
+
+    def record_created(self, tickets):
+        """
+        Log the creation of bulk-created tickets, as post_save does for
+        the others, dated when each ticket was created.
+        """
+        transitions = (
+            self.model.for_change(ticket.pk, ticket.department_id,
+                                  (None, None),
+                                  (ticket.category_id, ticket.associate_id),
+                                  None, ticket.created_date)
+            for ticket in tickets)
+        return self.record([transition for transition in transitions
+                            if transition is not None])
+
+
+class TicketTransition(models.Model):
+    """
+    Append-only log of the category and associate changes of tickets,
+    written by the ticket signals and the set-based TicketQuerySet updates.
+    """
+    ticket = models.ForeignKey(Ticket, on_delete=models.CASCADE,
+                               related_name='transitions')
+    department = models.ForeignKey(UserDepartment, on_delete=models.CASCADE,
+                                   related_name='ticket_transitions')
+    from_category = models.ForeignKey(Category, on_delete=models.SET_NULL,
+                                      related_name='+', null=True)
+    to_category = models.ForeignKey(Category, on_delete=models.SET_NULL,
+                                    related_name='+', null=True)
+    from_associate = models.ForeignKey(Associate, on_delete=models.SET_NULL,
+                                       related_name='+', null=True)
+    to_associate = models.ForeignKey(Associate, on_delete=models.SET_NULL,
+                                     related_name='+', null=True)
+    # Time spent in from_category, None if the category did not change
+    dwell = models.DurationField(null=True, blank=True)
+    created_date = models.DateTimeField(default=timezone.now)
+
+    objects = TicketTransitionManager()
+
+    class Meta:
+        verbose_name = 'Ticket Transition'
+        verbose_name_plural = 'Ticket Transitions'
+        ordering = ('created_date', 'id')
+        indexes = [
+            models.Index(fields=('ticket', 'created_date'),
+                         name='ticket_transition_ticket'),
+        ]
+
+    def __str__(self):
+        return (f'{self.ticket_id}: {self.from_category_id} -> '
+                f'{self.to_category_id}')
+
+    @classmethod
+    def for_change(cls, ticket_id, department_id, old, new, entered, now):
+        """
+        Return the transition of a ticket from the (category id, associate
+        id) pair `old` to `new`, or None if neither changed. `entered` is
+        when the ticket entered its old category.
+        """
+        if old == new:
+            return None
+        dwell = None
+        if old[0] != new[0] and entered is not None:
+            dwell = max(now - entered, timedelta(0))
+        return cls(ticket_id=ticket_id, department_id=department_id,
+                   from_category_id=old[0], to_category_id=new[0],
+                   from_associate_id=old[1], to_associate_id=new[1],
+                   dwell=dwell, created_date=now)
+
+
+# Upper bounds of the dwell time histogram buckets, the last bucket holds
+# everything longer
+DWELL_BUCKETS = tuple(timedelta(minutes=minutes) for minutes in (
+    1, 5, 15, 30, 60, 2 * 60, 4 * 60, 8 * 60, 24 * 60, 2 * 24 * 60,
+    4 * 24 * 60, 7 * 24 * 60, 14 * 24 * 60, 30 * 24 * 60))
+
+DwellSummary = namedtuple('DwellSummary', 'count mean p50 p90')
+
+
+def dwell_bucket(dwell):
+    return bisect.bisect_left(DWELL_BUCKETS, dwell)
+
+
+def dwell_percentile(histogram, count, fraction):
+    """
+    Estimate a percentile from a {bucket: count} histogram of `count`
+    dwell times, interpolating linearly within the bucket it falls in.
+    """
+    rank = fraction * count
+    seen = 0
+    for bucket in sorted(histogram):
+        in_bucket = histogram[bucket]
+        if in_bucket and seen + in_bucket >= rank:
+            lower = DWELL_BUCKETS[bucket - 1] if bucket else timedelta(0)
+            if bucket == len(DWELL_BUCKETS):
+                return lower
+            upper = DWELL_BUCKETS[bucket]
+            return lower + (upper - lower) * ((rank - seen) / in_bucket)
+        seen += in_bucket
+    return None
+
+
+class TicketDwellStatsManager(models.Manager):
+
+    def add(self, department_id, category_id, bucket, count, total):
+        """ Add dwell times to a (department, category, bucket) counter. """
+        counter = self.filter(department_id=department_id,
+                              category_id=category_id, bucket=bucket)
+        values = {'count': models.F('count') + count,
+                  'total': models.F('total') + total}
+        if counter.update(**values):
+            return
+        try:
+            with transaction.atomic():
+                self.create(department_id=department_id,
+                            category_id=category_id, bucket=bucket,
+                            count=count, total=total)
+        except IntegrityError:
+            # Another request created the row in the meantime
+            counter.update(**values)
+
+    def add_transitions(self, transitions):
+        """ Add the dwell times of a batch of transitions, grouped. """
+        groups = {}
+        for transition in transitions:
+            if transition.dwell is None:
+                continue
+            key = (transition.department_id, transition.from_category_id,
+                   dwell_bucket(transition.dwell))
+            count, total = groups.get(key, (0, timedelta(0)))
+            groups[key] = (count + 1, total + transition.dwell)
+        for key, (count, total) in groups.items():
+            self.add(*key, count, total)
+
+    def report(self, department_id):
+        """
+        Return {category id: DwellSummary} of the time the tickets of a
+        department spent in each category before leaving it, None being
+        the tickets without a category. Reads at most one row per category
+        and bucket, whatever the length of the transition log.
+        """
+        rows = self.filter(department_id=department_id).order_by().values_list(
+            'category_id', 'bucket').annotate(
+            count=models.Sum('count'), total=models.Sum('total'))
+        histograms = defaultdict(dict)
+        totals = defaultdict(timedelta)
+        for category_id, bucket, count, total in rows:
+            histograms[category_id][bucket] = count
+            totals[category_id] += total
+
+        report = {}
+        for category_id, histogram in histograms.items():
+            count = sum(histogram.values())
+            if not count:
+                continue
+            report[category_id] = DwellSummary(
+                count, round_seconds(totals[category_id] / count),
+                round_seconds(dwell_percentile(histogram, count, 0.5)),
+                round_seconds(dwell_percentile(histogram, count, 0.9)))
+        return report
+
+
+def round_seconds(duration):
+    return timedelta(seconds=round(duration.total_seconds()))
+
+
+class TicketDwellStats(models.Model):
+    """
+    Histogram of the time tickets spent in a category before leaving it,
+    per department, maintained from the transitions as they are recorded so
+    that SLA reports never replay the log. Bucket i counts the dwell times
+    up to DWELL_BUCKETS[i], the last bucket the longer ones.
+    """
+    department = models.ForeignKey(UserDepartment, on_delete=models.CASCADE,
+                                   related_name='dwell_stats')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE,
+                                 related_name='dwell_stats', null=True)
+    bucket = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+    total = models.DurationField(default=timedelta)
+
+    objects = TicketDwellStatsManager()
+
+    class Meta:
+        verbose_name = 'Ticket Dwell Stats'
+        verbose_name_plural = 'Ticket Dwell Stats'
+        constraints = [
+            # The time before a ticket's first category is counted without
+            # a category, coalesced to 0 for those rows to be unique on
+            # every backend as well
+            models.UniqueConstraint('department', Coalesce('category', 0),
+                                    'bucket',
+                                    name='unique_ticket_dwell_stats_key'),
+        ]
+
+    def __str__(self):
+        return f'{self.department} {self.category} {self.bucket}: {self.count}'
+
+
+# How long an unreferenced blob is kept after an upload found it stored,
+# for the reference of that upload to be saved
+BLOB_REUSE_GRACE = timedelta(hours=1)
+
+
+class BlobManager(models.Manager):
+    """
+    Reference counting of the files stored by tickets.storage.DedupStorage.
+    Names outside of it (uploads from before it was introduced) are ignored.
+    """
+
+    def reuse(self, name):
+        """
+        Return whether the blob `name` is stored, for an upload of the same
+        content. The check holds the row lock purge() takes, and keeps the
+        blob from being purged until the upload saved its reference.
+        """
+        with transaction.atomic(using=self.db):
+            self.filter(name=name).update(reused_date=timezone.now())
+            return attachment_storage.exists(name)
+
+    def retain(self, name):
+        """ Count one more attachment referring to the blob `name`. """
+        if not is_blob(name):
+            return
+        # The reference of an upload that reused the blob is now saved
+        retained = {'refcount': models.F('refcount') + 1, 'reused_date': None}
+        if self.filter(name=name).update(**retained):
+            return
+        try:
+            size = attachment_storage.size(name)
+        except OSError:
+            size = 0
+        try:
+            with transaction.atomic():
+                self.create(name=name, sha256=os.path.basename(name)[:64],
+                            size=size, refcount=1)
+        except IntegrityError:
+            # Created concurrently
+            self.filter(name=name).update(**retained)
+
+    def release(self, name, count=1):
+        """
+        Count `count` attachments less referring to the blob `name` and
+        delete it once the transaction commits if nothing refers to it
+        anymore.
+        """
+        if not is_blob(name):
+            return
+        self.filter(name=name, refcount__gt=0).update(
+            refcount=Greatest(models.F('refcount') - count, 0))
+        transaction.on_commit(lambda: self.purge(name), using=self.db)
+
+    def release_queryset(self, queryset, fields):
+        """
+        Release the blobs the `fields` of a queryset's rows refer to, one
+        update per distinct blob, for deletes that bypass the signals.
+        """
+        references = Counter()
+        for field in fields:
+            references.update(dict(
+                queryset.filter(**{f'{field}__startswith': BLOB_PREFIX})
+                .order_by().values_list(field)
+                .annotate(count=models.Count('id'))))
+        for name, count in references.items():
+            self.release(name, count)
+
+    def purge(self, name):
+        """
+        Delete the blob `name` if it is unreferenced and no upload reused it
+        within BLOB_REUSE_GRACE. Those are left for dedupe_attachments.
+        """
+        with transaction.atomic(using=self.db):
+            blob = self.select_for_update().filter(
+                name=name, refcount=0).exclude(
+                reused_date__gt=timezone.now() - BLOB_REUSE_GRACE).first()
+            if blob is None:
+                return
+            attachment_storage.delete(name)
+            delete_renditions(os.path.basename(name)[:64])
+            blob.delete()
+
+
+class Blob(models.Model):
+    """
+    A file stored once by DedupStorage, with the number of ticket and
+    follow-up attachments referring to it.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.BigIntegerField(default=0)
+    refcount = models.PositiveIntegerField(default=0)
+    created_date = models.DateTimeField(auto_now_add=True)
+    # Last time an upload found the blob already stored
+    reused_date = models.DateTimeField(null=True, blank=True)
+
+    objects = BlobManager()
+
+    class Meta:
+        verbose_name = 'Blob'
+        verbose_name_plural = 'Blobs'
+
+    def __str__(self):
+        return f'{self.name} ({self.refcount} references)'
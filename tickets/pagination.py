@@ -0,0 +1,137 @@
+import base64
+import binascii
+import json
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+class KeysetPage:
+    """
+    A single page of results produced by KeysetPaginator.
+
+    Mirrors the parts of django.core.paginator.Page used by templates and
+    ListView, but exposes cursors instead of page numbers.
+    """
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset by seeking past the last row seen instead of using
+    OFFSET, so a page costs the same however deep the user scrolls.
+
+    The ordering must be unique (e.g. end with the primary key) for the
+    cursors to be stable. Cursors are opaque, URL-safe tokens that encode
+    the direction and the ordering values of the row to seek from.
+    """
+    NEXT = 'n'
+    PREVIOUS = 'p'
+
+    def __init__(self, queryset, per_page, ordering=None):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering or queryset.model._meta.ordering)
+        self.fields = [
+            queryset.model._meta.get_field(name.lstrip('-'))
+            for name in self.ordering
+        ]
+
+    def encode_cursor(self, obj, direction):
+        values = [field.value_to_string(obj) for field in self.fields]
+        token = json.dumps([direction, values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(token.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padding = '=' * (-len(cursor) % 4)
+            direction, values = json.loads(
+                base64.urlsafe_b64decode(cursor + padding))
+            if (direction not in (self.NEXT, self.PREVIOUS)
+                    or len(values) != len(self.fields)):
+                raise ValueError
+            values = [field.to_python(value)
+                      for field, value in zip(self.fields, values)]
+        except (TypeError, ValueError, binascii.Error) as e:
+            raise InvalidCursor('Invalid cursor.') from e
+        return direction, values
+
+    def _seek(self, values, reverse):
+        """
+        Build the lexicographic "rows after this key" condition, e.g. for
+        ('-created_date', '-id'):
+        created_date < v0 OR (created_date = v0 AND id < v1)
+        """
+        condition = Q()
+        equal = Q()
+        for name, value in zip(self.ordering, values):
+            descending = name.startswith('-')
+            lookup = 'lt' if descending != reverse else 'gt'
+            name = name.lstrip('-')
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def page(self, cursor=None):
+        """ Return the KeysetPage that starts right after the given cursor. """
+        direction, values = self.NEXT, None
+        if cursor:
+            direction, values = self.decode_cursor(cursor)
+        backwards = direction == self.PREVIOUS
+
+        ordering = self.ordering
+        if backwards:
+            ordering = tuple(name[1:] if name.startswith('-') else f'-{name}'
+                             for name in ordering)
+
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, backwards))
+
+        # Fetch one extra row to know whether there is another page
+        object_list = list(queryset[:self.per_page + 1])
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+        if backwards:
+            object_list.reverse()
+
+        next_cursor = previous_cursor = None
+        if object_list:
+            if has_more or backwards:
+                next_cursor = self.encode_cursor(object_list[-1], self.NEXT)
+            if (has_more and backwards) or (values is not None
+                                            and not backwards):
+                previous_cursor = self.encode_cursor(object_list[0],
+                                                     self.PREVIOUS)
+        return KeysetPage(object_list, self, next_cursor, previous_cursor)
@@ -0,0 +1,152 @@
+"""
+Downscaled renditions of Ticket.uploaded_image.
+
+Each image gets a list thumbnail, a detail-size preview and a normalized
+original: rotated according to its EXIF orientation, stripped of EXIF data
+and capped in size. They are generated in one decode by the
+'generate_renditions' job queued when an image is uploaded, or on the first
+request for them, and cached under renditions/ keyed by the SHA-256 of the
+source, so tickets sharing an image share its renditions too.
+"""
+import hashlib
+import logging
+import os
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from tickets.storage import attachment_storage, is_blob, CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Variant: bounding box, largest first so each one is scaled from the last
+RENDITIONS = {
+    'original': (2048, 2048),
+    'preview': (800, 800),
+    'thumb': (160, 160),
+}
+JPEG_QUALITY = 85
+# How long the digest of a file stored outside of the blobs is cached
+SOURCE_HASH_TIMEOUT = 30 * 24 * 3600
+
+
+def source_hash(name):
+    """
+    SHA-256 of a stored image, taken from its name for blobs, or None if
+    the file is missing. Other files are hashed once per version: the
+    digest is cached under their name, size and modification time.
+    """
+    if is_blob(name):
+        return os.path.splitext(os.path.basename(name))[0]
+    try:
+        version = (f'{name}:{attachment_storage.size(name)}:'
+                   f'{attachment_storage.get_modified_time(name).timestamp()}')
+        key = f'renditions:source:{hashlib.md5(version.encode()).hexdigest()}'
+        digest = cache.get(key)
+        if digest is None:
+            hasher = hashlib.sha256()
+            with attachment_storage.open(name) as f:
+                for chunk in f.chunks(CHUNK_SIZE):
+                    hasher.update(chunk)
+            digest = hasher.hexdigest()
+            cache.set(key, digest, SOURCE_HASH_TIMEOUT)
+    except OSError:
+        return None
+    return digest
+
+
+def rendition_name(digest, variant, extension):
+    return f'renditions/{digest[:2]}/{digest}/{variant}{extension}'
+
+
+def save_rendition(name, content):
+    """
+    Store a rendition under exactly `name`. Concurrent generations of the
+    same image write the same bytes, so a copy the storage had to save
+    under another name is dropped.
+    """
+    if default_storage.exists(name):
+        return name
+    saved = default_storage.save(name, content)
+    if saved != name:
+        default_storage.delete(saved)
+    return name
+
+
+def find_rendition(digest, variant):
+    """ Return the stored name of a rendition, or None if not generated. """
+    for extension in ('.jpg', '.png'):
+        name = rendition_name(digest, variant, extension)
+        if default_storage.exists(name):
+            return name
+    return None
+
+
+def generate_renditions(name):
+    """
+    Generate the missing renditions of the image `name`. Return a
+    {variant: stored name} dict, empty if the file is not a readable image.
+    """
+    digest = source_hash(name)
+    if digest is None:
+        return {}
+    renditions = {variant: find_rendition(digest, variant)
+                  for variant in RENDITIONS}
+    if all(renditions.values()):
+        return renditions
+
+    try:
+        with attachment_storage.open(name) as f, Image.open(f) as image:
+            # Let the JPEG decoder scale down while decoding
+            image.draft('RGB', RENDITIONS['original'])
+            image = ImageOps.exif_transpose(image)
+            transparent = (image.mode in ('RGBA', 'LA', 'PA')
+                           or 'transparency' in image.info)
+            image = image.convert('RGBA' if transparent else 'RGB')
+
+            for variant, size in RENDITIONS.items():
+                image.thumbnail(size, Image.LANCZOS)
+                if renditions[variant]:
+                    continue
+                buffer = BytesIO()
+                # EXIF and other metadata are not written unless passed
+                if transparent:
+                    image.save(buffer, 'PNG', optimize=True)
+                else:
+                    image.save(buffer, 'JPEG', quality=JPEG_QUALITY,
+                               optimize=True, progressive=True)
+                extension = '.png' if transparent else '.jpg'
+                renditions[variant] = save_rendition(
+                    rendition_name(digest, variant, extension),
+                    ContentFile(buffer.getvalue()))
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+        logger.warning('Could not generate renditions of %s', name,
+                       exc_info=True)
+        return {}
+    return renditions
+
+
+def get_rendition(name, variant):
+    """
+    Return the stored name of a rendition of the image `name`, generating
+    the renditions if they are missing, or None if that fails.
+    """
+    digest = source_hash(name)
+    if digest is None:
+        return None
+    rendition = find_rendition(digest, variant)
+    if rendition is None:
+        rendition = generate_renditions(name).get(variant)
+    return rendition
+
+
+def delete_renditions(digest):
+    """ Delete the cached renditions of the image with this SHA-256. """
+    directory = f'renditions/{digest[:2]}/{digest}'
+    if not default_storage.exists(directory):
+        return
+    for filename in default_storage.listdir(directory)[1]:
+        default_storage.delete(f'{directory}/{filename}')
@@ -0,0 +1,177 @@
+"""
+Full-text search over ticket titles, descriptions and follow-up notes.
+
+PostgreSQL keeps a weighted tsvector in Ticket.search_vector, backed by a
+GIN index. SQLite keeps the same text in the tickets_ticket_fts FTS5 table,
+keyed by ticket id. Both are created by migration 0006 and refreshed by
+update_search_index() from the signal receivers and bulk paths that write
+tickets or follow-ups. Archived tickets take their tsvector along, or keep
+their FTS5 row. Other backends fall back to icontains lookups.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+SEARCH_CONFIG = 'english'
+FTS_TABLE = 'tickets_ticket_fts'
+# Large id lists are sent in chunks to stay under SQLite's parameter limit
+CHUNK_SIZE = 500
+
+START_SEL, STOP_SEL = '<mark>', '</mark>'
+
+POSTGRES_UPDATE = f"""
+    UPDATE tickets_ticket t SET search_vector =
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(t.title, '')), 'A') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(t.description, '')), 'B') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(
+            (SELECT string_agg(f.notes, ' ') FROM tickets_followup f
+             WHERE f.ticket_id = t.id), '')), 'C')
+    WHERE t.id = ANY(%s)
+"""
+
+# Also run on the archive tables, which have the same columns
+POSTGRES_SEARCH = f"""
+    WITH ranked AS (
+        SELECT t.id, ts_rank(t.search_vector, q) AS rank
+        FROM {{tickets}} t, websearch_to_tsquery('{SEARCH_CONFIG}', %s) q
+        WHERE t.search_vector @@ q AND t.id IN ({{visible}})
+        ORDER BY rank DESC, t.id DESC
+        LIMIT %s
+    )
+    SELECT r.id, r.rank, ts_headline(
+        '{SEARCH_CONFIG}',
+        concat_ws(' ', t.description, (SELECT string_agg(f.notes, ' ')
+                                       FROM {{followups}} f
+                                       WHERE f.ticket_id = t.id)),
+        websearch_to_tsquery('{SEARCH_CONFIG}', %s),
+        'StartSel={START_SEL}, StopSel={STOP_SEL}, MaxWords=24, MinWords=8')
+    FROM ranked r JOIN {{tickets}} t ON t.id = r.id
+    ORDER BY r.rank DESC, r.id DESC
+"""
+
+SQLITE_DELETE = f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({{ids}})'
+
+SQLITE_INSERT = f"""
+    INSERT INTO {FTS_TABLE} (rowid, title, description, notes)
+    SELECT t.id, t.title, t.description,
+           (SELECT group_concat(f.notes, ' ') FROM tickets_followup f
+            WHERE f.ticket_id = t.id)
+    FROM tickets_ticket t WHERE t.id IN ({{ids}})
+"""
+
+# bm25() is lower for better matches; the title weighs most, notes least
+SQLITE_SEARCH = f"""
+    SELECT rowid, -bm25({FTS_TABLE}, 10.0, 4.0, 1.0) AS rank,
+           snippet({FTS_TABLE}, -1, '{START_SEL}', '{STOP_SEL}', '…', 16)
+    FROM {FTS_TABLE}
+    WHERE {FTS_TABLE} MATCH %s AND rowid IN ({{visible}})
+    ORDER BY rank DESC, rowid DESC
+    LIMIT %s
+"""
+
+
+def chunked(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield ids[start:start + CHUNK_SIZE]
+
+
+def update_search_index(ticket_ids, using='default'):
+    """ Re-index the given tickets from their current text and follow-ups. """
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        for ids in chunked(ticket_ids):
+            if connection.vendor == 'postgresql':
+                cursor.execute(POSTGRES_UPDATE, [ids])
+            elif connection.vendor == 'sqlite':
+                placeholders = ', '.join(['%s'] * len(ids))
+                cursor.execute(SQLITE_DELETE.format(ids=placeholders), ids)
+                cursor.execute(SQLITE_INSERT.format(ids=placeholders), ids)
+
+
+def remove_from_search_index(ticket_ids, using='default'):
+    """
+    Drop deleted tickets from the FTS5 table. The PostgreSQL vector is
+    deleted with its row.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for ids in chunked(ticket_ids):
+            placeholders = ', '.join(['%s'] * len(ids))
+            cursor.execute(SQLITE_DELETE.format(ids=placeholders), ids)
+
+
+def fts5_query(text):
+    """
+    Turn user input into an FTS5 query: every word must match, the last
+    one as a prefix. Quoting each word keeps FTS5 operators out.
+    """
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"' for word in words) + '*'
+
+
+def highlight(snippet):
+    """ Escape a snippet except for the <mark> tags added by the database. """
+    if not snippet:
+        return ''
+    parts = re.split(f'({re.escape(START_SEL)}|{re.escape(STOP_SEL)})',
+                     snippet)
+    return mark_safe(''.join(part if part in (START_SEL, STOP_SEL)
+                             else escape(part) for part in parts))
+
+
+def search_tickets(queryset, text, limit=50):
+    """
+    Return up to `limit` tickets of `queryset` matching `text`, best first.
+    Each ticket has a `search_rank` and an HTML-safe `search_snippet` with
+    the matched words in <mark> tags. The queryset may also be of archived
+    tickets, whose FTS5 entries are kept under their ticket id.
+    """
+    text = text.strip()
+    connection = connections[queryset.db]
+    if not text:
+        return []
+
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        tickets = list(queryset.filter(
+            Q(title__icontains=text) | Q(description__icontains=text) |
+            Q(followups__notes__icontains=text)
+        ).distinct()[:limit])
+        for ticket in tickets:
+            ticket.search_rank, ticket.search_snippet = 0, ''
+        return tickets
+
+    visible, visible_params = queryset.order_by().values('id').query \
+        .get_compiler(using=queryset.db).as_sql()
+    if connection.vendor == 'postgresql':
+        followups = queryset.model._meta.get_field('followups').related_model
+        sql = POSTGRES_SEARCH.format(
+            visible=visible, tickets=queryset.model._meta.db_table,
+            followups=followups._meta.db_table)
+        params = [text, *visible_params, limit, text]
+    else:
+        query = fts5_query(text)
+        if query is None:
+            return []
+        sql = SQLITE_SEARCH.format(visible=visible)
+        params = [query, *visible_params, limit]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    tickets = queryset.in_bulk([ticket_id for ticket_id, rank, snippet in rows])
+    results = []
+    for ticket_id, rank, snippet in rows:
+        ticket = tickets[ticket_id]
+        ticket.search_rank = rank
+        ticket.search_snippet = highlight(snippet)
+        results.append(ticket)
+    return results
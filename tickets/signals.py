@@ -1,7 +1,14 @@
-from django.db.models.signals import pre_save
+from django.db.models.signals import (pre_save, post_save, pre_delete,
+                                      post_delete)
 from django.dispatch import receiver
+from django.utils import timezone
 
-from tickets.models import Category, Ticket
+from associates.models import Associate
+from jobs.queue import enqueue
+from tickets.models import (Category, Ticket, FollowUp, TicketDailyStats,
+                            TicketCategoryCount, TicketTransition, Blob,
+                            local_date)
+from tickets.search import update_search_index, remove_from_search_index
 
 
 @receiver(pre_save, sender=Ticket)
@@ -11,7 +18,7 @@ def pre_save_ticket(sender, instance, **kwargs):
     associate is selected.
     """
     if instance.associate and not instance.category:
-        instance.category = Category.objects.get(name='assigned')
+        instance.category = Category.objects.by_name('assigned')
 
 
 @receiver(pre_save, sender=Ticket)
@@ -21,3 +28,180 @@ def pre_save_ticket_unset_category(sender, instance, **kwargs):
     """
     if instance.associate is None:
         instance.category = None
+
+
+@receiver(pre_save, sender=Ticket)
+def pre_save_ticket_category_date(sender, instance, **kwargs):
+    """
+    Signal to restart the time in category when the category changes,
+    including through the receivers above.
+    """
+    if instance._state.adding or instance.category_id != (
+            instance.get_loaded_value('category_id', instance.category_id)):
+        instance.category_date = timezone.now()
+
+
+@receiver(post_save, sender=Ticket)
+def post_save_ticket_transition(sender, instance, created, **kwargs):
+    """
+    Signal to log the change of category or associate of the ticket, with
+    the time it spent in its previous category.
+    """
+    new = (instance.category_id, instance.associate_id)
+    old = (None, None) if created else tuple(
+        instance.get_loaded_value(attname, value)
+        for attname, value in zip(('category_id', 'associate_id'), new))
+    transition = TicketTransition.for_change(
+        instance.pk, instance.department_id, old, new,
+        instance.get_loaded_value('category_date'), timezone.now())
+    if transition is not None:
+        TicketTransition.objects.record([transition])
+
+
+@receiver(post_save, sender=Ticket)
+def post_save_ticket_daily_stats(sender, instance, created, **kwargs):
+    """
+    Signal to count the ticket in the daily stats when it is created and
+    when its completed_date is set.
+    """
+    completed_date = instance.completed_date
+    completed = (completed_date is not None and completed_date !=
+                 instance.get_loaded_value('completed_date'))
+
+    if created:
+        TicketDailyStats.objects.record_tickets([instance])
+    elif completed:
+        TicketDailyStats.objects.record(instance.department_id,
+                                        local_date(completed_date),
+                                        completed=1)
+
+
+@receiver(post_save, sender=Ticket)
+def post_save_ticket_category_count(sender, instance, created, **kwargs):
+    """
+    Signal to move the ticket between the category counters when its
+    department, associate or category changed.
+    """
+    key = (instance.department_id, instance.associate_id, instance.category_id)
+    if not created:
+        old_key = tuple(instance.get_loaded_value(attname, value)
+                        for attname, value in zip(
+                            ('department_id', 'associate_id', 'category_id'),
+                            key))
+        if old_key == key:
+            return
+        TicketCategoryCount.objects.add(*old_key, -1)
+    TicketCategoryCount.objects.add(*key, 1)
+
+
+@receiver(post_delete, sender=Ticket)
+def post_delete_ticket_category_count(sender, instance, **kwargs):
+    """ Signal to uncount a deleted ticket from the category counters. """
+    TicketCategoryCount.objects.add(
+        instance.get_loaded_value('department_id', instance.department_id),
+        instance.get_loaded_value('associate_id', instance.associate_id),
+        instance.get_loaded_value('category_id', instance.category_id), -1)
+
+
+@receiver(post_save, sender=Ticket)
+def post_save_ticket_search_index(sender, instance, created, using, **kwargs):
+    """ Signal to re-index the ticket when its title or description changed. """
+    if created or any(
+            getattr(instance, attname) != instance.get_loaded_value(attname)
+            for attname in ('title', 'description')
+            if attname not in instance.get_deferred_fields()):
+        update_search_index([instance.id], using=using)
+
+
+@receiver(post_delete, sender=Ticket)
+def post_delete_ticket_search_index(sender, instance, using, **kwargs):
+    """ Signal to drop a deleted ticket from the search index. """
+    remove_from_search_index([instance.id], using=using)
+
+
+@receiver(post_save, sender=FollowUp)
+@receiver(post_delete, sender=FollowUp)
+def update_followup_ticket_search_index(sender, instance, using, **kwargs):
+    """ Signal to re-index the ticket of a saved or deleted follow-up. """
+    update_search_index([instance.ticket_id], using=using)
+
+
+@receiver(post_save, sender=FollowUp)
+@receiver(post_delete, sender=FollowUp)
+def touch_followup_ticket(sender, instance, using, **kwargs):
+    """
+    Signal to bump the updated date of the ticket of a saved or deleted
+    follow-up, which the ticket pages are revalidated against.
+    """
+    Ticket.objects.using(using).filter(pk=instance.ticket_id).update(
+        updated_date=timezone.now())
+
+
+ATTACHMENT_FIELDS = {Ticket: ('uploaded_file', 'uploaded_image'),
+                     FollowUp: ('file',)}
+
+
+@receiver(post_save, sender=Ticket)
+@receiver(post_save, sender=FollowUp)
+def post_save_retain_blobs(sender, instance, created, **kwargs):
+    """
+    Signal to move the blob references of the attachments that were
+    uploaded, replaced or cleared.
+    """
+    for attname in ATTACHMENT_FIELDS[sender]:
+        if attname in instance.get_deferred_fields():
+            continue
+        name = getattr(instance, attname).name
+        old_name = None if created else instance.get_loaded_value(attname)
+        if name != old_name:
+            Blob.objects.retain(name)
+            Blob.objects.release(old_name)
+
+
+@receiver(post_save, sender=Ticket)
+def post_save_ticket_queue_renditions(sender, instance, created, **kwargs):
+    """
+    Signal to generate the renditions of a newly uploaded image in the job
+    worker rather than on the first page view.
+    """
+    if 'uploaded_image' in instance.get_deferred_fields():
+        return
+    name = instance.uploaded_image.name
+    if name and (created or name != instance.get_loaded_value('uploaded_image')):
+        enqueue('generate_renditions', {'name': name})
+
+
+@receiver(post_delete, sender=Ticket)
+@receiver(post_delete, sender=FollowUp)
+def post_delete_release_blobs(sender, instance, **kwargs):
+    """ Signal to drop the blob references of a deleted instance. """
+    for attname in ATTACHMENT_FIELDS[sender]:
+        Blob.objects.release(
+            instance.get_loaded_value(attname, getattr(instance, attname).name))
+
+
+@receiver(pre_delete, sender=Category)
+def pre_delete_category_move_counts(sender, instance, **kwargs):
+    """
+    Signal to move the counters of a deleted category to 'no category', as
+    its tickets are set to no category.
+    """
+    TicketCategoryCount.objects.move(instance.ticket_counts.all(),
+                                     category_id=None)
+
+
+@receiver(pre_delete, sender=Associate)
+def pre_delete_associate_move_counts(sender, instance, **kwargs):
+    """
+    Signal to move the counters of a deleted associate to 'no associate', as
+    their tickets are unassigned (keeping their category).
+    """
+    TicketCategoryCount.objects.move(instance.category_counts.all(),
+                                     associate_id=None)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_registry(sender, **kwargs):
+    """ Signal to reload the category registry in every process. """
+    Category.objects.invalidate()
@@ -0,0 +1,79 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+BLOB_PREFIX = 'blobs/'
+CHUNK_SIZE = 64 * 1024
+
+
+def blob_name(digest, extension):
+    """ Sharded path of a blob: blobs/ab/cd/abcd...<extension>. """
+    return f'{BLOB_PREFIX}{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(BLOB_PREFIX)
+
+
+@deconstructible
+class DedupStorage(FileSystemStorage):
+    """
+    Content-addressed storage for ticket and follow-up attachments.
+
+    Every upload is hashed with SHA-256 in the same pass that spools it to a
+    temporary file, then stored once under blobs/ named after its hash and
+    extension, whatever name it was uploaded as. Saving content that is
+    already stored returns the existing name without writing anything, and
+    keeps the blob from being purged meanwhile. Blob rows count the
+    attachments referring to each file and delete it when the last one goes
+    (see BlobManager).
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The stored name is derived from the content in _save()
+        return name
+
+    def _save(self, name, content):
+        # Keep names within the FileField max_length of 100
+        extension = os.path.splitext(name)[1].lower()[:16]
+        spool_dir = self.path(f'{BLOB_PREFIX}tmp')
+        os.makedirs(spool_dir, exist_ok=True)
+        hasher = hashlib.sha256()
+
+        if hasattr(content, 'temporary_file_path'):
+            # Large uploads are already spooled by the upload handler, hash
+            # them in place and move the file instead of copying it
+            spooled = content.temporary_file_path()
+            for chunk in content.chunks(CHUNK_SIZE):
+                hasher.update(chunk)
+        else:
+            handle, spooled = tempfile.mkstemp(dir=spool_dir)
+            with os.fdopen(handle, 'wb') as f:
+                for chunk in content.chunks(CHUNK_SIZE):
+                    hasher.update(chunk)
+                    f.write(chunk)
+
+        name = blob_name(hasher.hexdigest(), extension)
+        path = self.path(name)
+        # Imported here, tickets.models imports this module
+        from tickets.models import Blob
+        if Blob.objects.reuse(name):
+            if not hasattr(content, 'temporary_file_path'):
+                os.remove(spooled)
+            return name
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if hasattr(content, 'temporary_file_path'):
+            file_move_safe(spooled, path)
+        else:
+            os.replace(spooled, path)
+        if self.file_permissions_mode is not None:
+            os.chmod(path, self.file_permissions_mode)
+        return name
+
+
+attachment_storage = DedupStorage()
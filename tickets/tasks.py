@@ -0,0 +1,13 @@
+from jobs.queue import register
+from .renditions import generate_renditions
+
+
+@register('generate_renditions')
+def generate_ticket_renditions(payload):
+    """
+    Generate the thumbnail, preview and normalized original of an uploaded
+    ticket image.
+
+    Payload: {'name': stored name of the image}
+    """
+    generate_renditions(payload['name'])
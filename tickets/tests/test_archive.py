@@ -0,0 +1,137 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from associates.models import Associate, UserDepartment
+from tickets.models import (Ticket, Category, FollowUp, ArchivedTicket,
+                            ArchivedFollowUp, TicketCategoryCount,
+                            TicketTransition)
+
+User = get_user_model()
+
+
+class ArchiveTicketsTest(TestCase):
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(
+            username='organizer',
+            email='organizer@test.com',
+            password='organizer_password',
+            is_organizer=True
+        )
+        self.user_department, created = UserDepartment.objects.get_or_create(
+            user=self.organizer_user)
+        self.associate_user = User.objects.create_user(
+            username='associate',
+            email='associate@test.com',
+            password='associate_password',
+            is_associate=True,
+            is_organizer=False
+        )
+        self.associate = Associate.objects.create(
+            user=self.associate_user, department=self.user_department)
+        self.assigned = Category.objects.create(name='assigned')
+        self.completed = Category.objects.create(name='completed')
+
+        self.old = self.create_ticket('Printer jammed', completed_days=400)
+        FollowUp.objects.create(ticket=self.old, notes='Replaced the roller.')
+        self.recent = self.create_ticket('Recent', completed_days=10)
+        self.open = Ticket.objects.create(title='Open', type=1,
+                                          department=self.user_department)
+
+    def create_ticket(self, title, completed_days):
+        ticket = Ticket.objects.create(title=title, type=1,
+                                       department=self.user_department,
+                                       associate=self.associate)
+        ticket.category = self.completed
+        ticket.save()
+        Ticket.objects.filter(pk=ticket.pk).update(
+            completed_date=timezone.now() - timedelta(days=completed_days))
+        return ticket
+
+    def archive(self, *args):
+        stdout = StringIO()
+        call_command('archive_tickets', '--older-than', '180d', *args,
+                     stdout=stdout)
+        return stdout.getvalue()
+
+    def test_archive_moves_old_completed_tickets(self):
+        self.assertTrue(TicketTransition.objects.filter(
+            ticket=self.old).exists())
+
+        self.assertIn('Archived 1 tickets', self.archive('--batch-size', 1))
+
+        self.assertEqual(set(Ticket.objects.values_list('pk', flat=True)),
+                         {self.recent.pk, self.open.pk})
+        archived = ArchivedTicket.objects.get()
+        self.assertEqual((archived.pk, archived.title, archived.category),
+                         (self.old.pk, 'Printer jammed', self.completed))
+        self.assertEqual(
+            list(ArchivedFollowUp.objects.values_list('ticket_id', 'notes')),
+            [(self.old.pk, 'Replaced the roller.')])
+        self.assertFalse(FollowUp.objects.filter(ticket_id=self.old.pk)
+                         .exists())
+        self.assertFalse(TicketTransition.objects.filter(
+            ticket_id=self.old.pk).exists())
+        # The counters only count the tickets left
+        self.assertEqual(
+            TicketCategoryCount.objects.counts_for(self.organizer_user),
+            {None: 1, self.assigned.pk: 0, self.completed.pk: 1})
+
+        # Running it again finds nothing more
+        self.assertIn('Archived 0 tickets', self.archive())
+
+    def test_dry_run(self):
+        self.assertIn('1 tickets', self.archive('--dry-run'))
+        self.assertEqual(Ticket.objects.count(), 3)
+        self.assertFalse(ArchivedTicket.objects.exists())
+
+    def test_search_and_detail(self):
+        self.archive()
+        self.client.force_login(self.organizer_user)
+        url = reverse('tickets:ticket-search')
+
+        response = self.client.get(url, {'q': 'printer'})
+        self.assertEqual(list(response.context['tickets']), [])
+
+        response = self.client.get(url, {'q': 'roller', 'archived': 'on'})
+        self.assertEqual([ticket.pk for ticket in response.context['tickets']],
+                         [self.old.pk])
+        self.assertContains(response, 'Archived')
+
+        detail = reverse('tickets:archived-ticket-detail', args=[self.old.pk])
+        response = self.client.get(detail)
+        self.assertContains(response, 'Replaced the roller.')
+
+        # Scoped to the role like hot tickets
+        other = User.objects.create_user(username='other',
+                                         email='other@test.com',
+                                         password='password',
+                                         is_organizer=True)
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(detail).status_code, 404)
+
+    def test_export_includes_archived(self):
+        self.archive()
+        handle, path = tempfile.mkstemp()
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+
+        for args, titles in (((), ['Recent', 'Open']),
+                             (('--include-archived',),
+                              ['Recent', 'Open', 'Printer jammed'])):
+            call_command('export_tickets', '--department',
+                         self.user_department.id, '--output', path, *args,
+                         stderr=StringIO())
+            with open(path) as f:
+                rows = [json.loads(line) for line in f]
+            self.assertEqual([row['title'] for row in rows], titles)
+        self.assertEqual([f['notes'] for f in rows[-1]['followups']],
+                         ['Replaced the roller.'])
@@ -0,0 +1,225 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from associates.models import Associate, UserDepartment
+from tickets.assignment import distribute, get_workloads, pick_associate
+from tickets.models import Ticket, Category, TicketCategoryCount
+
+User = get_user_model()
+
+
+@override_settings(TICKET_TYPE_WEIGHTS={1: 1, 2: 2, 3: 3})
+class AutoAssignmentTest(TestCase):
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(
+            username='organizer',
+            password='organizer_password',
+            is_organizer=True
+        )
+        self.user_department, created = UserDepartment.objects.get_or_create(
+            user=self.organizer_user)
+        self.associates = [
+            Associate.objects.create(
+                user=User.objects.create_user(
+                    username=f'associate_{i}',
+                    email=f'associate_{i}@test.com',
+                    password='test_associate_password',
+                    is_associate=True,
+                    is_organizer=False
+                ),
+                department=self.user_department
+            )
+            for i in range(3)
+        ]
+        self.assigned = Category.objects.create(name='assigned')
+        self.completed = Category.objects.create(name='completed')
+
+    def create_ticket(self, type=1, **kwargs):
+        return Ticket.objects.create(title='Ticket', type=type,
+                                     department=self.user_department, **kwargs)
+
+    def test_workloads_are_weighted_open_tickets(self):
+        first, second, third = self.associates
+        self.create_ticket(type=3, associate=first)
+        self.create_ticket(type=1, associate=first)
+        self.create_ticket(type=2, associate=second)
+        # Completed tickets are not part of the workload
+        self.create_ticket(type=3, associate=second, category=self.completed)
+
+        with self.assertNumQueries(1):
+            workloads = get_workloads(self.user_department.pk)
+        self.assertEqual(workloads, {first.pk: 4, second.pk: 2})
+        self.assertEqual(pick_associate(self.user_department.pk), third)
+
+        self.create_ticket(type=3, associate=third)
+        self.assertEqual(pick_associate(self.user_department.pk), second)
+
+    def test_distribute(self):
+        first, second, third = self.associates
+        self.create_ticket(type=3, associate=first)
+        for ticket_type in (1, 2, 3, 1, 2, 3):
+            self.create_ticket(type=ticket_type)
+
+        self.assertEqual(distribute(Ticket.objects.all()), 6)
+        self.assertFalse(Ticket.objects.filter(associate__isnull=True).exists())
+        self.assertEqual(Ticket.objects.filter(category=self.assigned).count(),
+                         7)
+        workloads = get_workloads(self.user_department.pk)
+        self.assertEqual(sum(workloads.values()), 15)
+        self.assertLessEqual(max(workloads.values())
+                             - min(workloads.values()), 3)
+
+        # Nothing left to assign
+        self.assertEqual(distribute(Ticket.objects.all()), 0)
+
+    def test_distribute_without_associates(self):
+        Associate.objects.all().delete()
+        self.create_ticket()
+        self.assertEqual(distribute(Ticket.objects.all()), 0)
+
+    def test_create_view_auto_assign(self):
+        self.client.force_login(self.organizer_user)
+        self.create_ticket(type=3, associate=self.associates[0])
+        response = self.client.post(reverse('tickets:ticket-create'), {
+            'title': 'New Ticket', 'type': 1, 'description': 'Description',
+            'auto_assign': 'on'})
+        self.assertEqual(response.status_code, 302)
+        ticket = Ticket.objects.get(title='New Ticket')
+        self.assertEqual(ticket.associate, self.associates[1])
+        self.assertEqual(ticket.category, self.assigned)
+
+    def test_distribute_view(self):
+        self.client.force_login(self.organizer_user)
+        for _ in range(3):
+            self.create_ticket()
+        response = self.client.post(reverse('tickets:ticket-distribute'))
+        self.assertRedirects(response, reverse('tickets:ticket-list'))
+        self.assertEqual(
+            set(Ticket.objects.values_list('associate', flat=True)),
+            {associate.pk for associate in self.associates})
+
+
+@override_settings(TICKET_CLAIM_ORDER=[3, 2, 1])
+class ClaimNextTest(TestCase):
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(
+            username='organizer',
+            password='organizer_password',
+            is_organizer=True
+        )
+        self.user_department, created = UserDepartment.objects.get_or_create(
+            user=self.organizer_user)
+        self.test_associate = Associate.objects.create(
+            user=User.objects.create_user(
+                username='test_associate',
+                email='associate@test.com',
+                password='test_associate_password',
+                is_associate=True,
+                is_organizer=False
+            ),
+            department=self.user_department
+        )
+        self.assigned = Category.objects.create(name='assigned')
+
+    def create_ticket(self, type=1, department=None):
+        return Ticket.objects.create(
+            title='Ticket', type=type,
+            department=department or self.user_department)
+
+    def claim(self):
+        return Ticket.objects.claim_next(self.test_associate.pk,
+                                         self.user_department.pk)
+
+    def test_claims_by_type_then_age(self):
+        oldest = self.create_ticket(type=1)
+        newest = self.create_ticket(type=1)
+        urgent = self.create_ticket(type=3)
+
+        self.assertEqual(self.claim(), urgent)
+        self.assertEqual(self.claim(), oldest)
+        claimed = self.claim()
+        self.assertEqual(claimed, newest)
+        self.assertEqual((claimed.associate, claimed.category),
+                         (self.test_associate, self.assigned))
+        self.assertIsNone(self.claim())
+
+        self.assertEqual(
+            TicketCategoryCount.objects.counts_for(self.organizer_user),
+            {self.assigned.pk: 3, None: 0})
+
+    def test_other_departments_are_not_claimed(self):
+        other_department, created = UserDepartment.objects.get_or_create(
+            user=User.objects.create_user(username='other_organizer',
+                                          email='other@test.com',
+                                          password='password',
+                                          is_organizer=True))
+        self.create_ticket(department=other_department)
+        self.assertIsNone(self.claim())
+
+    def test_claim_view(self):
+        ticket = self.create_ticket()
+        self.client.force_login(self.test_associate.user)
+        response = self.client.post(reverse('tickets:ticket-claim'))
+        self.assertRedirects(response, ticket.get_absolute_url())
+
+        response = self.client.post(reverse('tickets:ticket-claim'),
+                                    follow=True)
+        self.assertContains(response, 'There are no unassigned tickets left.')
+
+        # Organizers assign tickets instead
+        self.client.force_login(self.organizer_user)
+        self.create_ticket()
+        self.client.post(reverse('tickets:ticket-claim'))
+        self.assertEqual(Ticket.objects.filter(
+            associate__isnull=True).count(), 1)
+
+
+class ConcurrentClaimTest(TransactionTestCase):
+    def setUp(self):
+        organizer_user = User.objects.create_user(
+            username='organizer',
+            password='organizer_password',
+            is_organizer=True
+        )
+        self.user_department, created = UserDepartment.objects.get_or_create(
+            user=organizer_user)
+        self.associates = [
+            Associate.objects.create(
+                user=User.objects.create_user(
+                    username=f'associate_{i}',
+                    email=f'associate_{i}@test.com',
+                    password='test_associate_password',
+                    is_associate=True,
+                    is_organizer=False
+                ),
+                department=self.user_department
+            )
+            for i in range(4)
+        ]
+        Category.objects.create(name='assigned')
+        for i in range(20):
+            Ticket.objects.create(title=f'Ticket {i}', type=i % 3 + 1,
+                                  department=self.user_department)
+
+    def claim(self, associate):
+        try:
+            ticket = Ticket.objects.claim_next(associate.pk,
+                                               self.user_department.pk)
+            return ticket and (ticket.pk, associate.pk)
+        finally:
+            connection.close()
+
+    def test_no_ticket_is_claimed_twice(self):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            claims = list(executor.map(self.claim, self.associates * 8))
+
+        claimed = [claim for claim in claims if claim]
+        self.assertEqual(len(claimed), 20)
+        self.assertEqual(len({pk for pk, associate in claimed}), 20)
+        self.assertEqual(
+            {ticket.pk: ticket.associate_id
+             for ticket in Ticket.objects.all()}, dict(claimed))
@@ -0,0 +1,286 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from associates.models import Associate, UserDepartment
+from tickets.models import (Ticket, Category, FollowUp, TicketDailyStats,
+                            TicketCategoryCount)
+
+User = get_user_model()
+
+
+class ExportTicketsCommandTest(TestCase):
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(
+            username='organizer',
+            password='organizer_password',
+            is_organizer=True
+        )
+        self.user_department, created = UserDepartment.objects.get_or_create(
+            user=self.organizer_user)
+
+        self.ticket = Ticket.objects.create(title='Test Ticket', type=1,
+                                            department=self.user_department)
+        FollowUp.objects.create(ticket=self.ticket, notes='First note')
+        FollowUp.objects.create(ticket=self.ticket, notes='Second note')
+        Ticket.objects.create(title='Second Ticket', type=2,
+                              department=self.user_department)
+
+        other_organizer = User.objects.create_user(
+            username='other', email='other@test.com', password='password',
+            is_organizer=True)
+        Ticket.objects.create(title='Other Ticket', type=1,
+                              department=other_organizer.userdepartment)
+
+        handle, self.path = tempfile.mkstemp()
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def export(self, *args):
+        call_command('export_tickets', '--department', self.user_department.id,
+                     '--output', self.path, *args, stderr=StringIO())
+
+    def test_export_ndjson(self):
+        self.export('--format', 'ndjson')
+        with open(self.path) as f:
+            rows = [json.loads(line) for line in f]
+
+        self.assertEqual([row['title'] for row in rows],
+                         ['Test Ticket', 'Second Ticket'])
+        self.assertCountEqual([f['notes'] for f in rows[0]['followups']],
+                              ['First note', 'Second note'])
+        self.assertEqual(rows[1]['followups'], [])
+
+    def test_export_gzipped_csv(self):
+        self.export('--format', 'csv', '--gzip')
+        with gzip.open(self.path, 'rt', newline='') as f:
+            rows = list(csv.DictReader(f))
+
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(len(json.loads(rows[0]['followups'])), 2)
+
+    def test_export_since(self):
+        self.export('--since', '2999-01-01')
+        with open(self.path) as f:
+            self.assertEqual(f.read(), '')
+
+    def test_unknown_department(self):
+        with self.assertRaises(CommandError):
+            call_command('export_tickets', '--department', 0,
+                         '--output', self.path)
+
+
+class ImportTicketsCommandTest(TestCase):
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(
+            username='organizer',
+            password='organizer_password',
+            is_organizer=True
+        )
+        self.user_department, created = UserDepartment.objects.get_or_create(
+            user=self.organizer_user)
+        self.test_associate = Associate.objects.create(
+            user=User.objects.create_user(
+                username='test_associate',
+                email='associate@test.com',
+                password='test_associate_password',
+                is_associate=True,
+                is_organizer=False
+            ),
+            department=self.user_department
+        )
+        self.assigned = Category.objects.create(name='assigned')
+        self.processed = Category.objects.create(name='processed')
+
+        handle, self.path = tempfile.mkstemp(suffix='.csv')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def write_csv(self, rows):
+        with open(self.path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=(
+                'title', 'type', 'description', 'department', 'associate',
+                'category'))
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def test_import_applies_category_rule(self):
+        department = self.user_department.id
+        self.write_csv([
+            {'title': 'By email', 'type': 1, 'department': department,
+             'associate': 'associate@test.com'},
+            {'title': 'By id', 'type': 2, 'department': department,
+             'associate': self.test_associate.id, 'category': 'processed'},
+            {'title': 'Unassigned', 'type': 3, 'department': department,
+             'category': 'processed'},
+        ])
+        call_command('import_tickets', self.path, '--batch-size', 2,
+                     stdout=StringIO())
+
+        tickets = {t.title: t for t in Ticket.objects.all()}
+        self.assertEqual(tickets['By email'].associate, self.test_associate)
+        self.assertEqual(tickets['By email'].category, self.assigned)
+        self.assertEqual(tickets['By id'].category, self.processed)
+        self.assertIsNone(tickets['Unassigned'].category)
+
+    def test_invalid_rows_are_rejected(self):
+        self.write_csv([
+            {'title': 'Valid', 'type': 1, 'department': self.user_department.id},
+            {'title': '', 'type': 1, 'department': self.user_department.id},
+            {'title': 'Bad type', 'type': 9,
+             'department': self.user_department.id},
+            {'title': 'Bad department', 'type': 1, 'department': 0},
+        ])
+        stderr = StringIO()
+        call_command('import_tickets', self.path, stdout=StringIO(),
+                     stderr=stderr)
+
+        self.assertEqual(list(Ticket.objects.values_list('title', flat=True)),
+                         ['Valid'])
+        self.assertIn('Line 3', stderr.getvalue())
+        self.assertIn('Line 5', stderr.getvalue())
+
+    def test_ndjson_rows_must_be_objects(self):
+        # Without the category, it is created like the bulk updates do
+        self.assigned.delete()
+        with open(self.path, 'w') as f:
+            f.write('[]\n"x"\n{bad\n')
+            f.write(json.dumps({'title': 'Valid', 'type': 1,
+                                'department': self.user_department.id,
+                                'associate': 'associate@test.com'}) + '\n')
+        stderr = StringIO()
+        call_command('import_tickets', self.path, '--format', 'ndjson',
+                     stdout=StringIO(), stderr=stderr)
+
+        ticket = Ticket.objects.get()
+        self.assertEqual(ticket.category.name, 'assigned')
+        self.assertIn('Line 1: Invalid JSON: expected an object, got list',
+                      stderr.getvalue())
+        self.assertIn('Line 2', stderr.getvalue())
+        self.assertIn('Line 3', stderr.getvalue())
+
+    def test_ndjson_fields_must_have_valid_types(self):
+        valid = {'title': 'Valid', 'type': 1,
+                 'department': self.user_department.id,
+                 'associate': self.test_associate.id}
+        rows = [{**valid, 'title': 5}, {**valid, 'description': ['x']},
+                {**valid, 'category': []}, {**valid, 'associate': {}},
+                {**valid, 'type': True}, valid]
+        with open(self.path, 'w') as f:
+            f.writelines(json.dumps(row) + '\n' for row in rows)
+        stderr = StringIO()
+        call_command('import_tickets', self.path, '--format', 'ndjson',
+                     '--batch-size', 2, stdout=StringIO(), stderr=stderr)
+
+        self.assertEqual(list(Ticket.objects.values_list('title', flat=True)),
+                         ['Valid'])
+        for line, error in ((1, 'Invalid title: 5.'),
+                            (2, "Invalid description: ['x']."),
+                            (3, 'Invalid category: [].'),
+                            (4, 'Invalid associate: {}.'),
+                            (5, 'Invalid type: True.')):
+            self.assertIn(f'Line {line}: {error}', stderr.getvalue())
+
+    def test_batch_queries_do_not_grow_with_rows(self):
+        queries = []
+        # The first import also creates today's daily stats row
+        for count in (1, 5, 50):
+            self.write_csv([{'title': f'Ticket {i}', 'type': 1,
+                             'department': self.user_department.id,
+                             'associate': 'associate@test.com'}
+                            for i in range(count)])
+            with CaptureQueriesContext(connection) as context:
+                call_command('import_tickets', self.path, '--batch-size', 100,
+                             stdout=StringIO())
+            queries.append(len(context))
+
+        self.assertEqual(queries[1], queries[2])
+        self.assertEqual(Ticket.objects.count(), 56)
+
+
+class BackfillTicketStatsCommandTest(TestCase):
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(
+            username='organizer',
+            password='organizer_password',
+            is_organizer=True
+        )
+        self.user_department, created = UserDepartment.objects.get_or_create(
+            user=self.organizer_user)
+
+    def test_backfill_rebuilds_rollup(self):
+        for i in range(3):
+            Ticket.objects.create(title=f'Ticket {i}', type=1,
+                                  department=self.user_department)
+        Ticket.objects.update(completed_date=F('created_date'))
+        TicketDailyStats.objects.update(created_count=0)
+
+        call_command('backfill_ticket_stats', stdout=StringIO())
+
+        stats = TicketDailyStats.objects.get(department=self.user_department)
+        self.assertEqual((stats.created_count, stats.completed_count), (3, 3))
+
+
+class VerifyCategoryCountersCommandTest(TestCase):
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(
+            username='organizer',
+            password='organizer_password',
+            is_organizer=True
+        )
+        self.user_department, created = UserDepartment.objects.get_or_create(
+            user=self.organizer_user)
+        for i in range(3):
+            Ticket.objects.create(title=f'Ticket {i}', type=1,
+                                  department=self.user_department)
+
+    def test_consistent_counters(self):
+        stdout = StringIO()
+        call_command('verify_category_counters', stdout=stdout)
+        self.assertIn('consistent', stdout.getvalue())
+
+    def test_drift_is_detected_and_repaired(self):
+        TicketCategoryCount.objects.update(count=5)
+        with self.assertRaises(CommandError):
+            call_command('verify_category_counters', stdout=StringIO())
+
+        call_command('verify_category_counters', '--repair', stdout=StringIO())
+        self.assertEqual(TicketCategoryCount.objects.counts_for(
+            self.organizer_user), {None: 3})
+
+
+class SeedScaleCommandTest(TestCase):
+    def test_seed_scale_creates_consistent_dataset(self):
+        call_command('seed_scale', '--departments', 2, '--associates', 3,
+                     '--tickets', 25, '--followups', 2, '--batch-size', 10,
+                     '--seed', 1, stdout=StringIO())
+
+        self.assertEqual(UserDepartment.objects.count(), 2)
+        self.assertEqual(Associate.objects.count(), 6)
+        self.assertEqual(Ticket.objects.count(), 50)
+        self.assertEqual(FollowUp.objects.count(), 100)
+        # Assigned tickets have a category, unassigned ones none
+        self.assertFalse(Ticket.objects.filter(
+            associate__isnull=False, category__isnull=True).exists())
+        self.assertFalse(Ticket.objects.filter(
+            associate__isnull=True, category__isnull=False).exists())
+        # Dates are spread out and the rollup matches them
+        self.assertGreater(Ticket.objects.dates('created_date', 'day').count(),
+                           1)
+        self.assertEqual(sum(TicketDailyStats.objects.values_list(
+            'created_count', flat=True)), 50)
+        call_command('verify_category_counters', stdout=StringIO())
+
+        # Running it again adds new users instead of clashing
+        call_command('seed_scale', '--tickets', 5, stdout=StringIO())
+        self.assertEqual(UserDepartment.objects.count(), 3)
@@ -0,0 +1,138 @@
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from associates.models import Associate, UserDepartment
+from tickets.models import Ticket, FollowUp, Category
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+CONTENT = bytes(range(256)) * 4
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_ACCEL_REDIRECT='')
+class AttachmentDownloadTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(
+            username='organizer',
+            email='organizer@test.com',
+            password='organizer_password',
+            is_organizer=True
+        )
+        self.user_department, created = UserDepartment.objects.get_or_create(
+            user=self.organizer_user)
+        self.associate = Associate.objects.create(
+            user=User.objects.create_user(
+                username='test_associate',
+                email='associate@test.com',
+                password='test_associate_password',
+                is_associate=True,
+                is_organizer=False
+            ),
+            department=self.user_department
+        )
+        Category.objects.create(name='assigned')
+        self.ticket = Ticket.objects.create(
+            title='Ticket', type=1, department=self.user_department,
+            uploaded_file=SimpleUploadedFile('report.pdf', CONTENT))
+        self.followup = FollowUp.objects.create(
+            ticket=self.ticket, notes='Notes',
+            file=SimpleUploadedFile('notes.txt', b'follow-up notes'))
+        self.url = reverse('tickets:ticket-attachment',
+                           args=(self.ticket.pk, 'file'))
+        self.client.force_login(self.organizer_user)
+
+    def test_download(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Disposition'],
+                         f"attachment; filename*=UTF-8''ticket-"
+                         f"{self.ticket.pk}.pdf")
+
+        response = self.client.get(reverse('tickets:ticket-followup-attachment',
+                                           args=(self.followup.pk,)))
+        self.assertEqual(b''.join(response.streaming_content),
+                         b'follow-up notes')
+
+    def test_visibility(self):
+        # Not assigned to the associate
+        self.client.force_login(self.associate.user)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(self.client.get(reverse(
+            'tickets:ticket-followup-attachment',
+            args=(self.followup.pk,))).status_code, 404)
+
+        self.ticket.associate = self.associate
+        self.ticket.save()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    def test_missing_attachment(self):
+        response = self.client.get(reverse('tickets:ticket-attachment',
+                                           args=(self.ticket.pk, 'image')))
+        self.assertEqual(response.status_code, 404)
+
+    def test_range_requests(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[10:20])
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+        self.assertEqual(response['Content-Length'], '10')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-4')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[-4:])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1024')
+
+        # An invalid range is ignored
+        response = self.client.get(self.url, HTTP_RANGE='bytes=500-100')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+
+        # A stale If-Range gets the whole file
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19',
+                                   HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_conditional_requests(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-0',
+                                   HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT='x-accel-redirect',
+                       MEDIA_ACCEL_PREFIX='/protected-media/')
+    def test_x_accel_redirect(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/protected-media/' + self.ticket.uploaded_file.name)
+        self.assertEqual(response.content, b'')
+
+    @override_settings(MEDIA_ACCEL_REDIRECT='x-sendfile')
+    def test_x_sendfile(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'],
+                         self.ticket.uploaded_file.path)
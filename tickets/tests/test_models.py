@@ -1,14 +1,31 @@
+import shutil
+import tempfile
+from datetime import timedelta
+
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
 from associates.models import Associate, UserDepartment
-from tickets.models import Ticket, Category, FollowUp
+from tickets.models import (Ticket, Category, FollowUp, TicketDailyStats,
+                            TicketCategoryCount, TicketTransition,
+                            TicketDwellStats, DWELL_BUCKETS, dwell_percentile)
 
 User = get_user_model()
 
+MEDIA_ROOT = tempfile.mkdtemp()
+
 
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
 class TicketModelTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
     def setUp(self):
         self.organizer_user = User.objects.create_user(
             username='organizer',
@@ -66,3 +83,389 @@ class TicketModelTest(TestCase):
             file=SimpleUploadedFile("file.txt", b"file_content")
         )
         self.assertEqual(str(followup), f'Ticket id: {ticket.pk} FollowUp')
+
+
+class TicketQuerySetTest(TestCase):
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(
+            username='organizer',
+            password='organizer_password',
+            is_organizer=True
+        )
+        self.user_department, created = UserDepartment.objects.get_or_create(
+            user=self.organizer_user)
+
+        self.test_associate = Associate.objects.create(
+            user=User.objects.create_user(
+                username='test_associate',
+                email='associate@test.com',
+                password='test_associate_password',
+                is_associate=True,
+                is_organizer=False
+            ),
+            department=self.user_department
+        )
+        Category.objects.create(name='assigned')
+
+        self.assigned_ticket = Ticket.objects.create(
+            title='Assigned', type=1, department=self.user_department,
+            associate=self.test_associate)
+        self.unassigned_ticket = Ticket.objects.create(
+            title='Unassigned', type=1, department=self.user_department)
+
+    def test_visible_to_organizer(self):
+        tickets = Ticket.objects.visible_to(self.organizer_user)
+        self.assertCountEqual(tickets,
+                              [self.assigned_ticket, self.unassigned_ticket])
+        self.assertEqual(list(tickets.unassigned()), [self.unassigned_ticket])
+
+    def test_visible_to_associate(self):
+        tickets = Ticket.objects.visible_to(self.test_associate.user)
+        self.assertEqual(list(tickets), [self.assigned_ticket])
+
+    def test_editable_by_associate_is_empty(self):
+        self.assertFalse(
+            Ticket.objects.editable_by(self.test_associate.user).exists())
+
+
+class CategoryRegistryTest(TestCase):
+    def setUp(self):
+        self.assigned = Category.objects.create(name='assigned')
+
+    def test_by_name_is_served_from_registry(self):
+        self.assertEqual(Category.objects.by_name('assigned'), self.assigned)
+        with self.assertNumQueries(0):
+            self.assertEqual(Category.objects.by_name('assigned'),
+                             self.assigned)
+
+    def test_registry_is_invalidated_on_change(self):
+        with self.assertRaises(Category.DoesNotExist):
+            Category.objects.by_name('completed')
+
+        completed = Category.objects.create(name='completed')
+        self.assertEqual(Category.objects.by_name('completed'), completed)
+
+        completed.delete()
+        with self.assertRaises(Category.DoesNotExist):
+            Category.objects.by_name('completed')
+
+    def test_by_name_create(self):
+        returned = Category.objects.by_name('returned', create=True)
+        self.assertEqual(Category.objects.get(name='returned'), returned)
+
+
+class TicketDailyStatsTest(TestCase):
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(
+            username='organizer',
+            password='organizer_password',
+            is_organizer=True
+        )
+        self.user_department, created = UserDepartment.objects.get_or_create(
+            user=self.organizer_user)
+
+    def get_stats(self):
+        return TicketDailyStats.objects.get(department=self.user_department,
+                                            date=timezone.localdate())
+
+    def test_created_and_completed_are_recorded(self):
+        ticket = Ticket.objects.create(title='Ticket', type=1,
+                                       department=self.user_department)
+        Ticket.objects.create(title='Another Ticket', type=1,
+                              department=self.user_department)
+        stats = self.get_stats()
+        self.assertEqual((stats.created_count, stats.completed_count), (2, 0))
+
+        ticket.completed_date = timezone.now()
+        ticket.save()
+        # Saving again without changing completed_date is not a completion
+        ticket.save()
+        stats = self.get_stats()
+        self.assertEqual((stats.created_count, stats.completed_count), (2, 1))
+
+
+class TicketCategoryCountTest(TestCase):
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(
+            username='organizer',
+            password='organizer_password',
+            is_organizer=True
+        )
+        self.user_department, created = UserDepartment.objects.get_or_create(
+            user=self.organizer_user)
+        self.test_associate = Associate.objects.create(
+            user=User.objects.create_user(
+                username='test_associate',
+                email='associate@test.com',
+                password='test_associate_password',
+                is_associate=True,
+                is_organizer=False
+            ),
+            department=self.user_department
+        )
+        self.assigned = Category.objects.create(name='assigned')
+        self.processed = Category.objects.create(name='processed')
+
+    def counts(self, user=None):
+        return TicketCategoryCount.objects.counts_for(
+            user or self.organizer_user)
+
+    def test_counters_follow_ticket_changes(self):
+        ticket = Ticket.objects.create(title='Ticket', type=1,
+                                       department=self.user_department,
+                                       associate=self.test_associate)
+        Ticket.objects.create(title='Unassigned', type=1,
+                              department=self.user_department)
+        self.assertEqual(self.counts(), {self.assigned.pk: 1, None: 1})
+        self.assertEqual(self.counts(self.test_associate.user),
+                         {self.assigned.pk: 1})
+
+        ticket = Ticket.objects.get(pk=ticket.pk)
+        ticket.category = self.processed
+        ticket.save()
+        self.assertEqual(self.counts(), {self.assigned.pk: 0,
+                                         self.processed.pk: 1, None: 1})
+
+        ticket.delete()
+        self.assertEqual(self.counts(), {self.assigned.pk: 0,
+                                         self.processed.pk: 0, None: 1})
+
+    def test_counters_follow_category_and_associate_deletion(self):
+        Ticket.objects.create(title='Ticket', type=1,
+                              department=self.user_department,
+                              associate=self.test_associate,
+                              category=self.processed)
+        self.processed.delete()
+        self.assertEqual(self.counts(), {None: 1})
+
+        Ticket.objects.update(category=self.assigned)
+        TicketCategoryCount.objects.update(category=self.assigned)
+        self.test_associate.delete()
+        self.assertEqual(self.counts(), {self.assigned.pk: 1})
+        self.assertFalse(TicketCategoryCount.objects.filter(
+            associate__isnull=False).exists())
+
+    def test_counter_key_is_unique_with_nulls(self):
+        Ticket.objects.create(title='Unassigned', type=1,
+                              department=self.user_department)
+        # Enforced on every backend, so a concurrent first writer falls back
+        # to updating the row the other one created
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            TicketCategoryCount.objects.create(
+                department=self.user_department, count=1)
+        TicketCategoryCount.objects.add(self.user_department.pk, None, None, 1)
+        self.assertEqual(self.counts(), {None: 2})
+
+
+class TicketBulkOperationsTest(TestCase):
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(
+            username='organizer',
+            password='organizer_password',
+            is_organizer=True
+        )
+        self.user_department, created = UserDepartment.objects.get_or_create(
+            user=self.organizer_user)
+        self.test_associate = Associate.objects.create(
+            user=User.objects.create_user(
+                username='test_associate',
+                email='associate@test.com',
+                password='test_associate_password',
+                is_associate=True,
+                is_organizer=False
+            ),
+            department=self.user_department
+        )
+        self.assigned = Category.objects.create(name='assigned')
+        self.processed = Category.objects.create(name='processed')
+        self.completed = Category.objects.create(name='completed')
+
+    def create_tickets(self, count, **kwargs):
+        return [Ticket.objects.create(title=f'Ticket {i}', type=1,
+                                      department=self.user_department,
+                                      **kwargs)
+                for i in range(count)]
+
+    def counts(self):
+        return TicketCategoryCount.objects.counts_for(self.organizer_user)
+
+    def test_bulk_assign(self):
+        self.create_tickets(3)
+        self.create_tickets(1, associate=self.test_associate,
+                            category=self.processed)
+
+        with CaptureQueriesContext(connection) as queries:
+            updated = Ticket.objects.all().bulk_assign(self.test_associate)
+        self.assertEqual(updated, 4)
+        # One statement for all the tickets, and one to restart the time in
+        # category of those whose category changed
+        self.assertEqual(len([query for query in queries.captured_queries
+                              if query['sql'].startswith(
+                                  'UPDATE "tickets_ticket"')]), 2)
+        # Categories are kept, missing ones become 'assigned'
+        self.assertEqual(self.counts(), {self.assigned.pk: 3,
+                                         self.processed.pk: 1, None: 0})
+        self.assertEqual(
+            Ticket.objects.filter(associate=self.test_associate,
+                                  category=self.assigned).count(), 3)
+
+        Ticket.objects.all().bulk_assign(None)
+        self.assertFalse(Ticket.objects.filter(
+            category__isnull=False).exists())
+        self.assertEqual(self.counts(), {self.assigned.pk: 0,
+                                         self.processed.pk: 0, None: 4})
+
+    def test_bulk_set_category(self):
+        unassigned, = self.create_tickets(1)
+        self.create_tickets(2, associate=self.test_associate)
+        done, = self.create_tickets(1, associate=self.test_associate,
+                                    category=self.completed)
+        done_date = Ticket.objects.get(pk=done.pk).completed_date
+
+        Ticket.objects.all().bulk_set_category(self.completed)
+        # Unassigned tickets have no category
+        self.assertIsNone(Ticket.objects.get(pk=unassigned.pk).category)
+        self.assertEqual(Ticket.objects.filter(
+            category=self.completed, completed_date__isnull=False).count(), 2)
+        self.assertEqual(Ticket.objects.get(pk=done.pk).completed_date,
+                         done_date)
+        self.assertEqual(self.counts(), {self.assigned.pk: 0,
+                                         self.completed.pk: 3, None: 1})
+        stats = TicketDailyStats.objects.get(department=self.user_department,
+                                             date=timezone.localdate())
+        self.assertEqual(stats.completed_count, 2)
+
+    def test_bulk_delete(self):
+        tickets = self.create_tickets(3, associate=self.test_associate)
+        FollowUp.objects.create(ticket=tickets[0], notes='Notes')
+
+        deleted = Ticket.objects.filter(
+            pk__in=[tickets[0].pk, tickets[1].pk]).bulk_delete()
+        self.assertEqual(deleted, 2)
+        self.assertEqual(list(Ticket.objects.values_list('pk', flat=True)),
+                         [tickets[2].pk])
+        self.assertFalse(FollowUp.objects.exists())
+        self.assertEqual(self.counts(), {self.assigned.pk: 1})
+
+
+class TicketTransitionTest(TestCase):
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(
+            username='organizer',
+            password='organizer_password',
+            is_organizer=True
+        )
+        self.user_department, created = UserDepartment.objects.get_or_create(
+            user=self.organizer_user)
+        self.test_associate = Associate.objects.create(
+            user=User.objects.create_user(
+                username='test_associate',
+                email='associate@test.com',
+                password='test_associate_password',
+                is_associate=True,
+                is_organizer=False
+            ),
+            department=self.user_department
+        )
+        self.assigned = Category.objects.create(name='assigned')
+        self.processed = Category.objects.create(name='processed')
+
+    def transitions(self):
+        return list(TicketTransition.objects.values_list(
+            'from_category', 'to_category', 'from_associate', 'to_associate'))
+
+    def backdate(self, ticket, **delta):
+        """ Pretend the ticket entered its category some time ago. """
+        category_date = timezone.now() - timedelta(**delta)
+        Ticket.objects.filter(pk=ticket.pk).update(category_date=category_date)
+        return Ticket.objects.get(pk=ticket.pk)
+
+    def test_saves_are_logged(self):
+        ticket = Ticket.objects.create(title='Ticket', type=1,
+                                       department=self.user_department)
+        self.assertEqual(self.transitions(), [])
+
+        # The category set by the pre_save receiver is logged
+        ticket.associate = self.test_associate
+        ticket.save()
+        ticket = self.backdate(ticket, hours=3)
+        ticket.category = self.processed
+        ticket.save()
+        # Saving without changes logs nothing
+        ticket.save()
+        self.assertEqual(self.transitions(), [
+            (None, self.assigned.pk, None, self.test_associate.pk),
+            (self.assigned.pk, self.processed.pk, self.test_associate.pk,
+             self.test_associate.pk),
+        ])
+        dwell = TicketTransition.objects.last().dwell
+        self.assertAlmostEqual(dwell.total_seconds(), 3 * 3600, delta=60)
+
+        report = TicketDwellStats.objects.report(self.user_department.pk)
+        self.assertEqual(set(report), {None, self.assigned.pk})
+        self.assertEqual(report[self.assigned.pk].count, 1)
+        self.assertEqual(report[self.assigned.pk].mean,
+                         timedelta(seconds=round(dwell.total_seconds())))
+
+    def test_bulk_updates_are_logged(self):
+        tickets = [Ticket.objects.create(title=f'Ticket {i}', type=1,
+                                         department=self.user_department,
+                                         associate=self.test_associate)
+                   for i in range(4)]
+        for i, ticket in enumerate(tickets):
+            self.backdate(ticket, hours=i + 1)
+        TicketTransition.objects.all().delete()
+
+        Ticket.objects.all().bulk_set_category(self.processed)
+        self.assertEqual(self.transitions(), [
+            (self.assigned.pk, self.processed.pk, self.test_associate.pk,
+             self.test_associate.pk)] * 4)
+        self.assertFalse(Ticket.objects.filter(
+            category_date__lt=timezone.now() - timedelta(minutes=1)).exists())
+
+        summary = TicketDwellStats.objects.report(
+            self.user_department.pk)[self.assigned.pk]
+        self.assertEqual(summary.count, 4)
+        self.assertEqual(summary.mean, timedelta(hours=2.5))
+        # Between the 2 and 4 hour bucket bounds
+        self.assertTrue(timedelta(hours=2) <= summary.p50 <= timedelta(hours=4))
+
+    def test_bulk_created_tickets_are_logged(self):
+        assigned, unassigned = Ticket.objects.bulk_create_assigned([
+            Ticket(title='Assigned', type=1, department=self.user_department,
+                   associate=self.test_associate),
+            Ticket(title='Unassigned', type=1,
+                   department=self.user_department),
+        ])
+        self.assertEqual(self.transitions(), [
+            (None, self.assigned.pk, None, self.test_associate.pk)])
+        transition = TicketTransition.objects.get()
+        self.assertEqual((transition.ticket_id, transition.created_date),
+                         (assigned.pk, assigned.created_date))
+
+        # Their first category change has its dwell time counted
+        self.backdate(assigned, hours=1)
+        Ticket.objects.all().bulk_set_category(self.processed)
+        report = TicketDwellStats.objects.report(self.user_department.pk)
+        self.assertEqual(report[self.assigned.pk].count, 1)
+
+    def test_dwell_stats_key_is_unique_with_nulls(self):
+        TicketDwellStats.objects.add(self.user_department.pk, None, 0, 1,
+                                     timedelta(minutes=1))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            TicketDwellStats.objects.create(department=self.user_department,
+                                            bucket=0)
+        TicketDwellStats.objects.add(self.user_department.pk, None, 0, 1,
+                                     timedelta(minutes=3))
+        summary = TicketDwellStats.objects.report(
+            self.user_department.pk)[None]
+        self.assertEqual((summary.count, summary.mean),
+                         (2, timedelta(minutes=2)))
+
+    def test_dwell_percentile(self):
+        # Bucket 4 holds 30 to 60 minutes, the last one anything longer
+        histogram = {4: 8, len(DWELL_BUCKETS): 2}
+        self.assertEqual(dwell_percentile(histogram, 10, 0.5),
+                         timedelta(minutes=30 + 30 * 5 / 8))
+        self.assertEqual(dwell_percentile(histogram, 10, 0.9),
+                         DWELL_BUCKETS[-1])
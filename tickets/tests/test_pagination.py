@@ -0,0 +1,111 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from associates.models import Associate, UserDepartment
+from tickets.models import Ticket, Category
+from tickets.pagination import KeysetPaginator, InvalidCursor
+
+User = get_user_model()
+
+
+class KeysetPaginatorTest(TestCase):
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(
+            username='organizer',
+            password='organizer_password',
+            is_organizer=True
+        )
+        self.user_department, created = UserDepartment.objects.get_or_create(
+            user=self.organizer_user)
+
+        now = timezone.now()
+        for i in range(7):
+            ticket = Ticket.objects.create(title=f'Ticket {i}', type=1,
+                                           department=self.user_department)
+            # Two tickets share every timestamp to exercise the id tie-break
+            Ticket.objects.filter(pk=ticket.pk).update(
+                created_date=now - timedelta(days=i // 2))
+
+        self.expected = list(Ticket.objects.order_by('-created_date', '-id'))
+
+    def test_pages_follow_model_ordering(self):
+        paginator = KeysetPaginator(Ticket.objects.all(), per_page=3)
+        seen = []
+        page = paginator.page()
+        while True:
+            seen.extend(page.object_list)
+            if not page.has_next():
+                break
+            page = paginator.page(page.next_cursor)
+        self.assertEqual(seen, self.expected)
+
+    def test_previous_cursor_returns_previous_page(self):
+        paginator = KeysetPaginator(Ticket.objects.all(), per_page=3)
+        first = paginator.page()
+        self.assertFalse(first.has_previous())
+
+        second = paginator.page(first.next_cursor)
+        self.assertTrue(second.has_previous())
+
+        back = paginator.page(second.previous_cursor)
+        self.assertEqual(back.object_list, first.object_list)
+        self.assertEqual(paginator.page(back.next_cursor).object_list,
+                         second.object_list)
+
+    def test_invalid_cursor(self):
+        paginator = KeysetPaginator(Ticket.objects.all(), per_page=3)
+        with self.assertRaises(InvalidCursor):
+            paginator.page('not-a-cursor')
+
+
+@override_settings(TICKETS_PAGE_SIZE=2)
+class TicketListPaginationTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.organizer_user = User.objects.create_user(
+            username='organizer',
+            password='organizer_password',
+            is_organizer=True
+        )
+        self.user_department, created = UserDepartment.objects.get_or_create(
+            user=self.organizer_user)
+        self.associate = Associate.objects.create(
+            user=User.objects.create_user(
+                username='test_associate',
+                email='associate@test.com',
+                password='test_associate_password',
+                is_associate=True,
+                is_organizer=False
+            ),
+            department=self.user_department
+        )
+        Category.objects.create(name='assigned')
+
+        for i in range(3):
+            Ticket.objects.create(title=f'Assigned {i}', type=1,
+                                  department=self.user_department,
+                                  associate=self.associate)
+            Ticket.objects.create(title=f'Unassigned {i}', type=1,
+                                  department=self.user_department)
+        self.client.force_login(self.organizer_user)
+
+    def test_ticket_list_is_paginated(self):
+        response = self.client.get(reverse('tickets:ticket-list'))
+        self.assertEqual(len(response.context['tickets']), 2)
+        self.assertTrue(response.context['page_obj'].has_next())
+        self.assertEqual(len(response.context['unassigned_tickets']), 2)
+
+        response = self.client.get(
+            reverse('tickets:ticket-list') +
+            response.context['unassigned_page_obj'].next_url)
+        self.assertEqual(len(response.context['unassigned_tickets']), 1)
+        self.assertEqual(len(response.context['tickets']), 2)
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(reverse('tickets:ticket-list'),
+                                   {'cursor': 'bogus'})
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,112 @@
+import re
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count, Q
+from django.test import TestCase
+from django.utils import timezone
+
+from associates.models import Associate, UserDepartment
+from tickets.models import Ticket, Category, FollowUp
+
+User = get_user_model()
+
+
+class TicketQueryPlanTest(TestCase):
+    """
+    EXPLAIN the hot ticket querysets over a seeded table and fail if the
+    planner falls back to a sequential scan of tickets or follow-ups.
+    """
+    departments = 5
+    tickets_per_department = 1000
+
+    @classmethod
+    def setUpTestData(cls):
+        for name in ('assigned', 'completed'):
+            Category.objects.create(name=name)
+        cls.completed = Category.objects.by_name('completed')
+
+        now = timezone.now()
+        for d in range(cls.departments):
+            organizer = User.objects.create_user(
+                username=f'organizer{d}', email=f'organizer{d}@test.com',
+                password='organizer_password', is_organizer=True)
+            department, created = UserDepartment.objects.get_or_create(
+                user=organizer)
+            associates = [Associate.objects.create(
+                user=User.objects.create_user(
+                    username=f'associate{d}-{i}',
+                    email=f'associate{d}-{i}@test.com',
+                    password='associate_password', is_associate=True,
+                    is_organizer=False),
+                department=department) for i in range(5)]
+            Ticket.objects.bulk_create_assigned([
+                Ticket(title=f'Ticket {i}', type=1, department=department,
+                       associate=associates[i % 6] if i % 6 < 5 else None,
+                       category=cls.completed if i % 3 == 0 else None,
+                       completed_date=now if i % 3 == 0 else None)
+                for i in range(cls.tickets_per_department)
+            ])
+
+        cls.organizer = User.objects.get(username='organizer0')
+        cls.associate = User.objects.get(username='associate0-0')
+        cls.ticket = Ticket.objects.filter(department__user=cls.organizer)[0]
+        FollowUp.objects.bulk_create([
+            FollowUp(ticket=ticket, notes='Follow-up')
+            for ticket in Ticket.objects.all()[:2000]
+        ])
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertIndexScan(self, queryset, index):
+        """ Assert the plan reads `index` and fully scans no big table. """
+        plan = queryset.explain()
+        if connection.vendor == 'postgresql':
+            self.assertNotRegex(plan, r'Seq Scan on tickets_(ticket|followup)')
+        else:
+            self.assertIsNone(
+                re.search(r'SCAN tickets_(ticket|followup)\b(?! USING)', plan),
+                plan)
+        self.assertIn(index, plan)
+
+    def test_organizer_ticket_list(self):
+        self.assertIndexScan(
+            Ticket.objects.visible_to(self.organizer).assigned().for_list(),
+            'ticket_department_created')
+
+    def test_unassigned_panel(self):
+        self.assertIndexScan(
+            Ticket.objects.visible_to(self.organizer).unassigned().for_list(),
+            'ticket_unassigned_created')
+
+    def test_associate_ticket_list(self):
+        self.assertIndexScan(
+            Ticket.objects.visible_to(self.associate).assigned().for_list(),
+            # Either the associate index or the ordered department index,
+            # depending on how many tickets each associate has
+            'ticket_department_')
+
+    def test_category_detail(self):
+        self.assertIndexScan(
+            Ticket.objects.visible_to(self.organizer).filter(
+                category=self.completed).for_list(),
+            'ticket_department_')
+
+    def test_dashboard_completed_count(self):
+        queryset = Ticket.objects.visible_to(self.organizer).filter(
+            category=self.completed,
+            completed_date__gte=timezone.now() - timedelta(days=30))
+        self.assertIndexScan(queryset, 'ticket_department_completed')
+        # The dashboard's single conditional aggregate stays on the
+        # department's rows
+        queryset = Ticket.objects.visible_to(self.organizer).values(
+            'department').annotate(
+            completed=Count('id', filter=Q(category=self.completed)))
+        self.assertIndexScan(queryset, 'ticket_department_')
+
+    def test_followup_timeline(self):
+        self.assertIndexScan(
+            FollowUp.objects.filter(ticket=self.ticket),
+            'followup_ticket_created')
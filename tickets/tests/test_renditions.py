@@ -0,0 +1,169 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage, FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from associates.models import UserDepartment
+from jobs.models import Job
+from tickets.models import Ticket
+from tickets.renditions import (find_rendition, source_hash,
+                                generate_renditions, save_rendition)
+from tickets.storage import attachment_storage
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_upload(size=(3000, 2000), mode='RGB', image_format='JPEG',
+                 orientation=None, name='photo.jpg'):
+    buffer = BytesIO()
+    exif = Image.Exif()
+    exif[0x010f] = 'Phone maker'
+    if orientation:
+        exif[0x0112] = orientation
+    Image.new(mode, size, 'red').save(buffer, image_format, exif=exif)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class TicketRenditionsTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(
+            username='organizer',
+            password='organizer_password',
+            is_organizer=True
+        )
+        self.user_department, created = UserDepartment.objects.get_or_create(
+            user=self.organizer_user)
+        self.client.force_login(self.organizer_user)
+
+    def create_ticket(self, **kwargs):
+        return Ticket.objects.create(
+            title='Ticket', type=1, department=self.user_department,
+            uploaded_image=image_upload(**kwargs))
+
+    def open_rendition(self, ticket, variant):
+        name = find_rendition(source_hash(ticket.uploaded_image.name), variant)
+        self.assertIsNotNone(name)
+        return Image.open(default_storage.open(name))
+
+    def test_upload_queues_renditions(self):
+        ticket = self.create_ticket(orientation=6)
+        self.assertEqual(Job.objects.get().name, 'generate_renditions')
+
+        call_command('run_worker', '--burst', stdout=StringIO())
+
+        with self.open_rendition(ticket, 'original') as image:
+            # Rotated according to EXIF, capped and without EXIF data
+            self.assertEqual(image.size, (1365, 2048))
+            self.assertEqual(image.format, 'JPEG')
+            self.assertFalse(image.getexif())
+        with self.open_rendition(ticket, 'preview') as image:
+            self.assertEqual(max(image.size), 800)
+        with self.open_rendition(ticket, 'thumb') as image:
+            self.assertEqual(max(image.size), 160)
+
+    def test_transparent_image_stays_png(self):
+        ticket = self.create_ticket(size=(400, 400), mode='RGBA',
+                                    image_format='PNG', name='logo.png')
+        generate_renditions(ticket.uploaded_image.name)
+        with self.open_rendition(ticket, 'thumb') as image:
+            self.assertEqual((image.format, image.mode), ('PNG', 'RGBA'))
+
+    def test_image_view_generates_missing_rendition(self):
+        ticket = self.create_ticket(size=(1000, 500))
+
+        response = self.client.get(reverse('tickets:ticket-image',
+                                           args=(ticket.pk, 'preview')))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        with Image.open(BytesIO(b''.join(response.streaming_content))) as image:
+            self.assertEqual(image.size, (800, 400))
+
+        response = self.client.get(reverse('tickets:ticket-image',
+                                           args=(ticket.pk, 'huge')))
+        self.assertEqual(response.status_code, 404)
+
+    def test_image_view_missing_legacy_file(self):
+        ticket = self.create_ticket(size=(100, 100))
+        Ticket.objects.filter(pk=ticket.pk).update(
+            uploaded_image='ticket_files/missing.jpg')
+        self.assertIsNone(source_hash('ticket_files/missing.jpg'))
+
+        response = self.client.get(reverse('tickets:ticket-image',
+                                           args=(ticket.pk, 'thumb')))
+        self.assertEqual(response.status_code, 404)
+
+    def test_rendition_saved_under_exact_name(self):
+        name = 'renditions/ab/abcd/thumb.jpg'
+        for content in (b'first', b'second'):
+            self.assertEqual(save_rendition(name, ContentFile(content)), name)
+        self.assertEqual(default_storage.listdir('renditions/ab/abcd')[1],
+                         ['thumb.jpg'])
+
+    def test_image_view_is_department_scoped(self):
+        ticket = self.create_ticket(size=(100, 100))
+        other_user = User.objects.create_user(
+            username='other_organizer',
+            email='other@test.com',
+            password='other_password',
+            is_organizer=True
+        )
+        UserDepartment.objects.get_or_create(user=other_user)
+        self.client.force_login(other_user)
+
+        response = self.client.get(reverse('tickets:ticket-image',
+                                           args=(ticket.pk, 'thumb')))
+        self.assertEqual(response.status_code, 404)
+
+    def test_detail_page_shows_preview(self):
+        ticket = self.create_ticket(size=(100, 100))
+        response = self.client.get(ticket.get_absolute_url())
+        self.assertContains(response, reverse('tickets:ticket-image',
+                                              args=(ticket.pk, 'preview')))
+
+    def test_legacy_source_hash_is_cached(self):
+        # Uploads from before the blob storage are hashed from their content
+        storage = FileSystemStorage(location=attachment_storage.location)
+        name = storage.save('ticket_files/legacy.jpg', ContentFile(b'first'))
+        path = storage.path(name)
+        self.assertEqual(source_hash(name),
+                         hashlib.sha256(b'first').hexdigest())
+
+        # Same name, size and time: not read again
+        stat = os.stat(path)
+        with open(path, 'wb') as f:
+            f.write(b'other')
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual(source_hash(name),
+                         hashlib.sha256(b'first').hexdigest())
+
+        with open(path, 'wb') as f:
+            f.write(b'changed')
+        self.assertEqual(source_hash(name),
+                         hashlib.sha256(b'changed').hexdigest())
+
+    def test_renditions_deleted_with_blob(self):
+        ticket = self.create_ticket(size=(100, 100))
+        generate_renditions(ticket.uploaded_image.name)
+        digest = source_hash(ticket.uploaded_image.name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.delete()
+        self.assertIsNone(find_rendition(digest, 'thumb'))
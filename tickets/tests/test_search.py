@@ -0,0 +1,125 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from associates.models import Associate, UserDepartment
+from tickets.models import Ticket, FollowUp
+from tickets.search import search_tickets, fts5_query
+
+User = get_user_model()
+
+
+class TicketSearchTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.organizer_user = User.objects.create_user(
+            username='organizer',
+            email='organizer@test.com',
+            password='organizer_password',
+            is_organizer=True
+        )
+        self.user_department, created = UserDepartment.objects.get_or_create(
+            user=self.organizer_user)
+        other_user = User.objects.create_user(
+            username='other_organizer',
+            email='other@test.com',
+            password='other_password',
+            is_organizer=True
+        )
+        self.other_department, created = UserDepartment.objects.get_or_create(
+            user=other_user)
+
+        self.title_match = Ticket.objects.create(
+            title='Printer jammed', type=1, department=self.user_department,
+            description='Paper stuck on the second floor.')
+        self.description_match = Ticket.objects.create(
+            title='Office supplies', type=1, department=self.user_department,
+            description='The printer needs new toner.')
+        self.other_ticket = Ticket.objects.create(
+            title='Printer broken', type=1, department=self.other_department)
+
+    def search(self, text, user=None):
+        queryset = Ticket.objects.visible_to(user or self.organizer_user)
+        return search_tickets(queryset.for_list(), text)
+
+    def test_ranked_and_scoped_to_department(self):
+        self.assertEqual(self.search('printer'),
+                         [self.title_match, self.description_match])
+
+    def test_stemming_and_prefix(self):
+        self.assertEqual(self.search('jamming'), [self.title_match])
+        self.assertEqual(self.search('supp'), [self.description_match])
+
+    def test_index_follows_ticket_and_followup_changes(self):
+        self.assertEqual(self.search('invoice'), [])
+
+        followup = FollowUp.objects.create(ticket=self.description_match,
+                                           notes='Invoice attached.')
+        self.assertEqual(self.search('invoice'), [self.description_match])
+
+        followup.delete()
+        self.assertEqual(self.search('invoice'), [])
+
+        self.title_match.title = 'Invoice missing'
+        self.title_match.save()
+        self.assertEqual(self.search('invoice'), [self.title_match])
+        self.assertEqual(self.search('jammed'), [])
+
+        self.title_match.delete()
+        self.assertEqual(self.search('invoice'), [])
+
+    def test_bulk_created_tickets_are_indexed(self):
+        Ticket.objects.bulk_create_assigned([
+            Ticket(title='Imported invoice', type=1,
+                   department=self.user_department)])
+        self.assertEqual(len(self.search('invoice')), 1)
+
+    def test_snippet_is_highlighted_and_escaped(self):
+        self.description_match.description = '<b>printer</b> out of toner'
+        self.description_match.save()
+
+        ticket, = self.search('toner')
+        self.assertIn('<mark>toner</mark>', ticket.search_snippet)
+        self.assertIn('&lt;b&gt;', ticket.search_snippet)
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(fts5_query('printer AND "(toner'),
+                         '"printer" "AND" "toner"*')
+        self.assertEqual(self.search('printer OR ('), [])
+        self.assertEqual(self.search('!!!'), [])
+
+    def test_search_uses_fts_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('FTS5 is SQLite only')
+        with CaptureQueriesContext(connection) as queries:
+            self.search('printer')
+        sql = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertIn('MATCH', sql)
+        self.assertNotIn('LIKE', sql)
+
+    def test_search_view(self):
+        Associate.objects.create(
+            user=User.objects.create_user(
+                username='test_associate',
+                email='associate@test.com',
+                password='test_associate_password',
+                is_associate=True,
+                is_organizer=False
+            ),
+            department=self.user_department
+        )
+        self.client.force_login(self.organizer_user)
+
+        response = self.client.get(reverse('tickets:ticket-search'),
+                                   {'q': 'printer'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['tickets'],
+                         [self.title_match, self.description_match])
+        self.assertContains(response, '<mark>')
+
+        self.client.force_login(User.objects.get(username='test_associate'))
+        response = self.client.get(reverse('tickets:ticket-search'),
+                                   {'q': 'printer'})
+        self.assertEqual(response.context['tickets'], [])
@@ -1,5 +1,7 @@
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from associates.models import Associate, UserDepartment
 from tickets.models import Ticket, Category
@@ -47,3 +49,15 @@ class TicketSignalsTest(TestCase):
         self.ticket.associate = None
         self.ticket.save()
         self.assertIsNone(self.ticket.category)
+
+    def test_pre_save_ticket_signal_uses_category_registry(self):
+        Category.objects.by_name('assigned')
+        ticket = Ticket(title='Another Ticket', type=1,
+                        department=self.user_department,
+                        associate=self.test_associate)
+        with CaptureQueriesContext(connection) as context:
+            ticket.save()
+        self.assertEqual(ticket.category, self.test_category)
+        # 'assigned' comes from the registry
+        self.assertFalse([query for query in context.captured_queries
+                          if 'FROM "tickets_category"' in query['sql']])
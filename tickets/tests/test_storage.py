@@ -0,0 +1,166 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import (SimpleUploadedFile,
+                                            TemporaryUploadedFile)
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from associates.models import UserDepartment
+from tickets.models import Ticket, FollowUp, Blob
+from tickets.storage import attachment_storage
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class DedupStorageTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(
+            username='organizer',
+            password='organizer_password',
+            is_organizer=True
+        )
+        self.user_department, created = UserDepartment.objects.get_or_create(
+            user=self.organizer_user)
+
+    def create_ticket(self, content=b'%PDF-1.4 report', name='report.pdf'):
+        return Ticket.objects.create(
+            title='Ticket', type=1, department=self.user_department,
+            uploaded_file=SimpleUploadedFile(name, content))
+
+    def test_identical_uploads_are_stored_once(self):
+        first = self.create_ticket()
+        second = self.create_ticket(name='copy.PDF')
+        followup = FollowUp.objects.create(
+            ticket=first, notes='Same file',
+            file=SimpleUploadedFile('again.pdf', b'%PDF-1.4 report'))
+
+        name = first.uploaded_file.name
+        self.assertRegex(name, r'^blobs/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.pdf$')
+        self.assertEqual(second.uploaded_file.name, name)
+        self.assertEqual(followup.file.name, name)
+        self.assertEqual(Blob.objects.get().refcount, 3)
+        self.assertEqual(len(os.listdir(os.path.dirname(
+            attachment_storage.path(name)))), 1)
+
+        with first.uploaded_file.open() as f:
+            self.assertEqual(f.read(), b'%PDF-1.4 report')
+
+    def test_spooled_upload_is_moved(self):
+        upload = TemporaryUploadedFile('big.bin', 'application/octet-stream',
+                                       6, None)
+        upload.write(b'binary')
+        upload.seek(0)
+        ticket = Ticket.objects.create(title='Ticket', type=1,
+                                       department=self.user_department,
+                                       uploaded_file=upload)
+        # Closed by the request handler after an actual upload
+        upload.close()
+        with ticket.uploaded_file.open() as f:
+            self.assertEqual(f.read(), b'binary')
+
+    def test_blob_deleted_with_last_reference(self):
+        first = self.create_ticket()
+        second = self.create_ticket()
+        path = attachment_storage.path(first.uploaded_file.name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(Blob.objects.get().refcount, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(Blob.objects.exists())
+
+    def test_blob_reused_before_purge_is_kept(self):
+        ticket = self.create_ticket()
+        name = ticket.uploaded_file.name
+        with self.captureOnCommitCallbacks() as callbacks:
+            ticket.delete()
+
+        # An upload of the same content finds the blob before the purge runs
+        self.assertEqual(attachment_storage.save(
+            'copy.pdf', ContentFile(b'%PDF-1.4 report')), name)
+        for callback in callbacks:
+            callback()
+        self.assertTrue(attachment_storage.exists(name))
+
+        # Its reference is saved afterwards
+        self.create_ticket()
+        self.assertEqual(Blob.objects.get().refcount, 1)
+        self.assertTrue(attachment_storage.exists(name))
+
+    def test_bulk_delete_releases_blobs(self):
+        first = self.create_ticket()
+        second = self.create_ticket()
+        FollowUp.objects.create(
+            ticket=second, notes='Same file',
+            file=SimpleUploadedFile('again.pdf', b'%PDF-1.4 report'))
+        path = attachment_storage.path(first.uploaded_file.name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Ticket.objects.filter(pk=first.pk).bulk_delete()
+        self.assertEqual(Blob.objects.get().refcount, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Ticket.objects.all().bulk_delete()
+        self.assertFalse(FollowUp.objects.exists())
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(Blob.objects.exists())
+
+    def test_replaced_attachment_is_released(self):
+        ticket = self.create_ticket()
+        old_path = attachment_storage.path(ticket.uploaded_file.name)
+
+        ticket = Ticket.objects.get(pk=ticket.pk)
+        ticket.uploaded_file = SimpleUploadedFile('new.pdf', b'new content')
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.save()
+        self.assertFalse(os.path.exists(old_path))
+        self.assertEqual(Blob.objects.get().name, ticket.uploaded_file.name)
+
+        # Saving without touching the attachment keeps the reference
+        ticket.title = 'Renamed'
+        ticket.save()
+        self.assertEqual(Blob.objects.get().refcount, 1)
+
+    def test_dedupe_attachments_command(self):
+        tickets = [self.create_ticket() for i in range(3)]
+        for ticket in tickets:
+            name = f'ticket_files/ticket_{ticket.id}/report.pdf'
+            os.makedirs(os.path.dirname(attachment_storage.path(name)),
+                        exist_ok=True)
+            with open(attachment_storage.path(name), 'wb') as f:
+                f.write(b'legacy')
+            Ticket.objects.filter(pk=ticket.pk).update(uploaded_file=name)
+
+        out = StringIO()
+        call_command('dedupe_attachments', '--dry-run', stdout=out)
+        self.assertIn('1 unique files out of 3, 12 of 18 bytes', out.getvalue())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('dedupe_attachments', stdout=StringIO())
+
+        names = set(Ticket.objects.values_list('uploaded_file', flat=True))
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        blob = Blob.objects.get()
+        self.assertEqual((blob.name, blob.refcount), (name, 3))
+        self.assertFalse(os.path.exists(attachment_storage.path(
+            f'ticket_files/ticket_{tickets[0].id}/report.pdf')))
+        with open(attachment_storage.path(name), 'rb') as f:
+            self.assertEqual(f.read(), b'legacy')
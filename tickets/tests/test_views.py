@@ -1,9 +1,19 @@
+import json
+
+from django.contrib import messages
 from django.contrib.auth import get_user_model
-from django.test import TestCase, Client
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core import mail
+from django.db import connection
+from django.test import TestCase, Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from associates.models import Associate, UserDepartment
+from associates.roles import Role
+from jobs.models import Job
 from tickets.models import Ticket, Category, FollowUp
+from tickets.views import TicketDetailView
 
 User = get_user_model()
 
@@ -61,6 +71,15 @@ class TicketViewsTest(BaseTicketViewsTest):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'tickets/ticket/ticket_create.html')
 
+    def test_ticket_create_queues_email(self):
+        response = self.client.post(reverse('tickets:ticket-create'), {
+            'title': 'New Ticket', 'type': 1, 'description': 'Description'})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Ticket.objects.filter(title='New Ticket').exists())
+        # The email is sent by the worker, not during the request
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(Job.objects.get().name, 'send_mail')
+
     def test_ticket_list_view(self):
         response = self.client.get(reverse('tickets:ticket-list'))
         self.assertEqual(response.status_code, 200)
@@ -99,6 +118,55 @@ class TicketViewsTest(BaseTicketViewsTest):
                                 'tickets/ticket/assign_associate.html')
 
 
+class TicketBulkActionTest(BaseTicketViewsTest):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('tickets:ticket-bulk-action')
+        self.other_ticket = Ticket.objects.create(
+            title='Other Ticket', type=1, department=self.user_department)
+
+    def test_bulk_assign(self):
+        response = self.client.post(self.url, {
+            'tickets': [self.ticket.pk, self.other_ticket.pk],
+            'action': 'assign', 'associate': self.associate_user.pk})
+        self.assertRedirects(response, reverse('tickets:ticket-list'))
+        self.assertEqual(Ticket.objects.filter(
+            associate=self.associate_user, category=self.category).count(), 2)
+
+    def test_bulk_delete(self):
+        self.client.post(self.url, {'tickets': [self.ticket.pk],
+                                    'action': 'delete'})
+        self.assertFalse(Ticket.objects.filter(pk=self.ticket.pk).exists())
+        self.assertTrue(Ticket.objects.filter(
+            pk=self.other_ticket.pk).exists())
+
+    def test_other_departments_are_rejected(self):
+        other_department, created = UserDepartment.objects.get_or_create(
+            user=User.objects.create_user(username='other_organizer',
+                                          email='other@test.com',
+                                          password='password',
+                                          is_organizer=True))
+        foreign = Ticket.objects.create(title='Foreign', type=1,
+                                        department=other_department)
+        response = self.client.post(self.url, {
+            'tickets': [self.ticket.pk, foreign.pk], 'action': 'delete'})
+        self.assertRedirects(response, reverse('tickets:ticket-list'))
+        self.assertEqual(Ticket.objects.count(), 3)
+
+    def test_category_is_required(self):
+        self.client.post(self.url, {'tickets': [self.ticket.pk],
+                                    'action': 'category'})
+        response = self.client.get(reverse('tickets:ticket-list'))
+        self.assertContains(response, 'Select the category to set.')
+
+    def test_associates_are_forbidden(self):
+        self.client.force_login(self.associate_user.user)
+        response = self.client.post(self.url, {'tickets': [self.ticket.pk],
+                                               'action': 'delete'})
+        self.assertRedirects(response, reverse('tickets:ticket-list'))
+        self.assertTrue(Ticket.objects.filter(pk=self.ticket.pk).exists())
+
+
 class CategoryViewsTest(BaseTicketViewsTest):
     def setUp(self):
         super().setUp()
@@ -109,6 +177,21 @@ class CategoryViewsTest(BaseTicketViewsTest):
         self.assertTemplateUsed(response,
                                 'tickets/category/category_list.html')
 
+    def test_category_list_dwell_times(self):
+        self.ticket.associate = self.associate_user
+        self.ticket.save()
+        self.ticket.associate = None
+        self.ticket.save()
+
+        response = self.client.get(reverse('tickets:category-list'))
+        self.assertContains(response, 'Median Time')
+        dwell = response.context['category_counts'][0].dwell
+        self.assertEqual(dwell.count, 1)
+
+        self.client.force_login(self.associate_user.user)
+        response = self.client.get(reverse('tickets:category-list'))
+        self.assertNotContains(response, 'Median Time')
+
     def test_category_detail_view(self):
         response = self.client.get(
             reverse('tickets:category-detail', args=[self.category.id]))
@@ -116,6 +199,27 @@ class CategoryViewsTest(BaseTicketViewsTest):
         self.assertTemplateUsed(response,
                                 'tickets/category/category_detail.html')
 
+    def test_category_detail_pagination(self):
+        for title in ('First', 'Second'):
+            Ticket.objects.create(title=title, type=1,
+                                  department=self.user_department,
+                                  associate=self.associate_user)
+        url = reverse('tickets:category-detail', args=[self.category.id])
+
+        response = self.client.get(url, {'page_size': 1})
+        self.assertEqual([t.title for t in response.context['tickets']],
+                         ['Second'])
+        next_url = response.context['page_obj'].next_url
+        self.assertContains(response, 'Older')
+
+        response = self.client.get(url + next_url)
+        self.assertEqual([t.title for t in response.context['tickets']],
+                         ['First'])
+        self.assertIsNone(response.context['page_obj'].next_url)
+
+        response = self.client.get(url, {'cursor': 'bogus'})
+        self.assertEqual(response.status_code, 404)
+
     def test_category_create_view(self):
         response = self.client.get(reverse('tickets:category-create'))
         self.assertEqual(response.status_code, 200)
@@ -187,3 +291,284 @@ class FollowUpViewsTest(BaseTicketViewsTest):
         # Verify that the follow-up is deleted from the database
         with self.assertRaises(FollowUp.DoesNotExist):
             FollowUp.objects.get(pk=followup.id)
+
+
+    def test_followup_create_for_invisible_ticket(self):
+        associate_client = Client()
+        associate_client.force_login(self.associate_user.user)
+        url = reverse('tickets:ticket-followup-create', args=[self.ticket.id])
+        self.assertEqual(associate_client.get(url).status_code, 404)
+        self.assertEqual(associate_client.post(url, {'notes': 'Notes'})
+                         .status_code, 404)
+        self.assertFalse(FollowUp.objects.exists())
+
+    def test_followup_create_fetches_ticket_once(self):
+        url = reverse('tickets:ticket-followup-create', args=[self.ticket.id])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(url, {'notes': 'Notes'})
+        ticket_queries = [q for q in queries
+                          if q['sql'].startswith('SELECT')
+                          and 'FROM "tickets_ticket"' in q['sql']]
+        self.assertEqual(len(ticket_queries), 1)
+        self.assertEqual(FollowUp.objects.get().ticket, self.ticket)
+
+
+@override_settings(FOLLOWUPS_PAGE_SIZE=3)
+class FollowUpTimelineTest(BaseTicketViewsTest):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('tickets:ticket-detail', args=[self.ticket.id])
+
+    def create_followups(self, count):
+        # Same created_date, the id orders them
+        FollowUp.objects.bulk_create(
+            FollowUp(ticket=self.ticket, notes=f'Note {i}')
+            for i in range(count))
+
+    def test_detail_shows_newest_followups(self):
+        self.create_followups(7)
+        response = self.client.get(self.url)
+        notes = [followup.notes for followup in response.context['followups']]
+        self.assertEqual(notes, ['Note 6', 'Note 5', 'Note 4'])
+        self.assertContains(response, 'data-load-older')
+
+        # The fragment pages through the older ones
+        response = self.client.get(response.context['followups'].next_url)
+        self.assertTemplateUsed(response,
+                                'tickets/followup/followup_list.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        notes = [followup.notes for followup in response.context['followups']]
+        self.assertEqual(notes, ['Note 3', 'Note 2', 'Note 1'])
+
+        response = self.client.get(response.context['followups'].next_url)
+        notes = [followup.notes for followup in response.context['followups']]
+        self.assertEqual(notes, ['Note 0'])
+        self.assertNotContains(response, 'data-load-older')
+
+    def test_fragment_is_scoped_to_visible_tickets(self):
+        self.create_followups(1)
+        associate_client = Client()
+        associate_client.force_login(self.associate_user.user)
+        url = reverse('tickets:ticket-followup-list', args=[self.ticket.id])
+        self.assertEqual(associate_client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(url, {'cursor': 'bogus'})
+                         .status_code, 404)
+
+    def test_detail_queries_do_not_grow(self):
+        self.create_followups(1)
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(self.url)
+        self.create_followups(50)
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(self.url)
+        self.assertEqual(len(few), len(many))
+
+
+class TicketQueryCountTest(BaseTicketViewsTest):
+    def setUp(self):
+        super().setUp()
+        self.associate_client = Client()
+        self.associate_client.force_login(self.associate_user.user)
+
+    def create_tickets(self, count):
+        for i in range(count):
+            Ticket.objects.create(title=f'Ticket {i}', type=1,
+                                  department=self.user_department,
+                                  associate=self.associate_user)
+
+    def assertConstantQueries(self, client, url):
+        self.create_tickets(1)
+        # The first request caches the user's role in the session
+        client.get(url)
+        with CaptureQueriesContext(connection) as few:
+            client.get(url)
+        self.create_tickets(10)
+        with CaptureQueriesContext(connection) as many:
+            client.get(url)
+        self.assertEqual(len(few), len(many))
+
+    def test_ticket_list_queries_do_not_grow(self):
+        self.assertConstantQueries(self.client, reverse('tickets:ticket-list'))
+        self.assertConstantQueries(self.associate_client,
+                                   reverse('tickets:ticket-list'))
+
+    def test_category_list_queries_do_not_grow(self):
+        self.assertConstantQueries(self.client,
+                                   reverse('tickets:category-list'))
+
+    def test_category_list_counts(self):
+        response = self.client.get(reverse('tickets:category-list'))
+        self.assertEqual(response.context['unassigned_ticket_count'], 1)
+        counts = {c.name: c.count for c in response.context['category_counts']}
+        self.assertEqual(counts, {'assigned': 0})
+
+    def test_category_detail_queries_do_not_grow(self):
+        self.assertConstantQueries(
+            self.client,
+            reverse('tickets:category-detail', args=[self.category.id]))
+
+    def test_associate_cannot_see_other_tickets(self):
+        response = self.associate_client.get(
+            reverse('tickets:ticket-detail', args=[self.ticket.id]))
+        self.assertEqual(response.status_code, 404)
+
+
+class TicketJsonViewTest(BaseTicketViewsTest):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('tickets:ticket-list-json')
+        self.assigned_ticket = Ticket.objects.create(
+            title='Assigned Ticket', type=2, department=self.user_department,
+            associate=self.associate_user)
+
+        # A ticket from another department must never be returned
+        other_organizer = User.objects.create_user(
+            username='other', email='other@test.com', password='password',
+            is_organizer=True)
+        Ticket.objects.create(title='Other Ticket', type=1,
+                              department=other_organizer.userdepartment)
+
+    def test_requires_login(self):
+        self.client.logout()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+    def test_scoped_to_department(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        titles = [row['title'] for row in response.json()['results']]
+        self.assertCountEqual(titles, ['Test Ticket', 'Assigned Ticket'])
+
+    def test_filters_and_sparse_fields(self):
+        response = self.client.get(self.url, {'type': 2, 'fields': 'id,title'})
+        self.assertEqual(response.json()['results'],
+                         [{'id': self.assigned_ticket.id,
+                           'title': 'Assigned Ticket'}])
+
+        response = self.client.get(self.url, {'category': 'assigned'})
+        self.assertEqual(len(response.json()['results']), 1)
+
+    def test_sparse_fields_load_the_cursor_fields(self):
+        # The ETag aggregate and the page itself, the cursors must not fetch
+        # deferred ordering fields row by row
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'page_size': 1,
+                                                  'fields': 'title'})
+        self.assertIsNotNone(response.json()['next'])
+        self.assertEqual(len([query for query in queries
+                              if 'FROM "tickets_ticket"' in query['sql']]), 2)
+
+    def test_invalid_parameters(self):
+        response = self.client.get(self.url, {'fields': 'password'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(self.url, {'cursor': 'bogus'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_pagination(self):
+        response = self.client.get(self.url, {'page_size': 1})
+        data = response.json()
+        self.assertEqual(len(data['results']), 1)
+        self.assertIsNone(data['previous'])
+
+        response = self.client.get(self.url, {'page_size': 1,
+                                              'cursor': data['next']})
+        self.assertEqual(len(response.json()['results']), 1)
+        self.assertNotEqual(response.json()['results'], data['results'])
+
+    def test_stream(self):
+        response = self.client.get(self.url, {'stream': 1, 'fields': 'title'})
+        self.assertTrue(response.streaming)
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(data['results'], [{'title': 'Assigned Ticket'},
+                                           {'title': 'Test Ticket'}])
+
+
+class ConditionalGetTest(BaseTicketViewsTest):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('tickets:ticket-detail', args=[self.ticket.id])
+
+    def assertNotModified(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        response = self.client.get(url, params,
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.templates, [])
+        return response['ETag']
+
+    def test_followups_bump_updated_date(self):
+        updated_date = self.ticket.updated_date
+        followup = FollowUp.objects.create(ticket=self.ticket, notes='Notes')
+        self.ticket.refresh_from_db()
+        self.assertGreater(self.ticket.updated_date, updated_date)
+
+        updated_date = self.ticket.updated_date
+        followup.delete()
+        self.ticket.refresh_from_db()
+        self.assertGreater(self.ticket.updated_date, updated_date)
+
+    def test_ticket_detail(self):
+        etag = self.assertNotModified(self.url)
+
+        # A date alone cannot tell that tickets left the page
+        response = self.client.get(self.url)
+        self.assertNotIn('Last-Modified', response)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=
+                                   'Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+
+        FollowUp.objects.create(ticket=self.ticket, notes='Notes')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_new_login_is_not_modified_only_once(self):
+        url = reverse('tickets:ticket-list')
+        etag = self.assertNotModified(url)
+
+        # The cached page holds the CSRF token of the previous session
+        self.client.logout()
+        self.client.force_login(self.organizer_user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_ticket_detail_not_visible(self):
+        client = Client()
+        client.force_login(self.associate_user.user)
+        response = client.get(self.url, HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 404)
+
+    def test_ticket_list_deletion(self):
+        url = reverse('tickets:ticket-list')
+        Ticket.objects.create(title='Other Ticket', type=1,
+                              department=self.user_department)
+        etag = self.assertNotModified(url)
+
+        # Deleting the newest ticket leaves an older max(updated_date)
+        Ticket.objects.get(title='Other Ticket').delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_category_detail_and_json(self):
+        self.ticket.associate = self.associate_user
+        self.ticket.save()
+        self.assertNotModified(
+            reverse('tickets:category-detail', args=[self.category.id]))
+        self.assertNotModified(reverse('tickets:ticket-list-json'))
+        self.assertNotModified(reverse('tickets:ticket-list-json'), type=1)
+
+    def test_pending_messages_are_rendered(self):
+        etag = self.client.get(self.url)['ETag']
+        request = RequestFactory().get(self.url, HTTP_IF_NONE_MATCH=etag)
+        request.user = self.organizer_user
+        request.role = Role.for_user(self.organizer_user)
+        request.session = self.client.session
+        request._messages = FallbackStorage(request)
+        messages.info(request, 'You have successfully updated this ticket')
+
+        response = TicketDetailView.as_view()(request, pk=self.ticket.id)
+        self.assertEqual(response.status_code, 200)
@@ -9,22 +9,39 @@ urlpatterns = [
     path('', views.TicketListView.as_view(), name='ticket-list'),
     path('create/', views.TicketCreateView.as_view(), name='ticket-create'),
     path('<int:pk>/', views.TicketDetailView.as_view(), name='ticket-detail'),
+    path('search/', views.TicketSearchView.as_view(), name='ticket-search'),
+    path('archive/<int:pk>/', views.ArchivedTicketDetailView.as_view(),
+         name='archived-ticket-detail'),
+    path('<int:pk>/image/<slug:variant>/', views.TicketImageView.as_view(),
+         name='ticket-image'),
+    path('<int:pk>/attachment/<slug:field>/',
+         views.TicketAttachmentView.as_view(), name='ticket-attachment'),
     path('<int:pk>/update/', views.TicketUpdateView.as_view(),
          name='ticket-update'),
     path('<int:pk>/delete/', views.TicketDeleteView.as_view(),
          name='ticket-delete'),
     path('<int:pk>/assign-associate/', views.AssignAssociateView.as_view(),
          name='assign-associate'),
+    path('bulk/', views.TicketBulkActionView.as_view(),
+         name='ticket-bulk-action'),
+    path('distribute/', views.TicketDistributeView.as_view(),
+         name='ticket-distribute'),
+    path('claim/', views.TicketClaimView.as_view(), name='ticket-claim'),
     path('<int:pk>/category/', views.TicketCategoryUpdateView.as_view(),
          name='ticket-category-update'),
 
     # FollowUp views
     path('<int:pk>/followups/create/', views.FollowUpCreateView.as_view(),
          name='ticket-followup-create'),
+    path('<int:pk>/followups/', views.FollowUpListView.as_view(),
+         name='ticket-followup-list'),
     path('followups/<int:pk>/update/', views.FollowUpUpdateView.as_view(),
          name='ticket-followup-update'),
     path('followups/<int:pk>/delete/', views.FollowUpDeleteView.as_view(),
          name='ticket-followup-delete'),
+    path('followups/<int:pk>/attachment/',
+         views.FollowUpAttachmentView.as_view(),
+         name='ticket-followup-attachment'),
 
     # Category views
     path('categories/', views.CategoryListView.as_view(),
@@ -34,6 +51,6 @@ urlpatterns = [
     path('create-category/', views.CategoryCreateView.as_view(),
          name='category-create'),
 
-    # JSON view
-    path('json/', views.TicketJsonView.as_view(), name='ticket-list-json'),
+    # JSON API
+    path('api/v1/', views.TicketJsonView.as_view(), name='ticket-list-json'),
 ]
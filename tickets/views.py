@@ -1,94 +1,191 @@
-import datetime
+import copy
+import json
 
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.core.mail import send_mail
-from django.db.models import Count, Q
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
 from django.forms import ValidationError
-from django.http.response import JsonResponse
-from django.shortcuts import redirect
+from django.http import Http404
+from django.http.response import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.views import generic
 
 from associates.mixins import OrganizerAndLoginRequiredMixin
-from .forms import (TicketForm, AssignAssociateForm, TicketCategoryUpdateForm,
-                    FollowUpForm, CategoryForm)
-from .mixins import TicketFormAndUrlMixin, TicketQuerysetMixin, FollowUpMixin
-from .models import Ticket, Category
+from jobs.queue import enqueue
+from .downloads import serve_file, download_filename
+from .assignment import distribute, pick_associate
+from .forms import (TicketForm, TicketCreateForm, AssignAssociateForm,
+                    TicketCategoryUpdateForm, FollowUpForm, CategoryForm,
+                    TicketApiFilterForm, TicketSearchForm,
+                    TicketBulkActionForm)
+from .mixins import (TicketFormAndUrlMixin, TicketQuerysetMixin, FollowUpMixin,
+                     KeysetPaginationMixin, FollowUpTimelineMixin,
+                     ConditionalGetMixin)
+from .models import (Ticket, Category, FollowUp, TicketCategoryCount,
+                     TicketDwellStats, ArchivedTicket)
+from .pagination import InvalidCursor
+from .renditions import RENDITIONS, get_rendition
+from .search import search_tickets
+from .storage import attachment_storage
 
 
 class TicketCreateView(TicketFormAndUrlMixin, OrganizerAndLoginRequiredMixin,
                        generic.CreateView):
     """ View for creating a new ticket. """
     template_name = 'tickets/ticket/ticket_create.html'
-    form_class = TicketForm
+    form_class = TicketCreateForm
 
     def form_valid(self, form):
         ticket = form.save(commit=False)
 
         # Set the ticket department
-        ticket.department = self.request.user.userdepartment
-        ticket.save()
-        send_mail(
-            subject='A ticket has been created.',
-            message='Go to the site to see the new ticket.',
-            from_email='test@test.com',
-            recipient_list=['associate@test.com']
-        )
+        ticket.department_id = self.request.role.department_id
+        with transaction.atomic():
+            if form.cleaned_data['auto_assign'] and ticket.associate is None:
+                # Locks the associates until the ticket is saved
+                ticket.associate = pick_associate(ticket.department_id)
+            ticket.save()
+        # Sent by the job worker, off the request
+        enqueue('send_mail', {
+            'subject': 'A ticket has been created.',
+            'message': 'Go to the site to see the new ticket.',
+            'from_email': 'test@test.com',
+            'recipient_list': ['associate@test.com']
+        })
         messages.success(self.request,
                          'You have successfully created a ticket.')
         return super().form_valid(form)
 
 
-class TicketListView(LoginRequiredMixin, generic.ListView):
+class TicketListView(KeysetPaginationMixin, LoginRequiredMixin,
+                     ConditionalGetMixin, generic.ListView):
     """ 
     View for displaying a list of tickets. 
     
     For organizer display all tickets assigned and unassigned to associates
     regarding the user's department.
     For associate display only tickets assigned to the specific user.
+    Both lists are paginated by cursor ('cursor' and 'unassigned_cursor').
     """
     template_name = 'tickets/ticket/ticket_list.html'
+    read_from_replica = True
     context_object_name = 'tickets'
 
     def get_queryset(self):
-        user = self.request.user
-
-        if user.is_organizer:
-            # Show tickets assigned to associates within their department
-            queryset = Ticket.objects.filter(
-                department=user.userdepartment,
-                associate__isnull=False
-            )
-        else:
-            # Show only tickets assigned to the specific associate
-            queryset = Ticket.objects.filter(
-                department=user.associate.department,
-                associate__isnull=False
-            )
-            # Filter tickets regarding the specific associate           
-            queryset = queryset.filter(associate__user=user)
-        return queryset
+        # Organizers see the assigned tickets of their department,
+        # associates only the tickets assigned to them
+        return Ticket.objects.visible_to(self.request.role).assigned().for_list()
+
+    def get_conditional_queryset(self):
+        # Both panels
+        return Ticket.objects.visible_to(self.request.role)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user = self.request.user
-        if user.is_organizer:
-            # For organizers, include a list of unassigned tickets
-            queryset = Ticket.objects.filter(
-                department=user.userdepartment,
-                associate__isnull=True
-            )
-            context.update({'unassigned_tickets': queryset})
+        role = self.request.role
+        if role.is_organizer:
+            # For organizers, include a page of unassigned tickets
+            queryset = Ticket.objects.visible_to(role).unassigned().for_list()
+            page = self.get_keyset_page(queryset, 'unassigned_cursor')
+            context.update({'unassigned_tickets': page.object_list,
+                            'unassigned_page_obj': page,
+                            'bulk_form': TicketBulkActionForm(
+                                user_department=role.department_id)})
         return context
 
 
-class TicketDetailView(TicketQuerysetMixin, LoginRequiredMixin,
+class TicketDetailView(FollowUpTimelineMixin, TicketQuerysetMixin,
+                       LoginRequiredMixin, ConditionalGetMixin,
                        generic.DetailView):
-    """ View for ticket details. """
+    """
+    View for ticket details with the newest follow-ups, the older ones
+    being loaded on demand from FollowUpListView.
+    """
     template_name = 'tickets/ticket/ticket_detail.html'
+    read_from_replica = True
     context_object_name = 'ticket'
 
+    def get_conditional_queryset(self):
+        return Ticket.objects.visible_to(self.request.role).filter(
+            pk=self.kwargs['pk'])
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['followups'] = self.get_followup_page(self.object.pk)
+        return context
+
+
+class ArchivedTicketDetailView(LoginRequiredMixin, generic.DetailView):
+    """ Read-only view of an archived ticket and its follow-ups. """
+    template_name = 'tickets/ticket/archived_ticket_detail.html'
+    read_from_replica = True
+    context_object_name = 'ticket'
+
+    def get_queryset(self):
+        return ArchivedTicket.objects.visible_to(
+            self.request.role).for_detail().prefetch_related('followups')
+
+
+class TicketImageView(TicketQuerysetMixin, LoginRequiredMixin,
+                      generic.detail.SingleObjectMixin, generic.View):
+    """
+    View for the downscaled renditions of a ticket image ('thumb',
+    'preview' or 'original'), generated on the first request if the job
+    worker has not made them yet.
+    """
+
+    def get(self, request, *args, **kwargs):
+        ticket = self.get_object()
+        variant = kwargs['variant']
+        if variant not in RENDITIONS or not ticket.uploaded_image:
+            raise Http404('No such image.')
+        name = get_rendition(ticket.uploaded_image.name, variant)
+        if name is None:
+            raise Http404('The image could not be read.')
+
+        return serve_file(request, default_storage, name)
+
+
+class TicketAttachmentView(TicketQuerysetMixin, LoginRequiredMixin,
+                           generic.detail.SingleObjectMixin, generic.View):
+    """ View for downloading the file or image uploaded with a ticket. """
+    fields = {'file': 'uploaded_file', 'image': 'uploaded_image'}
+
+    def get(self, request, *args, **kwargs):
+        ticket = self.get_object()
+        if kwargs['field'] not in self.fields:
+            raise Http404('No such attachment.')
+        attachment = getattr(ticket, self.fields[kwargs['field']])
+        if not attachment:
+            raise Http404('No such attachment.')
+        return serve_file(
+            request, attachment_storage, attachment.name,
+            download_filename('ticket', ticket.pk, attachment.name),
+            as_attachment=True)
+
+
+class FollowUpAttachmentView(LoginRequiredMixin,
+                             generic.detail.SingleObjectMixin, generic.View):
+    """ View for downloading the file of a follow-up of a visible ticket. """
+
+    def get_queryset(self):
+        return FollowUp.objects.filter(
+            ticket__in=Ticket.objects.visible_to(self.request.role))
+
+    def get(self, request, *args, **kwargs):
+        followup = self.get_object()
+        if not followup.file:
+            raise Http404('No such attachment.')
+        return serve_file(
+            request, attachment_storage, followup.file.name,
+            download_filename('followup', followup.pk, followup.file.name),
+            as_attachment=True)
+
 
 class TicketUpdateView(TicketFormAndUrlMixin, OrganizerAndLoginRequiredMixin,
                        generic.UpdateView):
@@ -103,29 +200,21 @@ class TicketUpdateView(TicketFormAndUrlMixin, OrganizerAndLoginRequiredMixin,
     context_object_name = 'ticket'
 
     def get_queryset(self):
-        user = self.request.user
-
-        if user.is_organizer:
-            # For organizers, show all tickets in the user's department
-            queryset = Ticket.objects.filter(department=user.userdepartment)
-        else:
-            # For associates, forbid ticket updates by providing an empty queryset
-            queryset = Ticket.objects.none()
-        return queryset
+        # Associates get an empty queryset, which forbids ticket updates
+        return Ticket.objects.editable_by(self.request.role).for_detail()
 
     def form_valid(self, form):
         """
         If the ticket category is set to 'completed', update the completion date.
         """
-        ticket_before_update = self.get_object()
         ticket = form.save(commit=False)
-        completed_category = Category.objects.get(name='completed')
+        completed_category = Category.objects.by_name('completed')
 
         if form.cleaned_data['category'] == completed_category:
             # Update the date at which this ticket was completed
-            if ticket_before_update.category != completed_category:
+            if form.initial.get('category') != completed_category.pk:
                 # This ticket has now been completed
-                ticket.completed_date = datetime.datetime.now()
+                ticket.completed_date = timezone.now()
         ticket.save()
         messages.info(self.request,
                       'You have successfully updated this ticket')
@@ -145,14 +234,8 @@ class TicketDeleteView(OrganizerAndLoginRequiredMixin, generic.DeleteView):
         return reverse('tickets:ticket-list')
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_organizer:
-            # For organizers, show all tickets in the user's department
-            queryset = Ticket.objects.filter(department=user.userdepartment)
-        else:
-            # For associates, forbid ticket deletion by providing an empty queryset
-            queryset = Ticket.objects.none()
-        return queryset
+        # Associates get an empty queryset, which forbids ticket deletion
+        return Ticket.objects.editable_by(self.request.role)
 
 
 class TicketCategoryUpdateView(TicketQuerysetMixin, LoginRequiredMixin,
@@ -178,9 +261,8 @@ class TicketCategoryUpdateView(TicketQuerysetMixin, LoginRequiredMixin,
         If the associate is not selected before assigning the category, raise
         a validation error and redirect with an error message.
         """
-        ticket_before_update = self.get_object()
         instance = form.save(commit=False)
-        completed_category = Category.objects.get(name='completed')
+        completed_category = Category.objects.by_name('completed')
 
         # Check if the associate is selected
         try:
@@ -192,21 +274,20 @@ class TicketCategoryUpdateView(TicketQuerysetMixin, LoginRequiredMixin,
             # with an error message
             messages.error(self.request, str(*e))
             return redirect(reverse_lazy('tickets:ticket-category-update',
-                                         kwargs={'pk': self.get_object().id}))
+                                         kwargs={'pk': instance.id}))
 
         if form.cleaned_data['category'] == completed_category:
             # Update the date at which this ticket was completed
-            if ticket_before_update.category != completed_category:
+            if form.initial.get('category') != completed_category.pk:
                 # This ticket has now been completed
-                instance.completed_date = datetime.datetime.now()
+                instance.completed_date = timezone.now()
         instance.save()
         messages.info(self.request,
                       'You have successfully updated this ticket')
         return super().form_valid(form)
 
     def get_success_url(self):
-        return reverse('tickets:ticket-detail',
-                       kwargs={'pk': self.get_object().id})
+        return reverse('tickets:ticket-detail', kwargs={'pk': self.object.id})
 
 
 class AssignAssociateView(TicketFormAndUrlMixin,
@@ -216,14 +297,15 @@ class AssignAssociateView(TicketFormAndUrlMixin,
     form_class = AssignAssociateForm
 
     def form_valid(self, form):
-        # Retrieve the existing ticket
-        ticket = Ticket.objects.get(id=self.kwargs['pk'])
+        # Retrieve the existing ticket from the organizer's department
+        ticket = get_object_or_404(
+            Ticket.objects.editable_by(self.request.role), id=self.kwargs['pk'])
 
         # Update the ticket with the selected associate
         ticket.associate = form.cleaned_data['associate']
 
         # Check if the 'assigned' category exists, create it if not
-        assigned_category, created = Category.objects.get_or_create(name='assigned')
+        assigned_category = Category.objects.by_name('assigned', create=True)
         
         if ticket.associate:
             # If an associate is selected, set the ticket category to 'assigned'
@@ -234,6 +316,73 @@ class AssignAssociateView(TicketFormAndUrlMixin,
         return super().form_valid(form)
 
 
+class TicketBulkActionView(TicketFormAndUrlMixin,
+                           OrganizerAndLoginRequiredMixin, generic.FormView):
+    """
+    View applying an action to the tickets selected on the ticket list.
+
+    Each action runs as a few set-based statements whatever the number of
+    tickets, see TicketQuerySet.bulk_assign() and the methods after it.
+    """
+    form_class = TicketBulkActionForm
+    http_method_names = ['post']
+
+    def form_valid(self, form):
+        tickets = Ticket.objects.filter(
+            pk__in=[ticket.pk for ticket in form.cleaned_data['tickets']])
+        action = form.cleaned_data['action']
+        if action == 'assign':
+            count = tickets.bulk_assign(form.cleaned_data['associate'])
+            messages.success(self.request, f'Assigned {count} tickets.')
+        elif action == 'distribute':
+            count = distribute(tickets)
+            messages.success(self.request, f'Assigned {count} tickets.')
+        elif action == 'category':
+            count = tickets.bulk_set_category(form.cleaned_data['category'])
+            messages.success(self.request, f'Updated {count} tickets.')
+        else:
+            count = tickets.bulk_delete()
+            messages.success(self.request, f'Deleted {count} tickets.')
+        return super().form_valid(form)
+
+    def form_invalid(self, form):
+        messages.error(self.request, ' '.join(
+            error for errors in form.errors.values() for error in errors))
+        return redirect(self.get_success_url())
+
+
+class TicketDistributeView(OrganizerAndLoginRequiredMixin, generic.View):
+    """ View assigning all the unassigned tickets of the department. """
+    http_method_names = ['post']
+
+    def post(self, request, *args, **kwargs):
+        count = distribute(Ticket.objects.filter(
+            department_id=request.role.department_id))
+        messages.success(request, f'Assigned {count} tickets.')
+        return redirect('tickets:ticket-list')
+
+
+class TicketClaimView(LoginRequiredMixin, generic.View):
+    """
+    View assigning the next unassigned ticket of the department to the
+    associate asking for it.
+    """
+    http_method_names = ['post']
+
+    def post(self, request, *args, **kwargs):
+        role = request.role
+        if role.associate_id is None:
+            messages.error(request, 'Only associates can claim tickets.')
+            return redirect('tickets:ticket-list')
+        ticket = Ticket.objects.claim_next(role.associate_id,
+                                           role.department_id)
+        if ticket is None:
+            messages.info(request, 'There are no unassigned tickets left.')
+            return redirect('tickets:ticket-list')
+        messages.success(request, f'You have claimed "{ticket.title}".')
+        return redirect(ticket)
+
+
 class CategoryListView(LoginRequiredMixin, generic.ListView):
     """ 
     View for displaying a list of ticket categories.
@@ -242,60 +391,96 @@ class CategoryListView(LoginRequiredMixin, generic.ListView):
     For associate display categories for their assigned tickets.
     """
     template_name = 'tickets/category/category_list.html'
+    read_from_replica = True
     model = Category
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user = self.request.user
-
-        # Filter tickets based on the user's role and department
-        if user.is_organizer:
-            tickets = Ticket.objects.filter(department=user.userdepartment)
-        else:
-            tickets = Ticket.objects.filter(
-                department=user.associate.department, associate=user.associate)
-
-        # Count how many tickets are in each category based on the organizer 
-        categories = self.get_queryset()
-        category_counts = categories.annotate(count=Count('categories',
-                            filter=Q(categories__in=tickets))).order_by('id')
-
-        # Count how many tickets are unassigned        
-        unassigned_ticket_count = tickets.filter(category__isnull=True).count()
+        # Count how many tickets are in each category based on the user's
+        # role and department, from the maintained counters
+        role = self.request.role
+        counts = TicketCategoryCount.objects.counts_for(role)
+        # How long the department's tickets stay in each category
+        dwell = {}
+        if role.is_organizer:
+            dwell = TicketDwellStats.objects.report(role.department_id)
+
+        category_counts = []
+        for category in Category.objects.registry().values():
+            # Registry instances are shared, annotate a copy
+            category = copy.copy(category)
+            category.count = counts.get(category.pk, 0)
+            category.dwell = dwell.get(category.pk)
+            category_counts.append(category)
 
         context.update({
-            'unassigned_ticket_count': unassigned_ticket_count,
+            # How many tickets are unassigned
+            'unassigned_ticket_count': counts.get(None, 0),
+            'unassigned_dwell': dwell.get(None),
             'category_counts': category_counts,
         })
 
         return context
 
 
-class CategoryDetailView(LoginRequiredMixin, generic.DetailView):
+class TicketSearchView(LoginRequiredMixin, generic.TemplateView):
+    """
+    View for searching the titles, descriptions and follow-up notes of the
+    tickets visible to the user, best matches first.
+    """
+    template_name = 'tickets/ticket/ticket_search.html'
+    read_from_replica = True
+    results_limit = 50
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        form = TicketSearchForm(self.request.GET)
+        tickets = []
+        if form.is_valid() and form.cleaned_data['q']:
+            querysets = [Ticket.objects.visible_to(self.request.role)]
+            if form.cleaned_data['archived']:
+                # Only read on request, the archive grows without bound
+                querysets.append(
+                    ArchivedTicket.objects.visible_to(self.request.role))
+            for queryset in querysets:
+                tickets += search_tickets(queryset.for_list(),
+                                          form.cleaned_data['q'],
+                                          limit=self.results_limit)
+            # Both rankings use the same formula
+            tickets.sort(key=lambda ticket: ticket.search_rank, reverse=True)
+            tickets = tickets[:self.results_limit]
+
+        context['form'] = form
+        context['tickets'] = tickets
+        return context
+
+
+class CategoryDetailView(KeysetPaginationMixin, LoginRequiredMixin,
+                         ConditionalGetMixin, generic.DetailView):
     """
     View for displaying details of a specific ticket category.
 
-    For organizer display all tickets in the category for their department.
+    For organizer display the tickets in the category for their department.
     For associate display only their assigned tickets in the category.
+    The tickets are paginated by cursor like the ticket list.
     """
     template_name = 'tickets/category/category_detail.html'
+    read_from_replica = True
     context_object_name = 'category'
     model = Category
 
+    def get_conditional_queryset(self):
+        return Ticket.objects.visible_to(self.request.role).filter(
+            category_id=self.kwargs['pk'])
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user = self.request.user
-
         # Filter tickets based on the user's role and department
-        if user.is_organizer:
-            tickets = Ticket.objects.filter(department=user.userdepartment,
-                                            category=self.object)
-        else:
-            tickets = Ticket.objects.filter(
-                department=user.associate.department, associate=user.associate,
-                category=self.object)
+        tickets = Ticket.objects.visible_to(self.request.role).filter(
+            category=self.object).for_list()
 
-        context['tickets'] = tickets
+        page = self.get_keyset_page(tickets, self.cursor_kwarg)
+        context.update({'tickets': page.object_list, 'page_obj': page})
         return context
 
 
@@ -320,20 +505,45 @@ class CategoryCreateView(OrganizerAndLoginRequiredMixin, generic.CreateView):
         return super().form_valid(form)
 
 
+class FollowUpListView(FollowUpTimelineMixin, LoginRequiredMixin,
+                       generic.TemplateView):
+    """
+    HTML fragment with the page of a ticket's follow-ups older than the
+    'cursor' parameter, appended to the ticket page by 'Load older'.
+    """
+    template_name = 'tickets/followup/followup_list.html'
+    read_from_replica = True
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        ticket_id = self.kwargs['pk']
+        if not Ticket.objects.visible_to(self.request.role).filter(
+                pk=ticket_id).exists():
+            raise Http404('No such ticket.')
+        context['followups'] = self.get_followup_page(
+            ticket_id, self.request.GET.get('cursor'))
+        return context
+
+
 class FollowUpCreateView(LoginRequiredMixin, generic.CreateView):
     """ View for creating a new follow-up for a ticket. """
     template_name = 'tickets/followup/followup_create.html'
     form_class = FollowUpForm
 
+    @cached_property
+    def ticket(self):
+        # Fetched once per request, for the form page and for saving
+        return get_object_or_404(Ticket.objects.visible_to(self.request.role),
+                                 pk=self.kwargs['pk'])
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context.update({'ticket': Ticket.objects.get(pk=self.kwargs['pk'])})
+        context.update({'ticket': self.ticket})
         return context
 
     def form_valid(self, form):
-        ticket = Ticket.objects.get(pk=self.kwargs['pk'])
         followup = form.save(commit=False)
-        followup.ticket = ticket
+        followup.ticket = self.ticket
         followup.save()
         return super().form_valid(form)
 
@@ -352,14 +562,72 @@ class FollowUpDeleteView(FollowUpMixin, generic.DeleteView):
     template_name = 'tickets/followup/followup_delete.html'
 
 
-class TicketJsonView(generic.View):
-    """ View for retrieving ticket data as JSON from the database. """
+class TicketJsonView(KeysetPaginationMixin, LoginRequiredMixin,
+                     ConditionalGetMixin, generic.View):
+    """
+    Versioned JSON API for the tickets visible to the logged-in user.
+
+    Supports filtering (type, category, associate, created_after,
+    created_before), sparse fieldsets (?fields=id,title), cursor pagination
+    (?cursor=, ?page_size=) and ?stream=1, which streams every matching
+    ticket from a chunked iterator so memory stays constant whatever the
+    result size.
+    """
+    raise_exception = True
+    read_from_replica = True
+    stream_chunk_size = 2000
+
+    def get_conditional_queryset(self):
+        form = TicketApiFilterForm(self.request.GET)
+        if not form.is_valid():
+            return None
+        return form.filter_queryset(
+            Ticket.objects.visible_to(self.request.role))
 
     def get(self, request, *args, **kwargs):
+        form = TicketApiFilterForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400)
+
+        fields = form.cleaned_data['fields']
+        queryset = form.filter_queryset(Ticket.objects.visible_to(request.role))
+
+        if form.cleaned_data['stream']:
+            # The rows are read after the request has been routed, resolve
+            # its database (possibly a replica) now
+            queryset = queryset.using(queryset.db)
+            rows = queryset.order_by(*Ticket._meta.ordering).values(
+                *fields).iterator(chunk_size=self.stream_chunk_size)
+            return StreamingHttpResponse(self.stream_json(rows),
+                                         content_type='application/json')
+
+        # The cursors are built from the ordering fields, load them too so
+        # they are not fetched row by row
+        ordering = [name.lstrip('-') for name in Ticket._meta.ordering]
+        paginator = self.get_paginator(queryset.only(*fields, *ordering),
+                                       self.get_paginate_by(queryset))
         try:
-            qs = Ticket.objects.all().values('title', 'description', 'type', 
-                                             'category', 'department', 'associate')
-            return JsonResponse({'qs': list(qs)})
-        except Exception as e:
-            return JsonResponse({'error': str(e)}, status=500)
+            page = paginator.page(request.GET.get('cursor'))
+        except InvalidCursor as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        return JsonResponse({
+            'results': [self.serialize(ticket, fields) for ticket in page],
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        })
 
+    @staticmethod
+    def serialize(ticket, fields):
+        """ Mirror .values(*fields): foreign keys are rendered as ids. """
+        return {name: Ticket._meta.get_field(name).value_from_object(ticket)
+                for name in fields}
+
+    @staticmethod
+    def stream_json(rows):
+        yield '{"results": ['
+        separator = ''
+        for row in rows:
+            yield separator + json.dumps(row, cls=DjangoJSONEncoder)
+            separator = ','
+        yield ']}'